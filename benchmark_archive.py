@@ -0,0 +1,97 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+from hyperzip_core import DEFAULT_SETTINGS
+from hyperzip_zip import create_native_zip
+
+# Compares the built-in native_zip profile with 7-Zip's ZIP output (-mx=9 -tzip) on size and wall time.
+# Usage: python benchmark_archive.py <banner folder> [...] [--7z <path to 7z>] [--runs N] [--params "-mx=9"]
+# Each folder is archived the way process_and_archive_folder does it: its contents, relative to the folder.
+
+def find_sevenzip(path=None):
+    for candidate in (path, DEFAULT_SETTINGS['sevenzip_path'], shutil.which('7z'), shutil.which('7za'), shutil.which('7zz')):
+        if candidate and os.path.exists(candidate):
+            return candidate
+    return None
+
+def run_native(folder, archive_path, params):
+    create_native_zip(folder, archive_path, params)
+
+def run_sevenzip(folder, archive_path, sevenzip):
+    subprocess.run([sevenzip, "a", "-y", "-r", "-mx=9", "-tzip", archive_path, "*"], cwd=folder,
+                   capture_output=True, check=True, creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+
+def measure(run, folder, archive_path, runs):
+    """Returns (archive size, best wall time over runs)."""
+    best = None
+    for _ in range(runs):
+        if os.path.exists(archive_path):
+            os.remove(archive_path)
+        started = time.perf_counter()
+        run(folder, archive_path)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return os.path.getsize(archive_path), best
+
+def main(argv):
+    folders, sevenzip_path, runs, params = [], None, 3, DEFAULT_SETTINGS.get('NATIVE_ZIP_PARAMS', "-mx=9")
+    index = 0
+    while index < len(argv):
+        if argv[index] in ('--7z', '--runs', '--params') and index + 1 < len(argv):
+            value = argv[index + 1]
+            if argv[index] == '--7z':
+                sevenzip_path = value
+            elif argv[index] == '--runs':
+                runs = max(1, int(value))
+            else:
+                params = value
+            index += 2
+            continue
+        folders.append(argv[index])
+        index += 1
+    if not folders:
+        print("Usage: python benchmark_archive.py <banner folder> [...] [--7z <path>] [--runs N] [--params \"-mx=9\"]")
+        return 1
+
+    sevenzip = find_sevenzip(sevenzip_path)
+    if sevenzip is None:
+        print("7-Zip not found, measuring native_zip only (pass --7z <path> to compare).")
+
+    totals = {'native_size': 0, 'native_time': 0.0, 'sevenzip_size': 0, 'sevenzip_time': 0.0}
+    work_dir = tempfile.mkdtemp(prefix="hyperzip_bench_")
+    try:
+        print(f"{'Folder':<32} {'native_zip':>12} {'time':>8} {'7zip_zip':>12} {'time':>8} {'diff':>8}")
+        for folder in folders:
+            folder = os.path.abspath(folder)
+            label = os.path.basename(folder)[:32]
+            native_size, native_time = measure(lambda f, a: run_native(f, a, params), folder,
+                                               os.path.join(work_dir, "native.zip"), runs)
+            totals['native_size'] += native_size
+            totals['native_time'] += native_time
+            if sevenzip is None:
+                print(f"{label:<32} {native_size:>12} {native_time:>7.3f}s")
+                continue
+            try:
+                sevenzip_size, sevenzip_time = measure(lambda f, a: run_sevenzip(f, a, sevenzip), folder,
+                                                       os.path.join(work_dir, "7zip.zip"), runs)
+            except (OSError, subprocess.CalledProcessError) as e:
+                print(f"{label:<32} {native_size:>12} {native_time:>7.3f}s  7-Zip failed: {e}")
+                continue
+            totals['sevenzip_size'] += sevenzip_size
+            totals['sevenzip_time'] += sevenzip_time
+            print(f"{label:<32} {native_size:>12} {native_time:>7.3f}s {sevenzip_size:>12} {sevenzip_time:>7.3f}s "
+                  f"{native_size - sevenzip_size:>+8}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print("-" * 84)
+    print(f"native_zip ({params}): {totals['native_size']} bytes in {totals['native_time']:.3f}s")
+    if sevenzip is not None:
+        print(f"7zip_zip (-mx=9 -tzip): {totals['sevenzip_size']} bytes in {totals['sevenzip_time']:.3f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
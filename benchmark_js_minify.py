@@ -0,0 +1,83 @@
+import os
+import sys
+import time
+import zlib
+import jsmin
+from hyperzip_jsmangle import mangle_js, JSMangleError
+
+# Compares plain jsmin with jsmin + identifier mangling on a corpus of scripts.
+# Usage: python benchmark_js_minify.py <folder or .js file> [...]
+# Point it at real banner folders (Animate/GWD exports, CreateJS/GSAP builds) to see what mangling buys.
+
+def collect_scripts(paths):
+    scripts = []
+    for path in paths:
+        if os.path.isfile(path):
+            scripts.append(path)
+            continue
+        for root, _, files in os.walk(path):
+            for file in files:
+                if file.lower().endswith('.js'):
+                    scripts.append(os.path.join(root, file))
+    return sorted(scripts)
+
+def deflated_size(data):
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+    return len(compressor.compress(data) + compressor.flush())
+
+def main(paths):
+    scripts = collect_scripts(paths)
+    if not scripts:
+        print("No .js files found.")
+        return 1
+
+    totals = {'original': 0, 'jsmin': 0, 'mangled': 0, 'jsmin_zip': 0, 'mangled_zip': 0}
+    jsmin_seconds = 0.0
+    mangle_seconds = 0.0
+    fallbacks = []
+    print(f"{'File':<40} {'Original':>10} {'jsmin':>10} {'mangled':>10} {'gain':>7}")
+    for script in scripts:
+        try:
+            with open(script, 'r', encoding='utf-8') as f:
+                source = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"{os.path.basename(script):<40} skipped: {e}")
+            continue
+
+        started = time.perf_counter()
+        minified = jsmin.jsmin(source)
+        jsmin_seconds += time.perf_counter() - started
+
+        started = time.perf_counter()
+        try:
+            mangled = mangle_js(minified)
+        except JSMangleError as e:
+            mangled = minified
+            fallbacks.append((script, str(e)))
+        mangle_seconds += time.perf_counter() - started
+
+        sizes = [len(text.encode('utf-8')) for text in (source, minified, mangled)]
+        totals['original'] += sizes[0]
+        totals['jsmin'] += sizes[1]
+        totals['mangled'] += sizes[2]
+        totals['jsmin_zip'] += deflated_size(minified.encode('utf-8'))
+        totals['mangled_zip'] += deflated_size(mangled.encode('utf-8'))
+        gain = (1 - sizes[2] / sizes[1]) * 100 if sizes[1] else 0.0
+        print(f"{os.path.basename(script)[:40]:<40} {sizes[0]:>10} {sizes[1]:>10} {sizes[2]:>10} {gain:>6.1f}%")
+
+    megabytes = totals['original'] / (1024 * 1024)
+    print("-" * 80)
+    print(f"Scripts: {len(scripts)}, fell back to jsmin: {len(fallbacks)}")
+    print(f"Size:     original {totals['original']}, jsmin {totals['jsmin']}, mangled {totals['mangled']}")
+    print(f"Deflated: jsmin {totals['jsmin_zip']}, mangled {totals['mangled_zip']}")
+    print(f"Throughput: jsmin {megabytes / jsmin_seconds if jsmin_seconds else 0:.2f} MB/s, "
+          f"jsmin + mangle {megabytes / (jsmin_seconds + mangle_seconds) if jsmin_seconds + mangle_seconds else 0:.2f} MB/s")
+    for script, reason in fallbacks:
+        print(f"  fallback: {os.path.basename(script)} ({reason})")
+    return 0
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python benchmark_js_minify.py <folder or .js file> [...]")
+        sys.exit(1)
+    sys.exit(main(sys.argv[1:]))
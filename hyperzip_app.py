@@ -4,6 +4,7 @@ from tkinter import filedialog, messagebox
 import os
 import sys
 import threading
+import multiprocessing
 import queue
 import json
 import io
@@ -20,7 +21,7 @@ from hyperzip_main import run_packing
 APP_NAME = "HyperZip GUI"
 CONFIG_FILE = "hyperzip_config.json"
 ARCHIVE_PROFILES = [
-    "winrar_zip", "winrar_rar", "7zip_7z", "7zip_zip", "zpaq_zpaq"
+    "winrar_zip", "winrar_rar", "7zip_7z", "7zip_zip", "zpaq_zpaq", "native_zip"
 ]
 
 # --- File Processing Results Frame ---
@@ -321,6 +322,9 @@ class HyperZipApp(ctk.CTk):
         self.minify_html_var = tk.BooleanVar(value=DEFAULT_SETTINGS["ENABLE_MINIFICATION"])
         self.minify_css_var = tk.BooleanVar(value=DEFAULT_SETTINGS["ENABLE_MINIFICATION"])
         self.minify_js_var = tk.BooleanVar(value=DEFAULT_SETTINGS["ENABLE_MINIFICATION"])
+        self.minify_svg_var = tk.BooleanVar(value=DEFAULT_SETTINGS["ENABLE_MINIFICATION"])
+        self.minify_json_var = tk.BooleanVar(value=DEFAULT_SETTINGS["ENABLE_MINIFICATION"])
+        self.minify_xml_var = tk.BooleanVar(value=DEFAULT_SETTINGS["ENABLE_MINIFICATION"])
         
         # Split image compression into PNG and JPEG
         self.compress_png_var = tk.BooleanVar(value=DEFAULT_SETTINGS["ENABLE_IMAGE_COMPRESSION"])
@@ -480,6 +484,18 @@ class HyperZipApp(ctk.CTk):
                                                  variable=self.minify_js_var)
         self.minify_js_checkbox.grid(row=0, column=2, padx=5, pady=5, sticky="w")
 
+        self.minify_svg_checkbox = ctk.CTkCheckBox(minify_frame, text="Minify SVG", 
+                                                  variable=self.minify_svg_var)
+        self.minify_svg_checkbox.grid(row=1, column=0, padx=5, pady=5, sticky="w")
+        
+        self.minify_json_checkbox = ctk.CTkCheckBox(minify_frame, text="Minify JSON", 
+                                                   variable=self.minify_json_var)
+        self.minify_json_checkbox.grid(row=1, column=1, padx=5, pady=5, sticky="w")
+        
+        self.minify_xml_checkbox = ctk.CTkCheckBox(minify_frame, text="Minify XML", 
+                                                  variable=self.minify_xml_var)
+        self.minify_xml_checkbox.grid(row=1, column=2, padx=5, pady=5, sticky="w")
+
         # Image Optimization section
         img_optim_frame = ctk.CTkFrame(optim_frame)
         img_optim_frame.grid(row=1, column=0, padx=10, pady=5, sticky="ew")
@@ -874,6 +890,7 @@ class HyperZipApp(ctk.CTk):
         self.log_message(f"Minify HTML: {self.minify_html_var.get()}")
         self.log_message(f"Minify CSS: {self.minify_css_var.get()}")
         self.log_message(f"Minify JS: {self.minify_js_var.get()}")
+        self.log_message(f"Minify SVG/JSON/XML: {self.minify_svg_var.get()}/{self.minify_json_var.get()}/{self.minify_xml_var.get()}")
         self.log_message(f"Compress PNG: {self.compress_png_var.get()}")
         self.log_message(f"Compress JPEG: {self.compress_jpeg_var.get()}")
         
@@ -900,7 +917,10 @@ class HyperZipApp(ctk.CTk):
             "ENABLE_MINIFICATION": {
                 "ENABLE_HTML_MINIFICATION": self.minify_html_var.get(),
                 "ENABLE_CSS_MINIFICATION": self.minify_css_var.get(),
-                "ENABLE_JS_MINIFICATION": self.minify_js_var.get()
+                "ENABLE_JS_MINIFICATION": self.minify_js_var.get(),
+                "ENABLE_SVG_MINIFICATION": self.minify_svg_var.get(),
+                "ENABLE_JSON_MINIFICATION": self.minify_json_var.get(),
+                "ENABLE_XML_MINIFICATION": self.minify_xml_var.get()
             },
             "ENABLE_PNG_COMPRESSION": self.compress_png_var.get(),
             "ENABLE_JPEG_COMPRESSION": self.compress_jpeg_var.get(),
@@ -1224,6 +1244,9 @@ class HyperZipApp(ctk.CTk):
                     self.minify_html_var.set(config.get("enable_html_minification", enable_minification))
                     self.minify_css_var.set(config.get("enable_css_minification", enable_minification))
                     self.minify_js_var.set(config.get("enable_js_minification", enable_minification))
+                    self.minify_svg_var.set(config.get("enable_svg_minification", enable_minification))
+                    self.minify_json_var.set(config.get("enable_json_minification", enable_minification))
+                    self.minify_xml_var.set(config.get("enable_xml_minification", enable_minification))
                     
                     # Set both PNG and JPEG compression from the same config value for backward compatibility
                     enable_image_compression = config.get("enable_image_compression", DEFAULT_SETTINGS["ENABLE_IMAGE_COMPRESSION"])
@@ -1258,6 +1281,9 @@ class HyperZipApp(ctk.CTk):
             "enable_html_minification": self.minify_html_var.get(),
             "enable_css_minification": self.minify_css_var.get(),
             "enable_js_minification": self.minify_js_var.get(),
+            "enable_svg_minification": self.minify_svg_var.get(),
+            "enable_json_minification": self.minify_json_var.get(),
+            "enable_xml_minification": self.minify_xml_var.get(),
             "enable_png_compression": self.compress_png_var.get(),
             "enable_jpeg_compression": self.compress_jpeg_var.get(),
             "enable_image_compression": self.compress_png_var.get() or self.compress_jpeg_var.get(),
@@ -1503,6 +1529,7 @@ class HyperZipApp(ctk.CTk):
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support() # Process pool workers in frozen builds
     app = HyperZipApp()
     app.protocol("WM_DELETE_WINDOW", app.on_closing)
     app.mainloop()
@@ -1,14 +1,25 @@
 import os
-import subprocess
 import math
 import shutil
 import io
-from hyperzip_core import _log_func, Fore, Style
-from hyperzip_utils import create_temp_folder, process_files_in_folder
+import zipfile
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from hyperzip_core import _log_func, Fore, Style, JPEG_EXTENSIONS
+from hyperzip_utils import create_temp_folder, process_files_in_folder, get_cache_dir
+from hyperzip_libraries import load_library_rules, LIBRARY_RULES_FILE
+from hyperzip_zip import (native_zip_bytes, optimize_zip_bytes, select_entry_methods_bytes, minimize_zip_layout_bytes,
+                          describe_zip_entries, write_archive_file)
+from hyperzip_cache import load_json_file, save_json_file
+from hyperzip_scheduler import get_archiver_scheduler
+from hyperzip_order import order_archive_entries, write_list_file
 
 # --- Archive Profiles ---
 def get_archive_profiles(settings):
     """Build archive profiles configuration from settings."""
+    # Solid RAR only pays off with the ordered list file, which is opt-in for WinRAR
+    winrar_solid = settings.get('SOLID_ENTRY_ORDERING', True) and settings.get('WINRAR_SOLID_ORDERING', False)
     return {
         "winrar_zip": {
             "tool_family": "winrar",
@@ -20,7 +31,7 @@ def get_archive_profiles(settings):
             "tool_family": "winrar",
             "executable": settings['winrar_path'],
             "extension": ".rar",
-            "params": "-m5 -ma5 -rr5p"
+            "params": "-m5 -ma5 -rr5p -s" if winrar_solid else "-m5 -ma5 -rr5p"
         },
         "7zip_7z": {
             "tool_family": "7zip",
@@ -39,13 +50,396 @@ def get_archive_profiles(settings):
             "executable": settings['zpaq_path'],
             "extension": ".zpaq",
             "params": "-m5"
+        },
+        "native_zip": {
+            "tool_family": "native",
+            "executable": None, # Written in-process by hyperzip_zip
+            "extension": ".zip",
+            "params": settings.get('NATIVE_ZIP_PARAMS', "-mx=9")
         }
     }
 
+SOLID_ARCHIVE_EXTENSIONS = {".7z", ".rar"}
+
+# --- Result Manifest ---
+ARCHIVE_MANIFEST_FOLDER = "manifests"
+
+def write_archive_manifest(cache_dir, archive_path, profile_name, quality_settings):
+    """Writes _hyperzip_cache/manifests/<archive>.json describing the archive on disk: its size, the
+       settings it was built with and, for ZIP output, each entry's size and store/deflate method."""
+    if not cache_dir:
+        return
+    manifest = {
+        "archive": os.path.basename(archive_path),
+        "profile": profile_name,
+        "size": os.path.getsize(archive_path),
+        "png_level": quality_settings[0],
+        "jpeg_quality": quality_settings[1],
+        "jpeg_subsampling": quality_settings[2],
+    }
+    if archive_path.lower().endswith(".zip"):
+        try:
+            manifest["entries"] = describe_zip_entries(archive_path)
+        except (OSError, zipfile.BadZipFile) as e:
+            _log_func(f"  {Fore.YELLOW}Warn: Cannot list archive entries for the manifest: {e}{Style.RESET_ALL}")
+    manifest_dir = os.path.join(cache_dir, ARCHIVE_MANIFEST_FOLDER)
+    try:
+        os.makedirs(manifest_dir, exist_ok=True)
+    except OSError as e:
+        _log_func(f"  {Fore.YELLOW}Warn: Cannot create manifest folder {manifest_dir}: {e}{Style.RESET_ALL}")
+        return
+    save_json_file(os.path.join(manifest_dir, f"{os.path.basename(archive_path)}.json"), manifest)
+
+# --- Archive Creation ---
+def get_candidate_profiles(settings, archive_profiles_config):
+    """Returns the profiles each folder is archived with: OUTPUT_PROFILES if set (every format is
+       emitted), else ALLOWED_ARCHIVE_PROFILES (the smallest archive wins), else just ARCHIVE_PROFILE.
+       Unknown names are left out."""
+    profile_names = settings.get('OUTPUT_PROFILES') or settings.get('ALLOWED_ARCHIVE_PROFILES') or [settings['ARCHIVE_PROFILE']]
+    return [name for name in dict.fromkeys(profile_names) if name in archive_profiles_config]
+
+def create_profile_archive(temp_folder, base_dir, staged_archive_path, profile_name, profile_config, settings):
+    """Archives the processed temp folder with one profile and applies the ZIP layout and store/deflate
+       passes in memory. External archivers write to staged_archive_path (replaced first, since archivers
+       add to an existing archive), which is read back and removed; native_zip never touches the disk.
+       Returns the archive bytes, or None if the archiver failed."""
+    tool_family = profile_config["tool_family"]
+    archiver_executable = profile_config["executable"]
+    archive_extension = profile_config["extension"]
+    base_compression_params = profile_config["params"]
+    archive_file_name = os.path.basename(staged_archive_path)
+
+    if tool_family != "native":
+        os.makedirs(os.path.dirname(staged_archive_path), exist_ok=True)
+        if os.path.exists(staged_archive_path):
+            os.remove(staged_archive_path)
+    cmd = []
+    subprocess_cwd = None
+    archive_creation_successful = False
+    archive_bytes = None
+    temp_folder_basename = os.path.basename(temp_folder)
+
+    # Get exclusions from settings
+    exclusion_patterns = settings.get("ARCHIVE_EXCLUSIONS", "").split()
+    exclusion_args = []
+
+    params_list = base_compression_params.split()
+
+    # Solid formats get their entries in a similarity-aware order through a list file
+    # (WinRAR only with WINRAR_SOLID_ORDERING; otherwise it keeps the recursive '-r -ep1 .' command)
+    list_file_path = None
+    ordering_tools = ("winrar", "7zip") if settings.get('WINRAR_SOLID_ORDERING', False) else ("7zip",)
+    if (settings.get('SOLID_ENTRY_ORDERING', True) and archive_extension in SOLID_ARCHIVE_EXTENSIONS
+            and tool_family in ordering_tools):
+        try:
+            list_file_path = write_list_file(order_archive_entries(temp_folder, exclusion_patterns))
+        except OSError as order_e:
+            _log_func(f"  {Fore.YELLOW}Warn: Entry ordering skipped: {order_e}{Style.RESET_ALL}")
+
+    # --- Build Archiver Command ---
+    if tool_family == "winrar":
+        subprocess_cwd = temp_folder # Run from inside temp
+        content_to_archive = "." # Archive current dir contents
+        cmd = [ archiver_executable, "a", "-r", "-ep1", "-ibck", "-y" ]
+        if list_file_path:
+            # Listed files in listed order: no recursion (a name would also match in subfolders),
+            # no sorting by extension (-ds), UTF-8 list file (-scfl). No -ep1: the listed paths are
+            # already relative to the CWD, and -ep1 would strip their folders (js/main.js -> main.js)
+            content_to_archive = f"@{list_file_path}"
+            cmd = [ archiver_executable, "a", "-ibck", "-y", "-ds", "-scfl" ]
+        cmd.extend(params_list)
+        # Add WinRAR exclusions
+        for pattern in exclusion_patterns:
+            exclusion_args.append(f"-x{pattern}")
+        # Exclude the temp folder itself if archiving from within (shouldn't be needed for '.')
+        # exclusion_args.append(f"-x*{temp_folder_basename}{os.sep}") 
+        cmd.extend(exclusion_args)
+        # WinRAR needs archive path relative to CWD
+        relative_archive_path = os.path.relpath(staged_archive_path, start=temp_folder)
+        cmd.append(relative_archive_path)
+        cmd.append(content_to_archive)
+    elif tool_family == "7zip":
+        subprocess_cwd = temp_folder # Run from inside temp
+        content_to_archive = "*" # Archive everything in current dir
+        cmd = [ archiver_executable, "a", "-y", "-r" ]
+        if list_file_path:
+            content_to_archive = f"@{list_file_path}" # Kept in list order (7-Zip's default qs=off)
+            cmd = [ archiver_executable, "a", "-y", "-scsUTF-8" ]
+        cmd.extend(params_list)
+        # 7zip can use absolute path for archive
+        cmd.append(staged_archive_path)
+        # Add 7zip exclusions
+        for pattern in exclusion_patterns:
+            exclusion_args.append(f"-x!{pattern}")
+        cmd.extend(exclusion_args)
+        cmd.append(content_to_archive)
+    elif tool_family == "zpaq":
+        subprocess_cwd = base_dir # Run from the directory containing temp folder
+        content_to_archive = temp_folder_basename # Archive the temp folder itself
+        cmd = [ archiver_executable, "a", staged_archive_path, content_to_archive]
+        cmd.extend(params_list)
+        # Add ZPAQ exclusions
+        for pattern in exclusion_patterns:
+            exclusion_args.extend(["-not", pattern])
+        cmd.extend(exclusion_args)
+        cmd.append("-quiet")
+    elif tool_family == "native":
+        # No subprocess: the archive is built in memory from the temp folder
+        try:
+            archive_bytes = native_zip_bytes(temp_folder, base_compression_params, exclusion_patterns)
+            archive_creation_successful = True
+        except (OSError, ValueError) as native_e:
+            _log_func(f"{Fore.RED}Error writing native ZIP {archive_file_name}: {native_e}{Style.RESET_ALL}")
+            return None
+    else:
+        _log_func(f"{Fore.RED}Internal Error: Invalid tool_family '{tool_family}' in profile '{profile_name}'.{Style.RESET_ALL}")
+        raise ValueError(f"Invalid tool family: {tool_family}")
+
+    # --- Execute Archiving Command ---
+    if cmd:
+        # _log_func(f"  {Fore.WHITE}DEBUG: Executing Archiver Command:{Style.RESET_ALL}") # Removed DEBUG log
+        # _log_func(f"  {Fore.WHITE}DEBUG: CWD: {subprocess_cwd}{Style.RESET_ALL}") # Removed DEBUG log
+        # Safely join command parts for logging, handling potential non-string elements
+        cmd_str = ' '.join(map(str, cmd))
+        # _log_func(f"  {Fore.WHITE}DEBUG: CMD: {cmd_str}{Style.RESET_ALL}") # Removed DEBUG log
+        try:
+            result, archiver_job = get_archiver_scheduler().run(cmd, tool_family, cwd=subprocess_cwd, label=archive_file_name)
+            cpu_text = f", {archiver_job['cpu']:.2f}s CPU" if archiver_job['cpu'] is not None else ""
+            _log_func(f"  {Fore.WHITE}Archiver: {archiver_job['wall']:.2f}s wall{cpu_text} ({archiver_job['threads']} thread(s)).{Style.RESET_ALL}")
+            if result.returncode == 0:
+                archive_creation_successful = True
+            else:
+                # Log stderr first if available, otherwise stdout
+                error_msg = result.stderr.strip() if result.stderr else result.stdout.strip()
+                if not error_msg: error_msg = f"{tool_family} failed with code {result.returncode}"
+                _log_func(f"  {Fore.RED}{tool_family} Error/Warning (Code: {result.returncode}): {error_msg}{Style.RESET_ALL}")
+                archive_creation_successful = False # Treat warnings/errors as failure for loop control
+
+            if not archive_creation_successful or not os.path.exists(staged_archive_path):
+                _log_func(f"  {Fore.RED}Error: Archive file {archive_file_name} creation failed or file missing.{Style.RESET_ALL}")
+                return None
+            with open(staged_archive_path, 'rb') as f:
+                archive_bytes = f.read()
+            os.remove(staged_archive_path)
+        except FileNotFoundError:
+            _log_func(f"{Fore.RED}Error: Archiver executable not found at '{archiver_executable}'. Check path.{Style.RESET_ALL}")
+            return None
+        except Exception as subproc_e:
+            _log_func(f"{Fore.RED}Error running archiver: {subproc_e}{Style.RESET_ALL}")
+            return None
+        finally:
+            if list_file_path:
+                try: os.remove(list_file_path)
+                except OSError: pass
+
+    # Strip the archiver's ZIP overhead: extra fields, directory entries, varying timestamps
+    if archive_extension == ".zip" and settings.get('ZIP_MINIMAL_LAYOUT', False):
+        try:
+            minimal_bytes = minimize_zip_layout_bytes(archive_bytes)
+            if len(minimal_bytes) != len(archive_bytes):
+                _log_func(f"  {Fore.WHITE}Minimal ZIP layout: {len(archive_bytes) - len(minimal_bytes)} bytes saved over the {tool_family} output.{Style.RESET_ALL}")
+            archive_bytes = minimal_bytes
+        except (ValueError, zipfile.BadZipFile) as layout_e:
+            _log_func(f"  {Fore.YELLOW}Warn: Minimal ZIP layout skipped: {layout_e}{Style.RESET_ALL}")
+
+    # Store or deflate each ZIP entry, whichever the trial compression favours
+    if archive_extension == ".zip" and settings.get('ZIP_STORE_SELECTION', False):
+        try:
+            archive_bytes, switched_to_store, switched_to_deflate = select_entry_methods_bytes(archive_bytes, settings.get('ZIP_STORE_MIN_DEFLATE_GAIN_PCT', 0))
+            if switched_to_store or switched_to_deflate:
+                _log_func(f"  {Fore.WHITE}Entry methods: {switched_to_store} switched to store, {switched_to_deflate} to deflate.{Style.RESET_ALL}")
+        except (ValueError, zipfile.BadZipFile) as select_e:
+            _log_func(f"  {Fore.YELLOW}Warn: Store/deflate selection skipped: {select_e}{Style.RESET_ALL}")
+
+    return archive_bytes
+
+def archive_workspace(temp_folder, base_dir, staging_folder, folder_name, profile_names, archive_profiles_config, settings):
+    """Archives the processed temp folder with every profile in profile_names, concurrently when there
+       are several; external archivers write into staging_folder/<profile>/. Returns {profile name: archive bytes}
+       for the profiles that succeeded."""
+    def archive_with(profile_name):
+        profile_config = archive_profiles_config[profile_name]
+        staged_archive_path = os.path.join(staging_folder, profile_name, f"{folder_name}{profile_config['extension']}")
+        return create_profile_archive(temp_folder, base_dir, staged_archive_path, profile_name, profile_config, settings)
+
+    if len(profile_names) > 1:
+        with ThreadPoolExecutor(max_workers=len(profile_names)) as executor:
+            outcomes = list(executor.map(archive_with, profile_names))
+    else:
+        outcomes = [archive_with(profile_name) for profile_name in profile_names]
+    return {profile_name: archive_bytes for profile_name, archive_bytes in zip(profile_names, outcomes) if archive_bytes is not None}
+
+# --- Emitting Archives ---
+STAGING_FOLDER_SUFFIX = "_archive_temp" # Ends in _temp: skipped as input and removed by cleanup_temp_folders
+
+def exhaustive_deflate_bytes(archive_bytes, cache_dir, settings, label=None):
+    """Runs the exhaustive DEFLATE pass on ZIP bytes in memory, returning the original bytes if it fails."""
+    try:
+        optimized_bytes = optimize_zip_bytes(archive_bytes, settings.get('EXHAUSTIVE_DEFLATE_ITERATIONS', 15), cache_dir)
+    except (OSError, ValueError, zipfile.BadZipFile) as deflate_e:
+        _log_func(f"  {Fore.YELLOW}Warn: Exhaustive DEFLATE pass skipped: {deflate_e}{Style.RESET_ALL}")
+        return archive_bytes
+    if len(optimized_bytes) < len(archive_bytes):
+        label_text = f" ({label})" if label else ""
+        _log_func(f"  {Fore.CYAN}Exhaustive DEFLATE{label_text}: {len(archive_bytes)/1024:.2f} KB -> {len(optimized_bytes)/1024:.2f} KB{Style.RESET_ALL}")
+    return optimized_bytes
+
+def emit_archive(archive_bytes, archive_path, quality_settings, profile_name, cache_dir, settings):
+    """Writes the chosen attempt's archive to its final place, once: the exhaustive DEFLATE pass for
+       ZIP output (if enabled), an atomic replace of the previous archive, then the manifest.
+       Returns the final size in KB, or None if the archive could not be written."""
+    if settings.get('EXHAUSTIVE_DEFLATE', False) and archive_path.lower().endswith(".zip"):
+        archive_bytes = exhaustive_deflate_bytes(archive_bytes, cache_dir, settings)
+    try:
+        write_archive_file(archive_path, archive_bytes)
+    except OSError as e:
+        _log_func(f"{Fore.RED}Error: Cannot write {os.path.basename(archive_path)}: {e}{Style.RESET_ALL}")
+        return None
+    write_archive_manifest(cache_dir, archive_path, profile_name, quality_settings)
+    return len(archive_bytes) / 1024.0
+
+# --- Unchanged Folder Detection ---
+BUILD_FINGERPRINT_VERSION = 2 # Bump when processing changes enough that unchanged inputs need a rebuild
+# Settings that do not change the archive contents: credentials, paths, scheduling and cache tuning
+FINGERPRINT_IGNORED_SETTINGS = {'TINIFY_API_KEY', 'TINIFY_API_KEY_VALID', 'PROJECT_FOLDER', 'SKIP_UNCHANGED_FOLDERS',
+                                'ARCHIVE_JOBS', 'ARCHIVER_THREADS', 'PARALLEL_MINIFICATION',
+                                'ENABLE_MINIFY_CACHE', 'MINIFY_CACHE_MAX_MB'}
+
+def _manifest_path(cache_dir, archive_file_name):
+    return os.path.join(cache_dir, ARCHIVE_MANIFEST_FOLDER, f"{archive_file_name}.json")
+
+def compute_input_fingerprint(folder_path):
+    """SHA-256 over every source file's relative path and content."""
+    digest = hashlib.sha256()
+    entries = []
+    for root, _, files in os.walk(folder_path):
+        for file in files:
+            file_path = os.path.join(root, file)
+            entries.append((os.path.relpath(file_path, folder_path).replace(os.sep, '/'), file_path))
+    for relative_path, file_path in sorted(entries):
+        file_digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                file_digest.update(chunk)
+        digest.update(relative_path.encode('utf-8', 'surrogateescape') + b'\0' + file_digest.digest())
+    return digest.hexdigest()
+
+def compute_settings_fingerprint(settings, profile_configs, base_dir):
+    """SHA-256 over the effective settings, the archive profiles and the project's library rule file."""
+    effective = {key: value for key, value in settings.items() if key not in FINGERPRINT_IGNORED_SETTINGS}
+    payload = json.dumps({"version": BUILD_FINGERPRINT_VERSION, "settings": effective, "profiles": profile_configs},
+                         sort_keys=True, default=str)
+    digest = hashlib.sha256(payload.encode('utf-8'))
+    try:
+        with open(os.path.join(base_dir, LIBRARY_RULES_FILE), 'rb') as f:
+            digest.update(f.read())
+    except OSError:
+        pass
+    return digest.hexdigest()
+
+def _unchanged_build(cache_dir, archive_path, inputs_fingerprint, settings_fingerprint):
+    """Returns the build record of the archive's manifest if it matches both fingerprints and the
+       archive is still on disk untouched, else None."""
+    manifest = load_json_file(_manifest_path(cache_dir, os.path.basename(archive_path)), default=None)
+    if not isinstance(manifest, dict) or not isinstance(manifest.get("build"), dict):
+        return None
+    build = manifest["build"]
+    if build.get("inputs") != inputs_fingerprint or build.get("settings") != settings_fingerprint:
+        return None
+    try:
+        archive_stat = os.stat(archive_path)
+    except OSError:
+        return None
+    if archive_stat.st_size != manifest.get("size") or archive_stat.st_mtime_ns != build.get("archive_mtime_ns"):
+        return None
+    return build
+
+def find_unchanged_result(cache_dir, base_dir, archive_names, inputs_fingerprint, settings_fingerprint):
+    """Returns the recorded (size KB, original size KB, PNG level, JPEG quality, {archive: size KB}) if one
+       of archive_names was built successfully from the same inputs and settings and every archive of
+       that build is still on disk untouched, else None."""
+    for archive_name in archive_names:
+        build = _unchanged_build(cache_dir, os.path.join(base_dir, archive_name), inputs_fingerprint, settings_fingerprint)
+        result = build.get("result") if build else None
+        if not isinstance(result, list) or len(result) != 5 or not isinstance(result[4], dict) or not result[4]:
+            continue
+        if all(_unchanged_build(cache_dir, os.path.join(base_dir, name), inputs_fingerprint, settings_fingerprint)
+               for name in result[4]):
+            return tuple(result)
+    return None
+
+def record_build_fingerprint(cache_dir, archive_path, inputs_fingerprint, settings_fingerprint, result):
+    """Adds the inputs/settings fingerprints and the returned result to the archive's manifest."""
+    manifest_path = _manifest_path(cache_dir, os.path.basename(archive_path))
+    manifest = load_json_file(manifest_path, default=None)
+    try:
+        archive_stat = os.stat(archive_path)
+    except OSError:
+        return
+    if not isinstance(manifest, dict):
+        manifest = {"archive": os.path.basename(archive_path)}
+    manifest["size"] = archive_stat.st_size
+    manifest["build"] = {"inputs": inputs_fingerprint, "settings": settings_fingerprint,
+                         "archive_mtime_ns": archive_stat.st_mtime_ns, "result": list(result)}
+    try:
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    except OSError:
+        return
+    save_json_file(manifest_path, manifest)
+
+# --- Folder Content Check ---
+def _folder_has_extensions(folder_path, extensions):
+    """Returns True if any file under folder_path has one of the given (lowercase) extensions."""
+    for _, _, files in os.walk(folder_path):
+        for file in files:
+            if os.path.splitext(file)[1].lower() in extensions:
+                return True
+    return False
+
 # --- Main Processing and Archiving Loop for a Single Folder ---
 def process_and_archive_folder(folder_path, base_dir, settings, archive_profiles_config):
     """Copies, processes, archives (using selected profile), and adjusts quality for one folder.
-       Returns final size, original size, final PNG level, final JPEG quality."""
+       Skips the folder if its files and the effective settings match the last successful build
+       and that archive is still in place.
+       Returns final size, original size, final PNG level, final JPEG quality and {archive file name: size KB}
+       for the archive(s) written."""
+    candidate_profiles = get_candidate_profiles(settings, archive_profiles_config)
+    cache_dir = get_cache_dir(base_dir)
+    if not settings.get('SKIP_UNCHANGED_FOLDERS', True) or not candidate_profiles or cache_dir is None:
+        return _build_folder_archive(folder_path, base_dir, settings, archive_profiles_config)
+
+    folder_name = os.path.basename(folder_path)
+    try:
+        inputs_fingerprint = compute_input_fingerprint(folder_path)
+    except OSError as e:
+        _log_func(f"  {Fore.YELLOW}Warn: Cannot fingerprint {folder_name}, rebuilding: {e}{Style.RESET_ALL}")
+        return _build_folder_archive(folder_path, base_dir, settings, archive_profiles_config)
+    settings_fingerprint = compute_settings_fingerprint(settings, {name: archive_profiles_config[name] for name in candidate_profiles}, base_dir)
+
+    archive_names = [f"{folder_name}{archive_profiles_config[name]['extension']}" for name in candidate_profiles]
+    unchanged_result = find_unchanged_result(cache_dir, base_dir, archive_names, inputs_fingerprint, settings_fingerprint)
+    if unchanged_result is not None:
+        _log_func(f"  {Fore.GREEN}Unchanged since the last build, keeping {', '.join(unchanged_result[4])} ({unchanged_result[0]:.2f} KB).{Style.RESET_ALL}")
+        return unchanged_result
+
+    result = _build_folder_archive(folder_path, base_dir, settings, archive_profiles_config)
+    if result[0] != -1 and result[0] <= settings['max_size_kb']:
+        for archive_name in result[4]:
+            record_build_fingerprint(cache_dir, os.path.join(base_dir, archive_name), inputs_fingerprint, settings_fingerprint, result)
+    return result
+
+def _build_folder_archive(folder_path, base_dir, settings, archive_profiles_config):
+    """Runs the processing and archiving attempts for one folder (see process_and_archive_folder)
+       and removes its staging folder (external archivers' output), whatever the outcome."""
+    try:
+        return _run_archive_attempts(folder_path, base_dir, settings, archive_profiles_config)
+    finally:
+        shutil.rmtree(os.path.join(base_dir, f"{os.path.basename(folder_path)}{STAGING_FOLDER_SUFFIX}"), ignore_errors=True)
+
+def _run_archive_attempts(folder_path, base_dir, settings, archive_profiles_config):
+    """Archives processed copies of the folder at decreasing (or, when searching for the optimum, increasing)
+       quality, keeping each attempt's archive in memory, and writes only the chosen attempt's archive to base_dir.
+       Only the current, best-fit and previous attempts' archives are held."""
     
     # Calculate original folder size
     from hyperzip_utils import get_folder_size
@@ -68,12 +462,24 @@ def process_and_archive_folder(folder_path, base_dir, settings, archive_profiles
     enable_png_compression = settings.get('ENABLE_PNG_COMPRESSION', enable_image_compression)
     enable_jpeg_compression = settings.get('ENABLE_JPEG_COMPRESSION', enable_image_compression)
     
+    enable_asset_registry = settings.get('ENABLE_ASSET_REGISTRY', True)
+    cache_dir = get_cache_dir(base_dir)
+    library_rules = load_library_rules(base_dir) if settings.get('ENABLE_LIBRARY_DETECTION', True) else None
+
     tinify_api_key_valid = settings['TINIFY_API_KEY_VALID'] # Initial status
     # Get the PNG compressor setting, default to 'tinypng' if missing
     png_compressor = settings.get('png_compressor', 'tinypng').lower() 
 
+    # Chroma subsampling is an extra search axis in 'auto' mode (only worth it if the folder has JPEGs)
+    jpeg_subsampling_setting = settings.get('JPEG_SUBSAMPLING', '4:2:0')
+    jpeg_progressive = settings.get('JPEG_PROGRESSIVE', 'auto')
+    subsampling_axis = jpeg_subsampling_setting == 'auto' and enable_jpeg_compression and _folder_has_extensions(folder_path, JPEG_EXTENSIONS)
+    if jpeg_subsampling_setting == 'auto':
+        jpeg_subsampling_setting = '4:4:4' if subsampling_axis else '4:2:0'
+
     current_png_level = initial_png_level
     current_jpeg_quality = initial_jpeg_quality
+    current_jpeg_subsampling = jpeg_subsampling_setting
     attempt = 1
 
     last_archive_size_kb = -1
@@ -81,26 +487,48 @@ def process_and_archive_folder(folder_path, base_dir, settings, archive_profiles
     best_fit_size_kb = -1
     best_fit_settings_tuple = None
 
-    # Get Profile Specifics from the passed config
-    profile_name = settings['ARCHIVE_PROFILE']
-    if profile_name not in archive_profiles_config:
-        _log_func(f"{Fore.RED}Error: Profile '{profile_name}' not found in provided config.{Style.RESET_ALL}")
-        return -1, original_size_kb, initial_png_level, initial_jpeg_quality # Error state
-
-    profile_config = archive_profiles_config[profile_name]
-    tool_family = profile_config["tool_family"]
-    archiver_executable = profile_config["executable"]
-    archive_extension = profile_config["extension"]
-    base_compression_params = profile_config["params"]
-
-    archive_file_name = f"{os.path.basename(folder_path)}{archive_extension}"
-    # Place archive in the *base_dir* (where the original folders are), not inside temp
-    archive_file_path = os.path.join(base_dir, archive_file_name)
-
-    _log_func(f"{Fore.YELLOW}Using Profile: {profile_name} (Tool: {tool_family}, Ext: {archive_extension}, Params: '{base_compression_params}'){Style.RESET_ALL}")
+    # Get Profile Specifics from the passed config (several profiles with OUTPUT_PROFILES or ALLOWED_ARCHIVE_PROFILES)
+    candidate_profiles = get_candidate_profiles(settings, archive_profiles_config)
+    emit_all_profiles = bool(settings.get('OUTPUT_PROFILES'))
+    if not candidate_profiles:
+        _log_func(f"{Fore.RED}Error: Profile '{settings['ARCHIVE_PROFILE']}' not found in provided config.{Style.RESET_ALL}")
+        return -1, original_size_kb, initial_png_level, initial_jpeg_quality, {} # Error state
+
+    exhaustive_deflate = settings.get('EXHAUSTIVE_DEFLATE', False)
+    exhaustive_deflate_reach = settings.get('EXHAUSTIVE_DEFLATE_REACH_PCT', 3) / 100.0
+
+    folder_name = os.path.basename(folder_path)
+    # Attempts are only measured; the chosen one is written into base_dir once. External archivers
+    # need a file to write to, which goes to the staging folder and is read back right away
+    staging_folder = os.path.join(base_dir, f"{folder_name}{STAGING_FOLDER_SUFFIX}")
+    best_fit_staged = None # {profile name: archive bytes}
+    last_staged = None
+    # PNG->JPEG conversions of each kept attempt; only the emitted attempt's go to the review log
+    best_fit_review_lines = []
+    last_review_lines = []
+
+    def emit_result(staged, quality_settings, review_lines):
+        """Writes the archives ({profile name: archive bytes}) of the chosen attempt and its PNG->JPEG review
+           log entries. The reported size is the largest of them, since every emitted format has to fit the limit."""
+        written_archives = {}
+        for staged_profile_name, archive_bytes in staged.items():
+            # Place archive in the *base_dir* (where the original folders are), not inside temp
+            archive_file_name = f"{folder_name}{archive_profiles_config[staged_profile_name]['extension']}"
+            final_size_kb = emit_archive(archive_bytes, os.path.join(base_dir, archive_file_name), quality_settings,
+                                         staged_profile_name, cache_dir, settings)
+            if final_size_kb is None:
+                return -1, original_size_kb, quality_settings[0], quality_settings[1], written_archives
+            written_archives[archive_file_name] = final_size_kb
+        from hyperzip_image import write_png_to_jpeg_review_log
+        write_png_to_jpeg_review_log(cache_dir, folder_name, review_lines)
+        return max(written_archives.values()), original_size_kb, quality_settings[0], quality_settings[1], written_archives
+
+    for candidate_name in candidate_profiles:
+        candidate_config = archive_profiles_config[candidate_name]
+        _log_func(f"{Fore.YELLOW}Using Profile: {candidate_name} (Tool: {candidate_config['tool_family']}, Ext: {candidate_config['extension']}, Params: '{candidate_config['params']}'){Style.RESET_ALL}")
 
     while True: # Loop for quality adjustment attempts
-        _log_func(f"{Fore.MAGENTA}--- Attempt {attempt} for: {os.path.basename(folder_path)} ({profile_name}) ---{Style.RESET_ALL}")
+        _log_func(f"{Fore.MAGENTA}--- Attempt {attempt} for: {folder_name} ({', '.join(candidate_profiles)}) ---{Style.RESET_ALL}")
         # DEBUG: Log quality values at the START of the attempt
         # _log_func(f"  {Fore.WHITE}DEBUG: Starting Attempt {attempt} with PNG={int(current_png_level)}, JPEG={int(current_jpeg_quality)}{Style.RESET_ALL}") # Removed DEBUG log
         # _log_func(f"{Fore.MAGENTA}Settings: PNG={int(current_png_level)}, JPEG={int(current_jpeg_quality)}{Style.RESET_ALL}") # Original log, commented out for clarity
@@ -108,20 +536,43 @@ def process_and_archive_folder(folder_path, base_dir, settings, archive_profiles
         temp_folder = None
         file_size_kb = -1
         original_image_size_sum = 0
+        review_lines = []
 
         try:
             # 1. Create temp copy in base_dir
             temp_folder = create_temp_folder(folder_path, base_dir)
             if temp_folder is None:
                 _log_func(f"{Fore.RED}Critical error: Failed to create temp folder. Skipping.{Style.RESET_ALL}")
-                return -1, initial_png_level, initial_jpeg_quality
+                return -1, original_size_kb, initial_png_level, initial_jpeg_quality, {}
 
             # 2. Process files in temp copy (pass relevant settings)
             # Create a settings dictionary to pass to process_files_in_folder
             process_settings = {
                 'ENABLE_MINIFICATION': enable_minification,
+                'PARALLEL_MINIFICATION': settings.get('PARALLEL_MINIFICATION', True),
+                'ENABLE_MINIFY_CACHE': settings.get('ENABLE_MINIFY_CACHE', True),
+                'MINIFY_CACHE_MAX_MB': settings.get('MINIFY_CACHE_MAX_MB', 64),
+                'JSON_FLOAT_PRECISION': settings.get('JSON_FLOAT_PRECISION'),
+                'ENABLE_JS_MANGLING': settings.get('ENABLE_JS_MANGLING', False),
+                'ENABLE_TEXT_NORMALIZATION': settings.get('ENABLE_TEXT_NORMALIZATION', False),
+                'ENABLE_CSS_PURGE': settings.get('ENABLE_CSS_PURGE', False),
+                'CSS_PURGE_SAFELIST': settings.get('CSS_PURGE_SAFELIST', []),
+                'ENABLE_LIBRARY_DETECTION': settings.get('ENABLE_LIBRARY_DETECTION', True),
+                'LIBRARY_DEFAULT_ACTION': settings.get('LIBRARY_DEFAULT_ACTION', 'skip'),
+                'LIBRARY_RULES': library_rules,
+                'ENABLE_FONT_SUBSETTING': settings.get('ENABLE_FONT_SUBSETTING', False),
+                'FONT_SUBSET_EXTRA_CHARS': settings.get('FONT_SUBSET_EXTRA_CHARS', ''),
+                'FONT_SUBSET_TO_WOFF2': settings.get('FONT_SUBSET_TO_WOFF2', True),
                 'ENABLE_PNG_COMPRESSION': enable_png_compression,
-                'ENABLE_JPEG_COMPRESSION': enable_jpeg_compression
+                'ENABLE_JPEG_COMPRESSION': enable_jpeg_compression,
+                'ENABLE_ASSET_REGISTRY': enable_asset_registry,
+                'CACHE_DIR': cache_dir,
+                'JPEG_SUBSAMPLING': current_jpeg_subsampling,
+                'JPEG_PROGRESSIVE': jpeg_progressive,
+                'CONVERT_PHOTO_PNG_TO_JPEG': settings.get('CONVERT_PHOTO_PNG_TO_JPEG', False),
+                'PNG_TO_JPEG_REVIEW': review_lines,
+                'ENABLE_DATA_URI_COMPRESSION': settings.get('ENABLE_DATA_URI_COMPRESSION', True),
+                'EXTERNALIZE_DATA_URIS': settings.get('EXTERNALIZE_DATA_URIS', False)
             }
             
             saved_bytes, original_image_size_sum, tinify_api_key_valid = process_files_in_folder(
@@ -137,111 +588,45 @@ def process_and_archive_folder(folder_path, base_dir, settings, archive_profiles
                 if temp_folder and os.path.exists(temp_folder):
                     shutil.rmtree(temp_folder, ignore_errors=True)
                 # Return error state or last known good state? Returning error for now.
-                return -1, original_size_kb, current_png_level, current_jpeg_quality
-
-            # 3. Archive the temporary folder
-            cmd = []
-            subprocess_cwd = None
-            archive_creation_successful = False
-            temp_folder_basename = os.path.basename(temp_folder)
-
-            # Get exclusions from settings
-            exclusion_patterns = settings.get("ARCHIVE_EXCLUSIONS", "").split()
-            exclusion_args = []
-
-            params_list = base_compression_params.split()
-
-            # --- Build Archiver Command ---
-            if tool_family == "winrar":
-                subprocess_cwd = temp_folder # Run from inside temp
-                content_to_archive = "." # Archive current dir contents
-                cmd = [ archiver_executable, "a", "-r", "-ep1", "-ibck", "-y" ]
-                cmd.extend(params_list)
-                # Add WinRAR exclusions
-                for pattern in exclusion_patterns:
-                    exclusion_args.append(f"-x{pattern}")
-                # Exclude the temp folder itself if archiving from within (shouldn't be needed for '.')
-                # exclusion_args.append(f"-x*{temp_folder_basename}{os.sep}") 
-                cmd.extend(exclusion_args)
-                # WinRAR needs archive path relative to CWD
-                relative_archive_path = os.path.relpath(archive_file_path, start=temp_folder)
-                cmd.append(relative_archive_path)
-                cmd.append(content_to_archive)
-            elif tool_family == "7zip":
-                subprocess_cwd = temp_folder # Run from inside temp
-                content_to_archive = "*" # Archive everything in current dir
-                cmd = [ archiver_executable, "a", "-y", "-r" ]
-                cmd.extend(params_list)
-                # 7zip can use absolute path for archive
-                cmd.append(archive_file_path)
-                # Add 7zip exclusions
-                for pattern in exclusion_patterns:
-                    exclusion_args.append(f"-x!{pattern}")
-                cmd.extend(exclusion_args)
-                cmd.append(content_to_archive)
-            elif tool_family == "zpaq":
-                subprocess_cwd = base_dir # Run from the directory containing temp folder
-                content_to_archive = temp_folder_basename # Archive the temp folder itself
-                cmd = [ archiver_executable, "a", archive_file_path, content_to_archive]
-                cmd.extend(params_list)
-                # Add ZPAQ exclusions
-                for pattern in exclusion_patterns:
-                    exclusion_args.extend(["-not", pattern])
-                cmd.extend(exclusion_args)
-                cmd.append("-quiet")
-            else:
-                _log_func(f"{Fore.RED}Internal Error: Invalid tool_family '{tool_family}' in profile '{profile_name}'.{Style.RESET_ALL}")
-                raise ValueError(f"Invalid tool family: {tool_family}")
-
-            # --- Execute Archiving Command ---
-            if cmd:
-                # _log_func(f"  {Fore.WHITE}DEBUG: Executing Archiver Command:{Style.RESET_ALL}") # Removed DEBUG log
-                # _log_func(f"  {Fore.WHITE}DEBUG: CWD: {subprocess_cwd}{Style.RESET_ALL}") # Removed DEBUG log
-                # Safely join command parts for logging, handling potential non-string elements
-                cmd_str = ' '.join(map(str, cmd))
-                # _log_func(f"  {Fore.WHITE}DEBUG: CMD: {cmd_str}{Style.RESET_ALL}") # Removed DEBUG log
-                try:
-                    result = subprocess.run(cmd, capture_output=True, text=True, encoding='cp866', errors='ignore',
-                                            creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0), cwd=subprocess_cwd, check=False)
-                    if result.returncode == 0:
-                        archive_creation_successful = True
-                    else:
-                        # Log stderr first if available, otherwise stdout
-                        error_msg = result.stderr.strip() if result.stderr else result.stdout.strip()
-                        if not error_msg: error_msg = f"{tool_family} failed with code {result.returncode}"
-                        _log_func(f"  {Fore.RED}{tool_family} Error/Warning (Code: {result.returncode}): {error_msg}{Style.RESET_ALL}")
-                        archive_creation_successful = False # Treat warnings/errors as failure for loop control
-
-                    if not archive_creation_successful or not os.path.exists(archive_file_path):
-                        _log_func(f"  {Fore.RED}Error: Archive file {archive_file_name} creation failed or file missing.{Style.RESET_ALL}")
-                        if temp_folder and os.path.exists(temp_folder):
-                            # Use top-level shutil
-                            shutil.rmtree(temp_folder, ignore_errors=True)
-                        return -1, original_size_kb, current_png_level, current_jpeg_quality # Error state
-                except FileNotFoundError:
-                    _log_func(f"{Fore.RED}Error: Archiver executable not found at '{archiver_executable}'. Check path.{Style.RESET_ALL}")
-                    if temp_folder and os.path.exists(temp_folder):
-                        # Use top-level shutil
-                        shutil.rmtree(temp_folder, ignore_errors=True)
-                    return -1, original_size_kb, current_png_level, current_jpeg_quality
-                except Exception as subproc_e:
-                    _log_func(f"{Fore.RED}Error running archiver: {subproc_e}{Style.RESET_ALL}")
-                    if temp_folder and os.path.exists(temp_folder):
-                        # Use top-level shutil
-                        shutil.rmtree(temp_folder, ignore_errors=True)
-                    return -1, original_size_kb, current_png_level, current_jpeg_quality
+                return -1, original_size_kb, current_png_level, current_jpeg_quality, {}
 
-            # 4. Check Archive Size
-            try:
-                file_size = os.path.getsize(archive_file_path)
-                file_size_kb = file_size / 1024.0
-                _log_func(f"  {Fore.CYAN}Archive size: {file_size_kb:.2f} KB{Style.RESET_ALL}")
-            except FileNotFoundError:
-                _log_func(f"{Fore.RED}Error: Archive file {archive_file_name} not found after supposed creation.{Style.RESET_ALL}")
+            # 3. Archive the temporary folder with each candidate profile (in memory)
+            attempt_archives = archive_workspace(temp_folder, base_dir, staging_folder, folder_name, candidate_profiles, archive_profiles_config, settings)
+            if not attempt_archives:
                 if temp_folder and os.path.exists(temp_folder):
                     # Use top-level shutil
                     shutil.rmtree(temp_folder, ignore_errors=True)
-                return -1, current_png_level, current_jpeg_quality # Error state
+                return -1, original_size_kb, current_png_level, current_jpeg_quality, {} # Error state
+
+            # 4. Check Archive Size
+            # 4b. Exhaustive DEFLATE pass for ZIP output on a near miss (may fit losslessly).
+            # The archives that are finally emitted get the pass in emit_archive.
+            if exhaustive_deflate:
+                for name, archive_bytes in attempt_archives.items():
+                    near_miss = max_size_kb < len(archive_bytes) / 1024.0 <= max_size_kb * (1 + exhaustive_deflate_reach)
+                    if archive_profiles_config[name]['extension'] == ".zip" and near_miss:
+                        attempt_archives[name] = exhaustive_deflate_bytes(archive_bytes, cache_dir, settings, name)
+            profile_sizes_kb = {name: len(archive_bytes) / 1024.0 for name, archive_bytes in attempt_archives.items()}
+
+            # With OUTPUT_PROFILES every format is emitted and all must fit (the largest counts);
+            # with ALLOWED_ARCHIVE_PROFILES only the smallest archive is kept
+            if emit_all_profiles:
+                if len(attempt_archives) < len(candidate_profiles):
+                    _log_func(f"{Fore.RED}Error: Not every output format could be created.{Style.RESET_ALL}")
+                    if temp_folder and os.path.exists(temp_folder):
+                        shutil.rmtree(temp_folder, ignore_errors=True)
+                    return -1, original_size_kb, current_png_level, current_jpeg_quality, {} # Error state
+                staged_archives = {name: attempt_archives[name] for name in candidate_profiles}
+                file_size_kb = max(profile_sizes_kb.values())
+            else:
+                staged_profile = min(attempt_archives, key=lambda name: (profile_sizes_kb[name], candidate_profiles.index(name)))
+                staged_archives = {staged_profile: attempt_archives[staged_profile]}
+                file_size_kb = profile_sizes_kb[staged_profile]
+            if len(candidate_profiles) > 1:
+                profile_sizes = ', '.join(f"{name} {profile_sizes_kb[name]:.2f} KB" for name in candidate_profiles if name in profile_sizes_kb)
+                chosen = "all must fit" if emit_all_profiles else f"-> {staged_profile}"
+                _log_func(f"  {Fore.CYAN}Profiles: {profile_sizes} ({chosen}){Style.RESET_ALL}")
+            _log_func(f"  {Fore.CYAN}Archive size: {file_size_kb:.2f} KB{Style.RESET_ALL}")
 
             # ====================================
             # == Quality Adjustment Logic Start ==
@@ -253,22 +638,29 @@ def process_and_archive_folder(folder_path, base_dir, settings, archive_profiles
                 if find_optimal:
                     # _log_func(f"  {Fore.WHITE}DEBUG: find_optimal=True. Storing best fit: Size={file_size_kb:.2f}, PNG={current_png_level}, JPEG={current_jpeg_quality}{Style.RESET_ALL}") # Removed DEBUG log
                     best_fit_size_kb = file_size_kb
-                    best_fit_settings_tuple = (current_png_level, current_jpeg_quality)
+                    best_fit_settings_tuple = (current_png_level, current_jpeg_quality, current_jpeg_subsampling)
+                    best_fit_staged = staged_archives
+                    best_fit_review_lines = review_lines
 
-                    prev_png_level, prev_jpeg = current_png_level, current_jpeg_quality
+                    prev_png_level, prev_jpeg, prev_subsampling = current_png_level, current_jpeg_quality, current_jpeg_subsampling
                     quality_increased = False
-                    # Try increasing JPEG first, then PNG
+                    # Try increasing JPEG first, then PNG, then restore full chroma
                     if current_jpeg_quality < initial_jpeg_quality:
                         current_jpeg_quality = min(initial_jpeg_quality, current_jpeg_quality + jpeg_quality_step)
                         if current_jpeg_quality > prev_jpeg: quality_increased = True
                     elif current_png_level < initial_png_level:
                         current_png_level += 1
                         quality_increased = True
+                    elif subsampling_axis and current_jpeg_subsampling != '4:4:4':
+                        current_jpeg_subsampling = '4:4:4'
+                        quality_increased = True
 
                     if quality_increased:
                         attempt += 1
                         last_archive_size_kb = file_size_kb # Store the successful size
-                        last_settings_tuple = (prev_png_level, prev_jpeg)
+                        last_settings_tuple = (prev_png_level, prev_jpeg, prev_subsampling)
+                        last_staged = best_fit_staged
+                        last_review_lines = best_fit_review_lines
                         if temp_folder:
                             # Use top-level shutil
                             shutil.rmtree(temp_folder, ignore_errors=True)
@@ -276,19 +668,19 @@ def process_and_archive_folder(folder_path, base_dir, settings, archive_profiles
                         _log_func("-" * 20) # Separator before next quality increase attempt
                         continue # Try again with higher quality
                     else: # Reached initial quality or couldn't increase further
-                        _log_func(f"  {Fore.GREEN}Optimal search: Reached initial/max quality. Best fit (PNG={best_fit_settings_tuple[0]}, JPEG={best_fit_settings_tuple[1]}).{Style.RESET_ALL}")
+                        _log_func(f"  {Fore.GREEN}Optimal search: Reached initial/max quality. Best fit (PNG={best_fit_settings_tuple[0]}, JPEG={best_fit_settings_tuple[1]}{f', Chroma={best_fit_settings_tuple[2]}' if subsampling_axis else ''}).{Style.RESET_ALL}")
                         if temp_folder:
                             # Use top-level shutil
                             shutil.rmtree(temp_folder, ignore_errors=True)
                         # Return the best fit found
                         # _log_func(f"  {Fore.WHITE}DEBUG: Returning best fit (initial/max quality reached).{Style.RESET_ALL}") # Removed DEBUG log
-                        return best_fit_size_kb, original_size_kb, best_fit_settings_tuple[0], best_fit_settings_tuple[1]
+                        return emit_result(best_fit_staged, best_fit_settings_tuple, best_fit_review_lines)
                 else: # find_optimal == False
                     # _log_func(f"  {Fore.WHITE}DEBUG: find_optimal=False. Returning first success.{Style.RESET_ALL}") # Removed DEBUG log
                     if temp_folder:
                         # Use top-level shutil
                         shutil.rmtree(temp_folder, ignore_errors=True)
-                    return file_size_kb, original_size_kb, current_png_level, current_jpeg_quality # Return first success
+                    return emit_result(staged_archives, (current_png_level, current_jpeg_quality, current_jpeg_subsampling), review_lines) # Return first success
 
             else: # file_size_kb > max_size_kb
                 _log_func(f"  {Fore.YELLOW}Warning: Size ({file_size_kb:.2f} KB) > limit ({max_size_kb} KB).{Style.RESET_ALL}")
@@ -299,12 +691,12 @@ def process_and_archive_folder(folder_path, base_dir, settings, archive_profiles
                 # If we were searching for optimal and overshot, revert to the last good one
                 # _log_func(f"  {Fore.WHITE}DEBUG: Checking if reverting to best fit (find_optimal={find_optimal}, best_fit_size_kb={best_fit_size_kb}).{Style.RESET_ALL}") # Removed DEBUG log
                 if find_optimal and best_fit_size_kb != -1:
-                    _log_func(f"  {Fore.GREEN}Optimal search: Exceeded limit. Reverting to best fit (Size: {best_fit_size_kb:.2f} KB, PNG={int(best_fit_settings_tuple[0])}, JPEG={int(best_fit_settings_tuple[1])}).{Style.RESET_ALL}")
+                    _log_func(f"  {Fore.GREEN}Optimal search: Exceeded limit. Reverting to best fit (Size: {best_fit_size_kb:.2f} KB, PNG={int(best_fit_settings_tuple[0])}, JPEG={int(best_fit_settings_tuple[1])}{f', Chroma={best_fit_settings_tuple[2]}' if subsampling_axis else ''}).{Style.RESET_ALL}")
                     if temp_folder:
                         # Use top-level shutil
                         shutil.rmtree(temp_folder, ignore_errors=True)
                     # _log_func(f"  {Fore.WHITE}DEBUG: Returning reverted best fit.{Style.RESET_ALL}") # Removed DEBUG log
-                    return best_fit_size_kb, original_size_kb, best_fit_settings_tuple[0], best_fit_settings_tuple[1]
+                    return emit_result(best_fit_staged, best_fit_settings_tuple, best_fit_review_lines)
 
                 # --- Check if size reduction stopped working ---
                 # If size increased or stayed same after reducing quality
@@ -316,25 +708,33 @@ def process_and_archive_folder(folder_path, base_dir, settings, archive_profiles
                         shutil.rmtree(temp_folder, ignore_errors=True)
                     # Return the size and settings from the PREVIOUS attempt.
                     # _log_func(f"  {Fore.WHITE}DEBUG: Returning previous attempt's result (size didn't decrease).{Style.RESET_ALL}") # Removed DEBUG log
-                    return last_archive_size_kb, original_size_kb, last_settings_tuple[0], last_settings_tuple[1]
+                    return emit_result(last_staged, last_settings_tuple, last_review_lines)
 
                 # --- Check if minimum quality reached ---
                 # _log_func(f"  {Fore.WHITE}DEBUG: Checking min quality (Current PNG={current_png_level}, Min PNG={min_png_level}; Current JPEG={current_jpeg_quality}, Min JPEG={min_jpeg_quality}).{Style.RESET_ALL}") # Removed DEBUG log
-                if current_png_level <= min_png_level and current_jpeg_quality <= min_jpeg_quality:
+                subsampling_at_min = not subsampling_axis or current_jpeg_subsampling == '4:2:0'
+                if current_png_level <= min_png_level and current_jpeg_quality <= min_jpeg_quality and subsampling_at_min:
                     _log_func(f"  {Fore.RED}Failed: Min quality reached (PNG={min_png_level}, JPEG={min_jpeg_quality}), size ({file_size_kb:.2f} KB) still > limit.{Style.RESET_ALL}")
                     if temp_folder:
                         shutil.rmtree(temp_folder, ignore_errors=True)
                     # Return the current (oversized) state as the best possible failure
                     # _log_func(f"  {Fore.WHITE}DEBUG: Returning current oversized state (min quality reached).{Style.RESET_ALL}") # Removed DEBUG log
-                    return file_size_kb, original_size_kb, min_png_level, min_jpeg_quality
+                    return emit_result(staged_archives, (min_png_level, min_jpeg_quality, current_jpeg_subsampling), review_lines)
 
                 # --- Reduce quality for the next attempt ---
                 # _log_func(f"  {Fore.WHITE}DEBUG: Reducing quality... Current PNG={current_png_level}, JPEG={current_jpeg_quality}{Style.RESET_ALL}") # Removed DEBUG log
                 next_png_level, next_jpeg_quality = current_png_level, current_jpeg_quality
+                next_jpeg_subsampling = current_jpeg_subsampling
                 reduction_made = False
 
-                # Prioritize reducing JPEG quality first
-                if current_jpeg_quality > min_jpeg_quality:
+                # Drop chroma resolution before touching JPEG quality
+                if not subsampling_at_min:
+                    next_jpeg_subsampling = '4:2:0'
+                    reduction_made = True
+                    _log_func(f"  {Fore.WHITE}Switching JPEG subsampling to 4:2:0 before reducing quality.{Style.RESET_ALL}")
+
+                # Then prioritize reducing JPEG quality
+                if not reduction_made and current_jpeg_quality > min_jpeg_quality:
                     # _log_func(f"  {Fore.WHITE}DEBUG: Attempting JPEG reduction (Current={current_jpeg_quality}, Min={min_jpeg_quality}){Style.RESET_ALL}") # Removed DEBUG log
                     # Estimate reduction needed (more aggressive if far over)
                     overshoot_kb = file_size_kb - max_size_kb
@@ -385,12 +785,15 @@ def process_and_archive_folder(folder_path, base_dir, settings, archive_profiles
                         shutil.rmtree(temp_folder, ignore_errors=True)
                     # Return current oversized state
                     # _log_func(f"  {Fore.WHITE}DEBUG: Returning current oversized state (no reduction made).{Style.RESET_ALL}") # Removed DEBUG log
-                    return file_size_kb, original_size_kb, current_png_level, current_jpeg_quality
+                    return emit_result(staged_archives, (current_png_level, current_jpeg_quality, current_jpeg_subsampling), review_lines)
 
                 # --- Prepare for the next iteration ---
                 last_archive_size_kb = file_size_kb # Store current size for next check
-                last_settings_tuple = (current_png_level, current_jpeg_quality)
+                last_settings_tuple = (current_png_level, current_jpeg_quality, current_jpeg_subsampling)
+                last_staged = staged_archives
+                last_review_lines = review_lines
                 current_png_level, current_jpeg_quality = next_png_level, next_jpeg_quality
+                current_jpeg_subsampling = next_jpeg_subsampling
                 # _log_func(f"  {Fore.WHITE}DEBUG: Preparing for Attempt {attempt + 1} with PNG={current_png_level}, JPEG={current_jpeg_quality}{Style.RESET_ALL}") # Removed DEBUG log
 
                 attempt += 1
@@ -420,7 +823,7 @@ def process_and_archive_folder(folder_path, base_dir, settings, archive_profiles
                 # Use top-level shutil
                 _log_func(f"  {Fore.WHITE}Cleaning up temp folder after exception: {temp_folder}{Style.RESET_ALL}")
                 shutil.rmtree(temp_folder, ignore_errors=True)
-            return -1, original_size_kb, current_png_level, current_jpeg_quality # Return error state
+            return -1, original_size_kb, current_png_level, current_jpeg_quality, {} # Return error state
         finally:
             # Ensure temp folder is cleaned up if loop breaks unexpectedly
              if temp_folder and os.path.exists(temp_folder):
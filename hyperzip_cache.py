@@ -0,0 +1,243 @@
+import os
+import json
+import time
+import threading
+from hyperzip_core import _log_func, Fore, Style
+from hyperzip_utils import get_file_hash
+
+ASSET_REGISTRY_FILE = "asset_registry.json"
+ASSET_REGISTRY_VERSION = 1
+ASSET_REGISTRY_MAX_ENTRIES = 20000 # Oldest entries are dropped beyond this
+_asset_registries = {}
+_asset_registries_lock = threading.Lock()
+
+# --- JSON Helpers ---
+def load_json_file(file_path, default=None):
+    """Loads a JSON file, returning default if it is missing or unreadable."""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except (OSError, ValueError) as e:
+        _log_func(f"{Fore.YELLOW}  Warn: Ignoring unreadable cache file {file_path}: {e}{Style.RESET_ALL}")
+        return default
+
+def save_json_file(file_path, data):
+    """Writes a JSON file atomically (temp file + replace). Returns True on success."""
+    tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, file_path)
+        return True
+    except OSError as e:
+        _log_func(f"{Fore.YELLOW}  Warn: Could not write cache file {file_path}: {e}{Style.RESET_ALL}")
+        try: os.remove(tmp_path)
+        except OSError: pass
+        return False
+
+# --- Asset Registry ---
+class AssetRegistry:
+    """Fingerprint registry of images produced by HyperZip.
+       Maps the SHA-256 of an output file to the parameters that produced it, so a later run
+       can recognize already-optimized inputs. Known file sizes are indexed separately, which
+       lets the check skip hashing for any file whose size was never produced.
+       Use get_asset_registry() so that folders processed in parallel record into a single instance."""
+
+    def __init__(self, cache_dir):
+        self.path = os.path.join(cache_dir, ASSET_REGISTRY_FILE) if cache_dir else None
+        self.assets = {}
+        self.known_sizes = set()
+        self.dirty = False
+        self._lock = threading.Lock()
+        if self.path:
+            data = load_json_file(self.path, default={})
+            if isinstance(data, dict) and data.get("version") == ASSET_REGISTRY_VERSION:
+                self.assets = data.get("assets", {})
+            self.known_sizes = {entry.get("size") for entry in self.assets.values()}
+
+    def lookup(self, file_path, file_size=None):
+        """Returns the registry entry for file_path, or None if it was never produced by HyperZip."""
+        try:
+            if file_size is None:
+                file_size = os.path.getsize(file_path)
+            if file_size not in self.known_sizes:
+                return None # Fast path: no output of this size was ever recorded
+            file_hash = get_file_hash(file_path)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self.assets.get(file_hash)
+            if entry is not None and entry.get("size") != file_size:
+                return None
+            return entry
+
+    def is_already_optimized(self, file_path, png_compressor, png_level, jpeg_quality, file_size=None):
+        """Checks whether file_path is a HyperZip output that does not need re-encoding.
+           Such a file passes through unless the requested quality is lower than the one it was made with."""
+        entry = self.lookup(file_path, file_size)
+        if entry is None:
+            return False
+        kind = entry.get("kind")
+        if kind == "jpeg":
+            recorded_quality = entry.get("jpeg_quality")
+            return recorded_quality is not None and int(jpeg_quality) >= recorded_quality
+        if kind == "png":
+            if entry.get("compressor") != png_compressor:
+                return False
+            if png_compressor == "oxipng":
+                recorded_level = entry.get("png_level")
+                return recorded_level is not None and int(png_level) >= recorded_level
+            return True # TinyPNG has no quality knob for PNGs
+        return True # Other formats go through TinyPNG without parameters
+
+    def record(self, file_path, kind, png_compressor=None, png_level=None, jpeg_quality=None):
+        """Records file_path as an optimized output produced with the given parameters."""
+        try:
+            file_size = os.path.getsize(file_path)
+            file_hash = get_file_hash(file_path)
+        except OSError:
+            return
+        entry = {"size": file_size, "kind": kind, "compressor": png_compressor, "t": int(time.time())}
+        if png_level is not None: entry["png_level"] = int(png_level)
+        if jpeg_quality is not None: entry["jpeg_quality"] = int(jpeg_quality)
+        with self._lock:
+            self.assets[file_hash] = entry
+            self.known_sizes.add(file_size)
+            self.dirty = True
+
+    def save(self):
+        """Persists the registry if it changed, dropping the oldest entries beyond the size cap."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self.dirty:
+                return
+            if len(self.assets) > ASSET_REGISTRY_MAX_ENTRIES:
+                newest = sorted(self.assets.items(), key=lambda item: item[1].get("t", 0), reverse=True)
+                self.assets = dict(newest[:ASSET_REGISTRY_MAX_ENTRIES])
+                self.known_sizes = {entry.get("size") for entry in self.assets.values()}
+            data = {"version": ASSET_REGISTRY_VERSION, "assets": self.assets}
+            if save_json_file(self.path, data):
+                self.dirty = False
+
+def get_asset_registry(cache_dir):
+    """Returns the shared AssetRegistry for cache_dir."""
+    cache_dir = os.path.abspath(cache_dir)
+    with _asset_registries_lock:
+        registry = _asset_registries.get(cache_dir)
+        if registry is None:
+            registry = AssetRegistry(cache_dir)
+            _asset_registries[cache_dir] = registry
+        return registry
+
+# --- Byte Cache (LRU) ---
+BYTE_CACHE_INDEX_FILE = "index.json"
+_byte_caches = {}
+_byte_caches_lock = threading.Lock()
+
+class ByteCache:
+    """Persistent content-addressed cache of byte strings with LRU eviction.
+       Each value is stored as its own blob file; a JSON index tracks sizes and last access
+       so the least recently used blobs are evicted once max_bytes is exceeded.
+       Use get_byte_cache() so that all users of one folder share a single instance."""
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, BYTE_CACHE_INDEX_FILE)
+        self._lock = threading.Lock()
+        self.dirty = False
+        index = load_json_file(self.index_path, default={})
+        self.index = index if isinstance(index, dict) else {}
+        self.total_bytes = sum(entry.get("size", 0) for entry in self.index.values())
+
+    def _blob_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, key):
+        """Returns the cached bytes for key, or None."""
+        with self._lock:
+            if key not in self.index:
+                return None
+        try:
+            with open(self._blob_path(key), 'rb') as f:
+                data = f.read()
+        except OSError:
+            with self._lock:
+                entry = self.index.pop(key, None)
+                if entry:
+                    self.total_bytes -= entry.get("size", 0)
+                    self.dirty = True
+            return None
+        with self._lock:
+            if key in self.index:
+                self.index[key]["t"] = time.time()
+                self.dirty = True
+        return data
+
+    def put(self, key, data):
+        """Stores data under key, evicting least recently used entries if the cache is full."""
+        if len(data) > self.max_bytes:
+            return
+        blob_path = self._blob_path(key)
+        tmp_path = f"{blob_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, blob_path)
+        except OSError as e:
+            _log_func(f"{Fore.YELLOW}  Warn: Could not write cache entry: {e}{Style.RESET_ALL}")
+            try: os.remove(tmp_path)
+            except OSError: pass
+            return
+        with self._lock:
+            previous = self.index.get(key)
+            if previous:
+                self.total_bytes -= previous.get("size", 0)
+            self.index[key] = {"size": len(data), "t": time.time()}
+            self.total_bytes += len(data)
+            self.dirty = True
+            evicted = self._evict_locked()
+        for evicted_key in evicted:
+            try: os.remove(self._blob_path(evicted_key))
+            except OSError: pass
+
+    def _evict_locked(self):
+        """Drops least recently used entries until the cache fits. Returns the evicted keys."""
+        if self.total_bytes <= self.max_bytes:
+            return []
+        evicted = []
+        for key, entry in sorted(self.index.items(), key=lambda item: item[1].get("t", 0)):
+            if self.total_bytes <= self.max_bytes:
+                break
+            self.total_bytes -= entry.get("size", 0)
+            del self.index[key]
+            evicted.append(key)
+        return evicted
+
+    def save(self):
+        """Persists the index if it changed."""
+        with self._lock:
+            if not self.dirty:
+                return
+            if save_json_file(self.index_path, self.index):
+                self.dirty = False
+
+def get_byte_cache(cache_dir, max_bytes):
+    """Returns the shared ByteCache for cache_dir, creating the folder if needed. Returns None on failure."""
+    cache_dir = os.path.abspath(cache_dir)
+    with _byte_caches_lock:
+        cache = _byte_caches.get(cache_dir)
+        if cache is None:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+            except OSError as e:
+                _log_func(f"{Fore.YELLOW}  Warn: Cannot create cache folder {cache_dir}: {e}{Style.RESET_ALL}")
+                return None
+            cache = ByteCache(cache_dir, max_bytes)
+            _byte_caches[cache_dir] = cache
+        cache.max_bytes = max_bytes
+        return cache
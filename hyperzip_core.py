@@ -27,8 +27,35 @@ DEFAULT_SETTINGS = {
     "winrar_path": r"C:\Program Files\WinRAR\WinRAR.exe",
     "sevenzip_path": r"C:\Program Files\7-Zip\7z.exe",
     "zpaq_path": r"C:\zpaq\zpaq.exe", # Example, change if needed
+    "NATIVE_ZIP_PARAMS": "-mx=9", # native_zip profile: -mx=N DEFLATE level (0 stores), -mx:png,jpg=N per extension
+    "ALLOWED_ARCHIVE_PROFILES": [], # If set, archive each folder with every listed profile and keep the smallest (overrides ARCHIVE_PROFILE)
+    "OUTPUT_PROFILES": [], # If set, write every listed format from one optimization pass, each within max_size_kb (overrides the two above)
+    "ARCHIVE_JOBS": 1, # Folders processed at once; their archiver runs split the thread budget (-mmt/-mt/-threads)
+    "ARCHIVER_THREADS": 0, # Total archiver thread budget, 0 = all CPU cores
+    "SKIP_UNCHANGED_FOLDERS": True, # Keep an archive whose folder files and settings match its last successful build (see _hyperzip_cache/manifests)
+    "SOLID_ENTRY_ORDERING": True, # 7z/RAR: pass entries through a list file, text first, grouped by extension and content similarity
+    "WINRAR_SOLID_ORDERING": False, # winrar_rar: build a solid RAR (-s) from the ordered list file; off keeps the plain recursive WinRAR command
+    "ZIP_MINIMAL_LAYOUT": False, # Rewrite ZIP output without extra fields, directory entries or comments, all entries dated 1980-01-01
+    "ZIP_STORE_SELECTION": False, # Store ZIP entries that DEFLATE does not shrink (decided per entry by trial compression)
+    "ZIP_STORE_MIN_DEFLATE_GAIN_PCT": 0, # Store entries unless DEFLATE saves more than this share of their size
+    "EXHAUSTIVE_DEFLATE": False, # Recompress ZIP entries with Zopfli (if installed) or a zlib strategy sweep for the archive that is emitted
+    "EXHAUSTIVE_DEFLATE_ITERATIONS": 15, # Zopfli iterations per entry
+    "EXHAUSTIVE_DEFLATE_REACH_PCT": 3, # Also try it on archives at most this far over max_size_kb before degrading images
     "max_size_kb": 150.0,
     "ENABLE_MINIFICATION": True,
+    "PARALLEL_MINIFICATION": True, # Minify files across a process pool
+    "ENABLE_MINIFY_CACHE": True, # Reuse minified output across attempts and runs (_hyperzip_cache/minify)
+    "MINIFY_CACHE_MAX_MB": 64, # Least recently used entries are evicted beyond this
+    "JSON_FLOAT_PRECISION": None, # Decimal places kept for floats in minified JSON (e.g. 3 for Lottie), None keeps them exact
+    "ENABLE_JS_MANGLING": False, # Shorten local JS names and fold constants (scripts it cannot model keep the jsmin output)
+    "ENABLE_TEXT_NORMALIZATION": False, # Canonicalize colours, numbers, CSS property order and quotes after minifying; each change is kept only if it shrinks the compressed size
+    "ENABLE_CSS_PURGE": False, # Drop CSS rules whose classes/ids/tags the folder's HTML and JS never use
+    "CSS_PURGE_SAFELIST": [], # Class/id/tag names or patterns (e.g. "swiper-*") the purge must always keep
+    "ENABLE_LIBRARY_DETECTION": True, # Recognize bundled GSAP/CreateJS/jQuery/Lottie builds and apply hyperzip_libraries.json rules
+    "LIBRARY_DEFAULT_ACTION": "skip", # For fingerprinted libraries without a rule: "skip" (leave untouched), "keep" (process normally); signature-only matches are processed normally
+    "ENABLE_FONT_SUBSETTING": False, # Subset .ttf/.otf/.woff/.woff2 to the characters the folder renders (needs fonttools, brotli for WOFF2)
+    "FONT_SUBSET_EXTRA_CHARS": "0123456789", # Always kept in subsets, for text built at runtime (counters, prices)
+    "FONT_SUBSET_TO_WOFF2": True, # Convert subset fonts to WOFF2 when smaller (references are rewritten)
     "ENABLE_IMAGE_COMPRESSION": True,
     "TINIFY_API_KEY": "", # MUST be provided by user
     "INITIAL_PNG_OPTIMIZATION_LEVEL": 8,
@@ -36,7 +63,18 @@ DEFAULT_SETTINGS = {
     "MIN_PNG_OPTIMIZATION_LEVEL": 1,
     "MIN_JPEG_QUALITY": 10,
     "JPEG_QUALITY_STEP": 10,
+    # Chroma subsampling: "4:2:0", "4:4:4", or "auto" (start at 4:4:4, drop to 4:2:0 before lowering quality)
+    "JPEG_SUBSAMPLING": "4:2:0",
+    # Progressive encoding: True, False, or "auto" (keep whichever is smaller per image)
+    "JPEG_PROGRESSIVE": "auto",
+    # Convert opaque photographic PNGs to JPEG and rewrite their references (logged to _hyperzip_cache for review)
+    "CONVERT_PHOTO_PNG_TO_JPEG": False,
+    # Recompress base64 data:image URIs in HTML/CSS/JS; optionally move them to files when that is smaller
+    "ENABLE_DATA_URI_COMPRESSION": True,
+    "EXTERNALIZE_DATA_URIS": False,
     "FIND_OPTIMAL_QUALITY": True,
+    # Pass images produced by an earlier HyperZip run straight through (fingerprints kept in _hyperzip_cache)
+    "ENABLE_ASSET_REGISTRY": True,
     "PROJECT_FOLDER": None, # Must be provided
     # Default exclusions (space-separated) - based on 7zip defaults
     "ARCHIVE_EXCLUSIONS": "*.ini *.db *.fla *.psd *.pdf *.ai *.zip *.rar *.7z *.zpaq *.DS_Store Thumbs.db *~"
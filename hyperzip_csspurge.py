@@ -0,0 +1,272 @@
+import os
+import re
+import fnmatch
+from hyperzip_core import _log_func, Fore, Style
+from hyperzip_utils import load_text_asset
+
+# Files whose markup and scripts decide which selectors are in use
+CSS_PURGE_HTML_EXTENSIONS = {'.html', '.htm'}
+CSS_PURGE_JS_EXTENSIONS = {'.js'}
+# At-rules that hold ordinary rules, which are purged individually; other blocks (@keyframes, @font-face...) are kept whole
+CSS_GROUPING_AT_RULES = {'media', 'supports', 'layer', 'container', 'document', '-moz-document'}
+# Elements every document has, even when the markup omits their tags
+IMPLIED_TAGS = {'html', 'head', 'body'}
+
+HTML_TAG_NAME_PATTERN = re.compile(r'<([A-Za-z][\w\-]*)')
+HTML_CLASS_PATTERN = re.compile(r'''\sclass\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))''', re.IGNORECASE)
+HTML_ID_PATTERN = re.compile(r'''\sid\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))''', re.IGNORECASE)
+HTML_SCRIPT_PATTERN = re.compile(r'<script\b[^>]*>(.*?)</script\s*>', re.IGNORECASE | re.DOTALL)
+NAME_PATTERN = re.compile(r'[A-Za-z_][\w\-]*')
+CSS_COMMENT_PATTERN = re.compile(r'/\*.*?\*/', re.DOTALL)
+CSS_SPECIAL_CHAR_PATTERN = re.compile(r'[{};"\'/]') # Characters the block parser has to look at
+CSS_AT_RULE_NAME_PATTERN = re.compile(r'@([\w\-]+)')
+ATTRIBUTE_SELECTOR_PATTERN = re.compile(r'\[[^\]]*\]')
+FUNCTIONAL_PSEUDO_PATTERN = re.compile(r':{1,2}[\w\-]+\([^()]*\)')
+PSEUDO_PATTERN = re.compile(r':{1,2}[\w\-]+')
+CLASS_OR_ID_PATTERN = re.compile(r'([.#])([\w\-]+)')
+
+# --- Usage Index ---
+class SelectorUsage:
+    """Index of the class names, ids and tag names a folder can use.
+       HTML contributes its tags, class and id attributes; JS (files and inline scripts) contributes
+       every name-like token, and tokens ending in '-' or '_' act as prefixes for names built at runtime.
+       html, head and body always count as used (as does :root, which needs no name).
+       Decisions are memoized per selector, so each distinct selector is analysed once."""
+
+    def __init__(self, safelist=None):
+        self.names = set()
+        self.tags = set(IMPLIED_TAGS)
+        self.prefixes = set()
+        self.safelist_exact = set()
+        self.safelist_patterns = []
+        self._decisions = {}
+        for entry in safelist or []:
+            entry = str(entry).strip().lstrip('.#')
+            if not entry:
+                continue
+            if any(char in entry for char in '*?['):
+                self.safelist_patterns.append(entry)
+            else:
+                self.safelist_exact.add(entry)
+
+    def add_html(self, content):
+        self.tags.update(tag.lower() for tag in HTML_TAG_NAME_PATTERN.findall(content))
+        for pattern in (HTML_CLASS_PATTERN, HTML_ID_PATTERN):
+            for match in pattern.finditer(content):
+                value = next(group for group in match.groups() if group is not None)
+                self.names.update(value.split())
+        for script in HTML_SCRIPT_PATTERN.findall(content):
+            self.add_js(script)
+
+    def add_js(self, content):
+        for token in NAME_PATTERN.findall(content):
+            if token.endswith(('-', '_')):
+                self.prefixes.add(token)
+            self.names.add(token)
+            self.tags.add(token.lower()) # document.createElement('canvas') and friends
+
+    def _is_safelisted(self, name):
+        return name in self.safelist_exact or any(fnmatch.fnmatchcase(name, pattern) for pattern in self.safelist_patterns)
+
+    def _name_used(self, name):
+        return (name in self.names or self._is_safelisted(name)
+                or any(name.startswith(prefix) for prefix in self.prefixes))
+
+    def is_selector_used(self, selector):
+        """Returns False only if the selector requires a class, id or tag the folder never uses."""
+        decision = self._decisions.get(selector)
+        if decision is None:
+            decision = self._check_selector(selector)
+            self._decisions[selector] = decision
+        return decision
+
+    def _check_selector(self, selector):
+        if '\\' in selector:
+            return True # Escaped names are not worth parsing, keep the rule
+        text = ATTRIBUTE_SELECTOR_PATTERN.sub(' ', selector)
+        # :not(), :is(), :nth-child()... never make a selector require a name
+        previous = None
+        while previous != text:
+            previous = text
+            text = FUNCTIONAL_PSEUDO_PATTERN.sub(' ', text)
+        text = PSEUDO_PATTERN.sub(' ', text)
+        for _, name in CLASS_OR_ID_PATTERN.findall(text):
+            if not self._name_used(name):
+                return False
+        for tag in NAME_PATTERN.findall(CLASS_OR_ID_PATTERN.sub(' ', text)):
+            if tag.lower() not in self.tags and not self._is_safelisted(tag):
+                return False
+        return True
+
+# --- Stylesheet Parsing ---
+def _skip_string(css, index):
+    """Returns the index just past the quoted string starting at index."""
+    quote = css[index]
+    index += 1
+    while index < len(css):
+        char = css[index]
+        if char == '\\':
+            index += 2
+            continue
+        if char == quote or char == '\n':
+            return index + 1
+        index += 1
+    return index
+
+def parse_css_blocks(css):
+    """Splits a stylesheet into top-level (prelude, body) pairs; body is None for statements such as @import.
+       Raises ValueError on unbalanced braces."""
+    items = []
+    depth = 0
+    start = 0
+    body_start = 0
+    prelude = ''
+    index = 0
+    length = len(css)
+    while index < length:
+        special = CSS_SPECIAL_CHAR_PATTERN.search(css, index)
+        if special is None:
+            break
+        index = special.start()
+        char = css[index]
+        if char == '/':
+            if not css.startswith('/*', index):
+                index += 1
+                continue
+            end = css.find('*/', index + 2)
+            index = length if end < 0 else end + 2
+            continue
+        if char in '"\'':
+            index = _skip_string(css, index)
+            continue
+        if char == '{':
+            if depth == 0:
+                prelude = css[start:index]
+                body_start = index + 1
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth < 0:
+                raise ValueError("Unbalanced '}'")
+            if depth == 0:
+                items.append((prelude, css[body_start:index]))
+                start = index + 1
+        elif char == ';' and depth == 0:
+            items.append((css[start:index], None))
+            start = index + 1
+        index += 1
+    if depth != 0:
+        raise ValueError("Unclosed '{'")
+    if CSS_COMMENT_PATTERN.sub('', css[start:]).strip():
+        items.append((css[start:], None))
+    return items
+
+def split_selector_list(selector_list):
+    """Splits a selector list on commas outside parentheses, brackets and strings."""
+    selectors = []
+    depth = 0
+    quote = None
+    current = []
+    for char in selector_list:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            selectors.append(''.join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    selectors.append(''.join(current).strip())
+    return [selector for selector in selectors if selector]
+
+def purge_stylesheet(css, usage):
+    """Drops the rules (and selectors within rules) that usage says are never matched.
+       Returns (purged_css, rule_count, removed_count)."""
+    pieces = []
+    rule_count = 0
+    removed_count = 0
+    for prelude, body in parse_css_blocks(css):
+        clean_prelude = CSS_COMMENT_PATTERN.sub('', prelude).strip()
+        if body is None:
+            if clean_prelude:
+                pieces.append(clean_prelude + ';')
+            continue
+        if clean_prelude.startswith('@'):
+            at_rule = CSS_AT_RULE_NAME_PATTERN.match(clean_prelude)
+            if at_rule and at_rule.group(1).lower() in CSS_GROUPING_AT_RULES:
+                inner, inner_rules, inner_removed = purge_stylesheet(body, usage)
+                rule_count += inner_rules
+                removed_count += inner_removed
+                if inner.strip():
+                    pieces.append(f"{clean_prelude}{{{inner}}}")
+            else:
+                pieces.append(f"{clean_prelude}{{{body}}}")
+            continue
+        rule_count += 1
+        kept = [selector for selector in split_selector_list(clean_prelude) if usage.is_selector_used(selector)]
+        if not kept:
+            removed_count += 1
+            continue
+        pieces.append(f"{','.join(kept)}{{{body}}}")
+    return '\n'.join(pieces), rule_count, removed_count
+
+# --- Purge Stage ---
+def purge_unused_css_in_folder(folder_path, safelist=None):
+    """Removes CSS rules whose selectors reference classes, ids or tags that none of the folder's
+       HTML or JS uses. Runs before minification. Safelist entries (names or fnmatch patterns such
+       as 'swiper-*') are always kept. Returns the number of bytes saved."""
+    html_files, js_files, css_files = [], [], []
+    for root, _, files in os.walk(folder_path):
+        for file in files:
+            ext = os.path.splitext(file)[1].lower()
+            file_path = os.path.join(root, file)
+            if ext in CSS_PURGE_HTML_EXTENSIONS:
+                html_files.append(file_path)
+            elif ext in CSS_PURGE_JS_EXTENSIONS:
+                js_files.append(file_path)
+            elif ext == '.css':
+                css_files.append(file_path)
+    if not css_files or not html_files:
+        return 0 # Without markup there is nothing to decide usage from
+
+    usage = SelectorUsage(safelist)
+    for file_paths, add_source in ((html_files, usage.add_html), (js_files, usage.add_js)):
+        for file_path in file_paths:
+            _, content, _ = load_text_asset(file_path)
+            if content is None:
+                _log_func(f"{Fore.YELLOW}  Warn: Cannot decode {os.path.basename(file_path)}, skipping CSS purge.{Style.RESET_ALL}")
+                return 0 # An unreadable source could reference anything
+            add_source(content)
+
+    total_saved = 0
+    for css_path in css_files:
+        css_basename = os.path.basename(css_path)
+        raw_bytes, content, encoding = load_text_asset(css_path)
+        if content is None:
+            continue
+        try:
+            purged, rule_count, removed_count = purge_stylesheet(content, usage)
+        except ValueError as e:
+            _log_func(f"{Fore.YELLOW}  Warn: Skipping CSS purge of {css_basename}: {e}{Style.RESET_ALL}")
+            continue
+        if not removed_count:
+            continue
+        purged_bytes = purged.encode(encoding)
+        if len(purged_bytes) >= len(raw_bytes):
+            continue
+        try:
+            with open(css_path, 'wb') as f:
+                f.write(purged_bytes)
+        except OSError as e:
+            _log_func(f"{Fore.RED}  Error writing purged {css_basename}: {e}{Style.RESET_ALL}")
+            continue
+        saved = len(raw_bytes) - len(purged_bytes)
+        total_saved += saved
+        _log_func(f"    {Fore.GREEN}{css_basename}: purged {removed_count} of {rule_count} unused rule(s), saved {saved/1024:.1f} KB{Style.RESET_ALL}")
+    return total_saved
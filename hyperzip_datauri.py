@@ -0,0 +1,148 @@
+import os
+import re
+import base64
+import binascii
+import tempfile
+import zlib
+from hyperzip_core import _log_func, Fore, Style
+
+# Text files that may carry embedded images
+DATA_URI_TEXT_EXTENSIONS = {'.html', '.htm', '.css', '.js'}
+
+# data:image/<type>[;param=value...];base64,<payload>
+DATA_URI_PATTERN = re.compile(
+    r'data:image/(png|jpe?g|gif|webp)((?:;[A-Za-z0-9.=\-]+)*?);base64,([A-Za-z0-9+/]+={0,2})',
+    re.IGNORECASE
+)
+DATA_URI_MIN_BYTES = 512 # Smaller payloads are not worth a round trip through the image pipeline
+ZIP_ENTRY_OVERHEAD = 30 + 46 # Local header + central directory record, excluding the name (twice)
+# Contexts where the URI is used as a plain URL and can safely be replaced by a file path
+EXTERNALIZABLE_PREFIX = re.compile(r'''(?:url\(\s*['"]?|src\s*=\s*['"]?)$''', re.IGNORECASE)
+# Only files whose URLs resolve against their own location; a script's URLs resolve against the HTML page
+EXTERNALIZABLE_EXTENSIONS = {'.html', '.htm', '.css'}
+
+_MIME_EXTENSIONS = {'png': '.png', 'jpg': '.jpg', 'jpeg': '.jpg', 'gif': '.gif', 'webp': '.webp'}
+
+# --- Size Estimate Helpers ---
+def _deflated_size(data):
+    """Approximates the archived size of data with raw DEFLATE at maximum level."""
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+    return len(compressor.compress(data) + compressor.flush())
+
+def _should_externalize(encoded_payload, raw_payload, file_name):
+    """Returns True if storing the image as its own archive entry beats embedding it as base64."""
+    embedded_cost = _deflated_size(encoded_payload)
+    external_cost = len(raw_payload) + ZIP_ENTRY_OVERHEAD + 2 * len(file_name.encode('utf-8')) + len(file_name)
+    return external_cost < embedded_cost
+
+# --- Single Payload Recompression ---
+def _recompress_payload(raw_payload, ext, work_dir, index, compress_func):
+    """Runs one decoded image through compress_func in work_dir.
+       Returns (new_bytes, tinify_valid) where new_bytes is None if nothing was gained."""
+    temp_path = os.path.join(work_dir, f"data_uri_{index}{ext}")
+    with open(temp_path, 'wb') as f:
+        f.write(raw_payload)
+    saved, _, key_still_valid = compress_func(temp_path)
+    new_bytes = None
+    if saved > 0:
+        with open(temp_path, 'rb') as f:
+            new_bytes = f.read()
+        if len(new_bytes) >= len(raw_payload):
+            new_bytes = None
+    os.remove(temp_path)
+    return new_bytes, key_still_valid
+
+# --- Process Data URIs in Folder ---
+def process_data_uris_in_folder(folder_path, compress_func, externalize=False):
+    """Finds base64 data:image URIs in the folder's HTML/CSS/JS, recompresses each payload with
+       compress_func (compress_image with the current attempt's settings bound) and re-embeds the
+       smaller result. With externalize, payloads used as a url()/src value in HTML or CSS are written
+       to their own file next to the text file when that makes the archive smaller.
+       Returns total saved bytes, total original size, and the TinyPNG key status reported by compress_func."""
+    total_saved = 0
+    total_original = 0
+    tinify_valid = True
+
+    text_files = []
+    for root, _, files in os.walk(folder_path):
+        for file in files:
+            if os.path.splitext(file)[1].lower() in DATA_URI_TEXT_EXTENSIONS:
+                text_files.append(os.path.join(root, file))
+
+    with tempfile.TemporaryDirectory(prefix="hyperzip_datauri_") as work_dir:
+        payload_index = 0
+        recompressed = {} # Encoded payload -> new bytes (or None), so repeated URIs are encoded once
+        for text_path in text_files:
+            text_basename = os.path.basename(text_path)
+            try:
+                with open(text_path, 'rb') as f:
+                    content = f.read().decode('latin-1') # Base64 is ASCII; latin-1 round-trips every byte
+            except OSError as e:
+                _log_func(f"{Fore.RED}  Error reading {text_basename} for data URIs: {e}{Style.RESET_ALL}")
+                continue
+            if 'data:image/' not in content and 'DATA:IMAGE/' not in content.upper():
+                continue
+
+            can_externalize = externalize and os.path.splitext(text_path)[1].lower() in EXTERNALIZABLE_EXTENSIONS
+            pieces = []
+            last_end = 0
+            file_saved = 0
+            uri_count = 0
+            externalized = 0
+            for match in DATA_URI_PATTERN.finditer(content):
+                mime_subtype, params, encoded = match.group(1).lower(), match.group(2), match.group(3)
+                try:
+                    raw_payload = base64.b64decode(encoded, validate=True)
+                except (binascii.Error, ValueError):
+                    continue
+                if len(raw_payload) < DATA_URI_MIN_BYTES:
+                    continue
+
+                ext = _MIME_EXTENSIONS[mime_subtype]
+                payload_index += 1
+                uri_count += 1
+                if encoded in recompressed:
+                    new_payload = recompressed[encoded]
+                else:
+                    new_payload, key_still_valid = _recompress_payload(raw_payload, ext, work_dir, payload_index, compress_func)
+                    recompressed[encoded] = new_payload
+                    if not key_still_valid:
+                        tinify_valid = False
+                payload = new_payload if new_payload is not None else raw_payload
+                new_encoded = base64.b64encode(payload).decode('ascii') if new_payload is not None else encoded
+                total_original += len(raw_payload)
+
+                replacement = None
+                if can_externalize and EXTERNALIZABLE_PREFIX.search(content[max(0, match.start() - 16):match.start()]):
+                    stem = os.path.splitext(text_basename)[0]
+                    file_name = f"{stem}_inline{payload_index}{ext}"
+                    external_path = os.path.join(os.path.dirname(text_path), file_name)
+                    if not os.path.exists(external_path) and _should_externalize(new_encoded.encode('ascii'), payload, file_name):
+                        with open(external_path, 'wb') as f:
+                            f.write(payload)
+                        replacement = file_name
+                        externalized += 1
+                if replacement is None:
+                    if new_payload is None:
+                        continue # Unchanged, keep the original text
+                    replacement = f"data:image/{match.group(1)}{params};base64,{new_encoded}"
+
+                pieces.append(content[last_end:match.start()])
+                pieces.append(replacement)
+                last_end = match.end()
+                file_saved += len(raw_payload) - len(payload)
+
+            if not pieces:
+                continue
+            pieces.append(content[last_end:])
+            try:
+                with open(text_path, 'wb') as f:
+                    f.write(''.join(pieces).encode('latin-1'))
+            except OSError as e:
+                _log_func(f"{Fore.RED}  Error writing {text_basename} after data URI recompression: {e}{Style.RESET_ALL}")
+                continue
+            total_saved += file_saved
+            details = f", {externalized} externalized" if externalized else ""
+            _log_func(f"    {Fore.GREEN}{text_basename}: {uri_count} data URI image(s) recompressed, saved {file_saved/1024:.1f} KB{details}{Style.RESET_ALL}")
+
+    return total_saved, total_original, tinify_valid
@@ -0,0 +1,262 @@
+import os
+import re
+import io
+import html
+import hashlib
+from hyperzip_core import _log_func, Fore, Style
+from hyperzip_utils import load_text_asset, find_text_references, rewrite_text_references
+
+FONT_EXTENSIONS = {'.ttf', '.otf', '.woff', '.woff2'}
+FONT_CACHE_FOLDER = "fonts"
+FONT_CACHE_MAX_BYTES = 32 * 1024 * 1024
+FONT_SUBSETTER_REVISION = 1 # Bump when subsetting options change, so cached subsets are rebuilt
+
+FONT_MARKUP_EXTENSIONS = {'.html', '.htm', '.svg'}
+FONT_SCRIPT_EXTENSIONS = {'.js'}
+FONT_STYLE_EXTENSIONS = {'.css'}
+
+MARKUP_SCRIPT_PATTERN = re.compile(r'<script\b[^>]*>(.*?)</script\s*>', re.IGNORECASE | re.DOTALL)
+MARKUP_STYLE_PATTERN = re.compile(r'<style\b[^>]*>(.*?)</style\s*>', re.IGNORECASE | re.DOTALL)
+MARKUP_COMMENT_PATTERN = re.compile(r'<!--.*?-->', re.DOTALL)
+MARKUP_TAG_PATTERN = re.compile(r'<[^>]*>')
+# Attributes whose values are rendered as text
+MARKUP_TEXT_ATTRIBUTE_PATTERN = re.compile(r'''\s(?:value|placeholder|title|alt|aria-label|label)\s*=\s*(?:"([^"]*)"|'([^']*)')''', re.IGNORECASE)
+JS_STRING_PATTERN = re.compile(r'''"((?:[^"\\\n]|\\.)*)"|'((?:[^'\\\n]|\\.)*)'|`((?:[^`\\]|\\.)*)`''', re.DOTALL)
+JS_ESCAPE_PATTERN = re.compile(r'\\(u\{[0-9A-Fa-f]+\}|u[0-9A-Fa-f]{4}|x[0-9A-Fa-f]{2}|.)', re.DOTALL)
+CSS_CONTENT_PATTERN = re.compile(r'''content\s*:\s*((?:"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*'|[^;}"'])*)''', re.IGNORECASE)
+CSS_STRING_PATTERN = re.compile(r'"((?:[^"\\]|\\.)*)"' r"|'((?:[^'\\]|\\.)*)'")
+CSS_ESCAPE_PATTERN = re.compile(r'\\([0-9A-Fa-f]{1,6})\s?|\\(.)', re.DOTALL)
+
+# --- Character Collection ---
+def _decode_js_escape(match):
+    escape = match.group(1)
+    if escape.startswith('u{'):
+        return chr(min(int(escape[2:-1], 16), 0x10FFFF))
+    if escape[0] in 'ux' and len(escape) > 1:
+        return chr(int(escape[1:], 16))
+    return {'n': '\n', 't': '\t', 'r': '\r'}.get(escape, escape)
+
+def _decode_css_escape(match):
+    if match.group(1):
+        return chr(min(int(match.group(1), 16), 0x10FFFF))
+    return match.group(2)
+
+def collect_markup_characters(content, characters):
+    for script in MARKUP_SCRIPT_PATTERN.findall(content):
+        collect_script_characters(script, characters)
+    for style in MARKUP_STYLE_PATTERN.findall(content):
+        collect_style_characters(style, characters)
+    for match in MARKUP_TEXT_ATTRIBUTE_PATTERN.finditer(content):
+        characters.update(html.unescape(match.group(1) if match.group(1) is not None else match.group(2)))
+    text = MARKUP_STYLE_PATTERN.sub(' ', MARKUP_SCRIPT_PATTERN.sub(' ', MARKUP_COMMENT_PATTERN.sub(' ', content)))
+    characters.update(html.unescape(MARKUP_TAG_PATTERN.sub(' ', text)))
+
+def collect_script_characters(content, characters):
+    for match in JS_STRING_PATTERN.finditer(content):
+        literal = next(group for group in match.groups() if group is not None)
+        characters.update(JS_ESCAPE_PATTERN.sub(_decode_js_escape, literal))
+
+def collect_style_characters(content, characters):
+    for declaration in CSS_CONTENT_PATTERN.findall(content):
+        for match in CSS_STRING_PATTERN.finditer(declaration):
+            literal = match.group(1) if match.group(1) is not None else match.group(2)
+            characters.update(CSS_ESCAPE_PATTERN.sub(_decode_css_escape, literal))
+
+def collect_folder_characters(folder_path, extra_characters=''):
+    """Returns the set of characters the folder can render: HTML/SVG text and text attributes,
+       JS string literals and CSS content strings, plus extra_characters.
+       Upper- and lower-case forms are both included (text-transform), whitespace is reduced to a space.
+       Returns None if a source cannot be decoded, since it could render anything."""
+    characters = set()
+    collectors = {}
+    for extensions, collector in ((FONT_MARKUP_EXTENSIONS, collect_markup_characters),
+                                  (FONT_SCRIPT_EXTENSIONS, collect_script_characters),
+                                  (FONT_STYLE_EXTENSIONS, collect_style_characters)):
+        for ext in extensions:
+            collectors[ext] = collector
+    for root, _, files in os.walk(folder_path):
+        for file in files:
+            collector = collectors.get(os.path.splitext(file)[1].lower())
+            if collector is None:
+                continue
+            _, content, _ = load_text_asset(os.path.join(root, file))
+            if content is None:
+                _log_func(f"{Fore.YELLOW}  Warn: Cannot decode {file}, skipping font subsetting.{Style.RESET_ALL}")
+                return None
+            collector(content, characters)
+    characters.update(extra_characters or '')
+    characters = {char for char in characters if char.isprintable()}
+    if not characters:
+        return characters
+    characters.update([char.upper() for char in characters] + [char.lower() for char in characters])
+    characters = {char for char in characters if len(char) == 1}
+    characters.add(' ')
+    return characters
+
+# --- Subsetting ---
+_fonttools_warned = False
+
+def _load_subsetter():
+    """Returns the fontTools.subset module, or None if fontTools is not installed."""
+    try:
+        from fontTools import subset
+    except ImportError:
+        return None
+    return subset
+
+def subset_font_bytes(raw_bytes, characters, flavors):
+    """Subsets a font to characters and saves it in each requested flavor (None, 'woff', 'woff2').
+       Returns {flavor: bytes}; flavors that cannot be written (e.g. WOFF2 without brotli) are left out."""
+    subset = _load_subsetter()
+    options = subset.Options()
+    options.layout_features = ['*'] # Kerning, ligatures and alternates the text may trigger
+    options.notdef_outline = True
+    options.ignore_missing_unicodes = True
+    font = subset.load_font(io.BytesIO(raw_bytes), options)
+    try:
+        subsetter = subset.Subsetter(options=options)
+        subsetter.populate(unicodes=sorted(ord(char) for char in characters))
+        subsetter.subset(font)
+        results = {}
+        for flavor in flavors:
+            options.flavor = flavor
+            output = io.BytesIO()
+            try:
+                subset.save_font(font, output, options)
+            except Exception:
+                if flavor == 'woff2':
+                    continue # brotli missing or table not supported, keep the other flavors
+                raise
+            results[flavor] = output.getvalue()
+        return results
+    finally:
+        font.close()
+
+def _font_flavor(raw_bytes):
+    signature = raw_bytes[:4]
+    if signature == b'wOF2':
+        return 'woff2'
+    if signature == b'wOFF':
+        return 'woff'
+    return None
+
+def _subset_cache_key(raw_bytes, characters_key, flavor):
+    digest = hashlib.sha256(raw_bytes)
+    digest.update(f"\0{FONT_SUBSETTER_REVISION}\0{flavor}\0".encode('ascii'))
+    digest.update(characters_key)
+    return digest.hexdigest()
+
+def _update_format_hints(text_files, font_name):
+    """Points format() hints that follow url(...font_name...) at woff2."""
+    pattern = re.compile(r'''(url\([^)]*?(?<![\w.\-])''' + re.escape(font_name) + r'''(?![\w\-])[^)]*\)\s*format\(\s*)(["'])[^"']*\2''', re.IGNORECASE)
+    for text_path in text_files:
+        try:
+            with open(text_path, 'rb') as f:
+                content = f.read().decode('latin-1')
+            new_content, count = pattern.subn(lambda match: f"{match.group(1)}{match.group(2)}woff2{match.group(2)}", content)
+            if count:
+                with open(text_path, 'wb') as f:
+                    f.write(new_content.encode('latin-1'))
+        except OSError as e:
+            _log_func(f"{Fore.YELLOW}  Warn: Could not update font format in {os.path.basename(text_path)}: {e}{Style.RESET_ALL}")
+
+def subset_fonts_in_folder(folder_path, cache_dir=None, extra_characters='', convert_to_woff2=True):
+    """Subsets the folder's fonts (.ttf/.otf/.woff/.woff2) to the characters its HTML/JS/CSS can render.
+       Fonts are converted to WOFF2 when that is smaller and their name is referenced literally (the
+       references and format() hints are rewritten). Subsets are cached by (font hash, character set).
+       Requires fontTools. Returns the number of bytes saved."""
+    font_paths = []
+    name_counts = {}
+    for root, _, files in os.walk(folder_path):
+        for file in files:
+            name_counts[file.lower()] = name_counts.get(file.lower(), 0) + 1
+            if os.path.splitext(file)[1].lower() in FONT_EXTENSIONS:
+                font_paths.append(os.path.join(root, file))
+    if not font_paths:
+        return 0
+    if _load_subsetter() is None:
+        global _fonttools_warned
+        if _fonttools_warned:
+            return 0
+        _fonttools_warned = True
+        _log_func(f"{Fore.YELLOW}  Warn: fontTools not installed, fonts are kept whole. Install with: pip install 'fonttools[woff]'{Style.RESET_ALL}")
+        return 0
+
+    characters = collect_folder_characters(folder_path, extra_characters)
+    if characters is None:
+        return 0
+    if not characters:
+        _log_func(f"  {Fore.WHITE}No text found for fonts to render, keeping them whole.{Style.RESET_ALL}")
+        return 0
+    characters_key = ''.join(sorted(characters)).encode('utf-8', 'surrogatepass')
+
+    cache = None
+    if cache_dir:
+        from hyperzip_cache import get_byte_cache
+        cache = get_byte_cache(os.path.join(cache_dir, FONT_CACHE_FOLDER), FONT_CACHE_MAX_BYTES)
+
+    total_saved = 0
+    for font_path in font_paths:
+        font_name = os.path.basename(font_path)
+        try:
+            with open(font_path, 'rb') as f:
+                raw_bytes = f.read()
+        except OSError as e:
+            _log_func(f"{Fore.RED}  Error reading font {font_name}: {e}{Style.RESET_ALL}")
+            continue
+        flavor = _font_flavor(raw_bytes)
+        woff2_name = os.path.splitext(font_name)[0] + '.woff2'
+        flavors = [flavor]
+        referencing_files = []
+        if convert_to_woff2 and flavor != 'woff2':
+            if name_counts.get(font_name.lower(), 0) == 1 and woff2_name.lower() not in name_counts:
+                referencing_files = find_text_references(folder_path, font_name)
+                if referencing_files:
+                    flavors.append('woff2')
+
+        outputs = {}
+        missing = []
+        for candidate in flavors:
+            cached = cache.get(_subset_cache_key(raw_bytes, characters_key, candidate)) if cache else None
+            if cached is None:
+                missing.append(candidate)
+            else:
+                outputs[candidate] = cached
+        if missing:
+            try:
+                created = subset_font_bytes(raw_bytes, characters, missing)
+            except Exception as e:
+                _log_func(f"{Fore.YELLOW}  Warn: Cannot subset font {font_name}: {type(e).__name__} - {e}{Style.RESET_ALL}")
+                continue
+            outputs.update(created)
+            if cache:
+                for candidate, data in created.items():
+                    cache.put(_subset_cache_key(raw_bytes, characters_key, candidate), data)
+
+        if not outputs:
+            continue
+        best_flavor = min(outputs, key=lambda candidate: len(outputs[candidate])) # None is plain TrueType/OpenType
+        if len(outputs[best_flavor]) >= len(raw_bytes):
+            continue
+        output_path = font_path
+        if best_flavor == 'woff2' and flavor != 'woff2':
+            output_path = os.path.join(os.path.dirname(font_path), woff2_name)
+        try:
+            with open(output_path, 'wb') as f:
+                f.write(outputs[best_flavor])
+            if output_path != font_path:
+                rewrite_text_references(referencing_files, font_name, woff2_name)
+                _update_format_hints(referencing_files, woff2_name)
+                os.remove(font_path)
+        except OSError as e:
+            _log_func(f"{Fore.RED}  Error writing subset font {font_name}: {e}{Style.RESET_ALL}")
+            continue
+        saved = len(raw_bytes) - len(outputs[best_flavor])
+        total_saved += saved
+        renamed = f" -> {woff2_name}" if output_path != font_path else ""
+        _log_func(f"    {Fore.GREEN}{font_name}{renamed}: subset to {len(characters)} characters, "
+                  f"{len(raw_bytes)/1024:.1f} KB -> {len(outputs[best_flavor])/1024:.1f} KB{Style.RESET_ALL}")
+
+    if cache:
+        cache.save()
+    return total_saved
@@ -4,17 +4,23 @@ import time
 import functools
 import subprocess
 import shutil
+import io
+import hashlib
+import threading
 from concurrent.futures import ThreadPoolExecutor
 from hyperzip_core import _log_func, Fore, Style, PNG_EXTENSIONS, JPEG_EXTENSIONS, IMAGE_EXTENSIONS
 
 # Import image compression libraries
 try:
     import tinify
-    from PIL import Image
+    from PIL import Image, ImageSequence
 except ImportError as e:
     _log_func(f"{Fore.RED}Error: Missing image library: {e.name}. Install with pip.{Style.RESET_ALL}")
     raise
 
+# TinyPNG rejects uploads of 5 MB or more
+TINYPNG_MAX_BYTES = 5 * 1000 * 1000
+
 # --- Oxipng Compression ---
 def compress_png_with_oxipng(file_path, oxipng_level):
     """Compresses a PNG image using the oxipng executable."""
@@ -110,11 +116,56 @@ def compress_png_with_oxipng(file_path, oxipng_level):
     return saved_bytes, original_size
 
 
+# --- JPEG Encoder Options ---
+JPEG_SUBSAMPLING_MODES = ('4:4:4', '4:2:2', '4:2:0')
+
+# Winning progressive/baseline choice per (source hash, subsampling, quality), reused across search attempts
+_jpeg_progressive_cache = {}
+_jpeg_progressive_cache_lock = threading.Lock()
+
+def save_jpeg_with_best_options(img, file_path, quality, subsampling='4:2:0', progressive='auto', source_bytes=None, icc_profile=None):
+    """Encodes img as JPEG with the given quality and chroma subsampling.
+       progressive may be True, False or 'auto'; 'auto' encodes both progressive and baseline
+       and keeps the smaller one (small banners are often smaller as baseline).
+       The winner is cached per source image and encoder settings, so repeated attempts encode only once.
+       Returns the chosen progressive flag."""
+    save_options = {'quality': quality, 'optimize': True}
+    if subsampling in JPEG_SUBSAMPLING_MODES:
+        save_options['subsampling'] = subsampling
+    if icc_profile:
+        save_options['icc_profile'] = icc_profile
+
+    cache_key = None
+    if progressive == 'auto' and source_bytes is not None:
+        cache_key = (hashlib.sha1(source_bytes).hexdigest(), subsampling, quality)
+        with _jpeg_progressive_cache_lock:
+            progressive = _jpeg_progressive_cache.get(cache_key, 'auto')
+
+    if progressive != 'auto':
+        img.save(file_path, 'JPEG', progressive=bool(progressive), **save_options)
+        return bool(progressive)
+
+    candidates = []
+    for candidate_progressive in (True, False):
+        buffer = io.BytesIO()
+        img.save(buffer, 'JPEG', progressive=candidate_progressive, **save_options)
+        candidates.append((buffer.tell(), candidate_progressive, buffer))
+    _, best_progressive, best_buffer = min(candidates, key=lambda c: c[0])
+    with open(file_path, 'wb') as f:
+        f.write(best_buffer.getbuffer())
+    if cache_key is not None:
+        with _jpeg_progressive_cache_lock:
+            _jpeg_progressive_cache[cache_key] = best_progressive
+    return best_progressive
+
+
 # --- Image Compression Function (Unified) ---
-def compress_image(file_path, png_compressor, png_level, jpeg_quality, tinify_api_key_valid, enable_png_compression=True, enable_jpeg_compression=True):
+def compress_image(file_path, png_compressor, png_level, jpeg_quality, tinify_api_key_valid, enable_png_compression=True, enable_jpeg_compression=True,
+                   jpeg_subsampling='4:2:0', jpeg_progressive='auto'):
     """Compresses one image using the selected PNG compressor or TinyPNG/Pillow for others.
        Requires tinify_api_key_valid status passed in.
-       enable_png_compression and enable_jpeg_compression control whether each type is processed."""
+       enable_png_compression and enable_jpeg_compression control whether each type is processed.
+       jpeg_subsampling and jpeg_progressive are passed to save_jpeg_with_best_options."""
 
     original_size = 0; saved_bytes = 0
     file_basename = os.path.basename(file_path)
@@ -184,15 +235,19 @@ def compress_image(file_path, png_compressor, png_level, jpeg_quality, tinify_ap
                 _log_func(f"    {Fore.WHITE}Applying Pillow JPEG quality Q{current_jpeg_quality} to {file_basename}{Style.RESET_ALL}")
                 time.sleep(0.05) # Small delay before Pillow access
                 try:
-                    with Image.open(file_path) as img:
-                        save_options = {'quality': current_jpeg_quality, 'optimize': True, 'progressive': True}
+                    with open(file_path, 'rb') as f:
+                        source_bytes = f.read()
+                    with Image.open(io.BytesIO(source_bytes)) as img:
+                        img.load()
+                        icc_profile = img.info.get('icc_profile')
                         img_mode = img.mode
                         if img_mode == 'RGBA' or img_mode == 'P':
                             img = img.convert('RGB')
-                        if 'icc_profile' in img.info:
-                            save_options['icc_profile'] = img.info['icc_profile']
-                        img.save(file_path, 'JPEG', **save_options)
-                        _log_func(f"    {Fore.WHITE}Pillow save completed for {file_basename} at Q{current_jpeg_quality}{Style.RESET_ALL}")
+                        used_progressive = save_jpeg_with_best_options(img, file_path, current_jpeg_quality,
+                                                                       subsampling=jpeg_subsampling, progressive=jpeg_progressive,
+                                                                       source_bytes=source_bytes, icc_profile=icc_profile)
+                        _log_func(f"    {Fore.WHITE}Pillow save completed for {file_basename} at Q{current_jpeg_quality} "
+                                  f"({jpeg_subsampling}, {'progressive' if used_progressive else 'baseline'}){Style.RESET_ALL}")
                 except Exception as pil_e:
                     _log_func(f"{Fore.RED}    Error applying JPEG quality with Pillow: {str(pil_e)}{Style.RESET_ALL}")
             else:
@@ -250,16 +305,273 @@ def compress_image(file_path, png_compressor, png_level, jpeg_quality, tinify_ap
     return saved_bytes, original_size, current_tinify_valid
 
 
+# --- Local Fallback for Oversized Images ---
+def _save_image_to_temp(frames, file_path, fmt, save_options):
+    """Saves frames next to file_path in a temp file and returns (temp_path, size).
+       More than one frame is written as an animation."""
+    temp_path = file_path + ".hz_shrink"
+    if len(frames) > 1:
+        frames[0].save(temp_path, fmt, save_all=True, append_images=frames[1:], **save_options)
+    else:
+        frames[0].save(temp_path, fmt, **save_options)
+    return temp_path, os.path.getsize(temp_path)
+
+def shrink_image_for_tinypng(file_path, max_bytes=TINYPNG_MAX_BYTES):
+    """Brings an image under the TinyPNG upload limit locally, in tiers:
+       lossless re-encode, then palette/quality reduction, then downscaling.
+       The source is decoded once and every tier is derived from that copy.
+       Animated GIF/WebP images are shrunk frame by frame, keeping frame durations and looping.
+       Returns True if the file now fits under max_bytes."""
+    file_basename = os.path.basename(file_path)
+    ext = os.path.splitext(file_path)[1].lower()
+    try:
+        original_size = os.path.getsize(file_path)
+    except OSError as e:
+        _log_func(f"{Fore.RED}  Error getting size for {file_basename}: {e}{Style.RESET_ALL}")
+        return False
+    if original_size < max_bytes:
+        return True
+
+    # Decode the source once; every tier below works from these frames
+    try:
+        with Image.open(file_path) as img:
+            fmt = img.format
+            info = dict(img.info)
+            frames, durations = [], []
+            for frame in ImageSequence.Iterator(img):
+                frames.append(frame.copy())
+                durations.append(frame.info.get('duration', info.get('duration', 100)))
+    except Exception as e:
+        _log_func(f"{Fore.RED}  Error opening {file_basename}: {type(e).__name__} - {str(e)}{Style.RESET_ALL}")
+        return False
+    is_animated = len(frames) > 1
+
+    _log_func(f"  {Fore.CYAN}Shrinking large {'animated ' if is_animated else ''}image {file_basename} "
+              f"({original_size/1024/1024:.1f}MB) locally for TinyPNG{Style.RESET_ALL}")
+    is_jpeg = ext in JPEG_EXTENSIONS
+    if is_jpeg:
+        tiers = [{'quality': 95}, {'quality': 90}]
+    elif fmt == 'PNG':
+        tiers = [{}, {'quantize': True}]
+    else:
+        tiers = [{}]
+    base_options = {'optimize': True}
+    if is_jpeg:
+        if 'icc_profile' in info:
+            base_options['icc_profile'] = info['icc_profile']
+    elif fmt == 'PNG':
+        base_options['compress_level'] = 9
+    if is_animated:
+        base_options['duration'] = durations
+        base_options['loop'] = info.get('loop', 0)
+    width, height = frames[0].size
+    temp_path = None
+    try:
+        scale = 1.0
+        for _ in range(6): # Re-encode tiers first, then shrink dimensions until it fits
+            target_size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            scaled = frames
+            if scale < 1.0:
+                # Palette frames are resampled in full color; the encoder re-palettizes them
+                scaled = [(frame.convert('RGBA') if frame.mode == 'P' else frame).resize(target_size, Image.LANCZOS, reducing_gap=2.0)
+                          for frame in frames]
+            for tier in tiers:
+                save_options = dict(base_options)
+                work = scaled
+                if is_jpeg:
+                    work = [frame if frame.mode in ('RGB', 'L') else frame.convert('RGB') for frame in work]
+                    save_options['quality'] = tier['quality']
+                elif tier.get('quantize'):
+                    quantized = []
+                    for frame in work:
+                        if frame.mode not in ('RGB', 'RGBA'):
+                            frame = frame.convert('RGBA')
+                        method = Image.Quantize.FASTOCTREE if frame.mode == 'RGBA' else Image.Quantize.MEDIANCUT
+                        quantized.append(frame.quantize(colors=256, method=method))
+                    work = quantized
+                temp_path, new_size = _save_image_to_temp(work, file_path, fmt, save_options)
+                del work
+                if new_size < max_bytes:
+                    os.replace(temp_path, file_path)
+                    temp_path = None
+                    detail = f"scale {scale:.2f}" if scale < 1.0 else "re-encode"
+                    _log_func(f"    {Fore.GREEN}{file_basename}: {original_size/1024/1024:.1f}MB -> {new_size/1024/1024:.1f}MB ({detail}){Style.RESET_ALL}")
+                    return True
+            del scaled
+            # Area scales with the square of the side, leave some headroom
+            scale *= max(0.25, min(0.9, (max_bytes / new_size) ** 0.5 * 0.9))
+        _log_func(f"{Fore.YELLOW}  Warn: Could not shrink {file_basename} under {max_bytes/1000/1000:.0f}MB.{Style.RESET_ALL}")
+    except Exception as e:
+        _log_func(f"{Fore.RED}  Error shrinking {file_basename}: {type(e).__name__} - {str(e)}{Style.RESET_ALL}")
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            try: os.remove(temp_path)
+            except OSError: pass
+    return False
+
+
+# --- Opaque Photographic PNG Detection ---
+PHOTO_CLASSIFIER_SIZE = 128 # Longest side of the downsample the classifier looks at
+PHOTO_MIN_UNIQUE_COLORS = 2048 # Flat graphics and text rarely reach this many colors in the downsample
+PHOTO_MAX_FLAT_RATIO = 0.35 # Share of identical neighbouring pixels above which an image looks synthetic
+PNG_TO_JPEG_MAX_RATIO = 0.6 # JPEG must beat the (not yet compressed) PNG by this margin to win
+PNG_TO_JPEG_REVIEW_LOG = "png_to_jpeg_conversions.log"
+
+def is_opaque_photographic_png(file_path):
+    """Classifies a PNG as fully opaque photographic content, which JPEG encodes far smaller.
+       The check runs with NumPy on a small downsample, so it is cheap even for large images.
+       Returns False if NumPy is not installed."""
+    try:
+        import numpy as np
+    except ImportError:
+        return False
+    try:
+        with Image.open(file_path) as img:
+            if img.mode == 'P' or 'transparency' in img.info:
+                return False # Palette images are graphics, and tRNS means transparency
+            if img.mode in ('RGBA', 'LA'):
+                if img.getchannel('A').getextrema()[0] < 255:
+                    return False # Any transparent pixel rules JPEG out
+            elif img.mode not in ('RGB', 'L'):
+                return False
+            img.draft('RGB', (PHOTO_CLASSIFIER_SIZE, PHOTO_CLASSIFIER_SIZE))
+            small = img.convert('RGB')
+            small.thumbnail((PHOTO_CLASSIFIER_SIZE, PHOTO_CLASSIFIER_SIZE), Image.BILINEAR)
+        pixels = np.asarray(small, dtype=np.uint8)
+        if pixels.shape[0] < 8 or pixels.shape[1] < 8:
+            return False
+        packed = (pixels[..., 0].astype(np.uint32) << 16) | (pixels[..., 1].astype(np.uint32) << 8) | pixels[..., 2]
+        unique_colors = np.unique(packed).size
+        min_unique = min(PHOTO_MIN_UNIQUE_COLORS, packed.size // 4)
+        flat_ratio = (np.count_nonzero(packed[:, 1:] == packed[:, :-1]) + np.count_nonzero(packed[1:, :] == packed[:-1, :])) \
+                     / float(packed[:, 1:].size + packed[1:, :].size)
+        return unique_colors >= min_unique and flat_ratio <= PHOTO_MAX_FLAT_RATIO
+    except Exception as e:
+        _log_func(f"{Fore.YELLOW}  Warn: Could not classify {os.path.basename(file_path)}: {type(e).__name__} - {str(e)}{Style.RESET_ALL}")
+        return False
+
+def convert_photographic_pngs(folder_path, jpeg_quality, jpeg_subsampling='4:2:0', jpeg_progressive='auto', review_lines=None):
+    """Converts opaque photographic PNGs in folder_path to JPEG when the JPEG wins clearly,
+       and rewrites their references in the folder's HTML/CSS/JS.
+       PNGs whose name is not referenced literally (e.g. built dynamically in JS) or is ambiguous are left alone.
+       Each conversion is logged and its description appended to review_lines if given
+       (see write_png_to_jpeg_review_log).
+       Returns the list of created JPEG paths."""
+    from hyperzip_utils import find_text_references, rewrite_text_references
+
+    png_paths = []
+    name_counts = {}
+    for root, _, files in os.walk(folder_path):
+        for file in files:
+            name_counts[file.lower()] = name_counts.get(file.lower(), 0) + 1
+            if os.path.splitext(file)[1].lower() in PNG_EXTENSIONS:
+                png_paths.append(os.path.join(root, file))
+
+    quality = max(10, min(95, int(jpeg_quality)))
+    converted = []
+    for png_path in png_paths:
+        png_name = os.path.basename(png_path)
+        jpeg_name = os.path.splitext(png_name)[0] + '.jpg'
+        jpeg_path = os.path.join(os.path.dirname(png_path), jpeg_name)
+        if name_counts.get(png_name.lower(), 0) > 1 or jpeg_name.lower() in name_counts:
+            continue # Same name elsewhere in the folder, references would be ambiguous
+        if not is_opaque_photographic_png(png_path):
+            continue
+        referencing_files = find_text_references(folder_path, png_name)
+        if not referencing_files:
+            _log_func(f"  {Fore.WHITE}Keeping photographic PNG {png_name}: not referenced literally in HTML/CSS/JS.{Style.RESET_ALL}")
+            continue
+        try:
+            png_size = os.path.getsize(png_path)
+            with Image.open(png_path) as img:
+                icc_profile = img.info.get('icc_profile')
+                rgb = img.convert('RGB')
+            save_jpeg_with_best_options(rgb, jpeg_path, quality, subsampling=jpeg_subsampling,
+                                        progressive=jpeg_progressive, icc_profile=icc_profile)
+            jpeg_size = os.path.getsize(jpeg_path)
+        except Exception as e:
+            _log_func(f"{Fore.RED}  Error creating JPEG candidate for {png_name}: {type(e).__name__} - {str(e)}{Style.RESET_ALL}")
+            if os.path.exists(jpeg_path):
+                os.remove(jpeg_path)
+            continue
+        if jpeg_size > png_size * PNG_TO_JPEG_MAX_RATIO:
+            os.remove(jpeg_path) # PNG is competitive, keep it
+            continue
+        replacements = rewrite_text_references(referencing_files, png_name, jpeg_name)
+        os.remove(png_path)
+        converted.append(jpeg_path)
+        relative_png = os.path.relpath(png_path, folder_path)
+        message = (f"{relative_png} -> {jpeg_name} ({png_size/1024:.1f} KB -> {jpeg_size/1024:.1f} KB @ Q{quality}, "
+                   f"{replacements} reference(s) in {len(referencing_files)} file(s))")
+        _log_func(f"    {Fore.GREEN}Converted photographic PNG: {message}{Style.RESET_ALL}")
+        if review_lines is not None:
+            review_lines.append(message)
+    return converted
+
+def write_png_to_jpeg_review_log(review_log_dir, folder_label, review_lines):
+    """Appends the conversions of the emitted attempt to the review log in review_log_dir.
+       Called once per folder, so attempts that were measured but not emitted leave no entries."""
+    if not review_lines or not review_log_dir:
+        return
+    timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
+    try:
+        with open(os.path.join(review_log_dir, PNG_TO_JPEG_REVIEW_LOG), 'a', encoding='utf-8') as f:
+            for line in review_lines:
+                f.write(f"{timestamp} {folder_label}: {line}\n")
+    except OSError as e:
+        _log_func(f"{Fore.YELLOW}  Warn: Could not write PNG->JPEG review log: {e}{Style.RESET_ALL}")
+
+
+# --- Asset Registry Helper ---
+def _record_optimized_image(registry, file_path, png_compressor, png_level, jpeg_quality):
+    """Records a freshly compressed image in the asset registry with the parameters that produced it."""
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext in PNG_EXTENSIONS:
+        registry.record(file_path, "png", png_compressor=png_compressor,
+                        png_level=png_level if png_compressor == "oxipng" else None)
+    elif ext in JPEG_EXTENSIONS:
+        # Same clamping as compress_image, so the recorded quality is the one actually applied
+        registry.record(file_path, "jpeg", png_compressor=png_compressor,
+                        jpeg_quality=max(10, min(95, int(jpeg_quality))))
+    else:
+        registry.record(file_path, "other", png_compressor="tinypng")
+
+
 # --- Process Images in Folder ---
 def process_images_in_folder(folder_path, png_compressor, current_png_level, current_jpeg_quality, tinify_api_key_valid, 
-                            enable_png_compression=True, enable_jpeg_compression=True):
+                            enable_png_compression=True, enable_jpeg_compression=True, cache_dir=None, use_asset_registry=True,
+                            jpeg_subsampling='4:2:0', jpeg_progressive='auto', convert_png_to_jpeg=False, png_to_jpeg_review=None):
     """Compresses images in the specified folder using the selected method.
        Returns total saved bytes, total original size, and updated tinify_api_key_valid status.
-       enable_png_compression and enable_jpeg_compression control whether each type is processed."""
+       enable_png_compression and enable_jpeg_compression control whether each type is processed.
+       jpeg_subsampling and jpeg_progressive select the Pillow JPEG encoder options.
+       If cache_dir is given and use_asset_registry is set, images recognized as earlier HyperZip outputs pass through untouched.
+       convert_png_to_jpeg turns opaque photographic PNGs into JPEGs (see convert_photographic_pngs);
+       their descriptions are appended to the png_to_jpeg_review list if given."""
+    from hyperzip_cache import get_asset_registry
+
     image_files = []
     total_original_image_size = 0
     total_saved_image_bytes = 0
     current_tinify_valid = tinify_api_key_valid # Track validity changes during processing
+    registry = get_asset_registry(cache_dir) if cache_dir and use_asset_registry else None
+    passed_through_count = 0
+
+    # Convert opaque photographic PNGs first; the JPEGs are already at target quality
+    converted_jpegs = set()
+    if convert_png_to_jpeg and enable_png_compression:
+        png_sizes_before = {}
+        for root, _, files in os.walk(folder_path):
+            for file in files:
+                if os.path.splitext(file)[1].lower() in PNG_EXTENSIONS:
+                    png_path = os.path.join(root, file)
+                    png_sizes_before[os.path.splitext(png_path)[0] + '.jpg'] = os.path.getsize(png_path)
+        for jpeg_path in convert_photographic_pngs(folder_path, current_jpeg_quality, jpeg_subsampling,
+                                                   jpeg_progressive, review_lines=png_to_jpeg_review):
+            converted_jpegs.add(jpeg_path)
+            png_size = png_sizes_before.get(jpeg_path, 0)
+            total_original_image_size += png_size
+            total_saved_image_bytes += png_size - os.path.getsize(jpeg_path)
 
     # Collect image files
     file_list = []
@@ -271,19 +583,39 @@ def process_images_in_folder(folder_path, png_compressor, current_png_level, cur
     # (oxipng doesn't need a valid API key)
     for file_path in file_list:
         ext = os.path.splitext(file_path)[1].lower()
-        if ext in IMAGE_EXTENSIONS:
+        if ext in IMAGE_EXTENSIONS and file_path not in converted_jpegs:
                 try:
                     fsize = os.path.getsize(file_path)
                     if fsize == 0: continue # Skip empty files
-                    # Limit based on TinyPNG free tier (5MB) if using tinypng
-                    if png_compressor == "tinypng" and fsize >= 5 * 1000 * 1000:
-                         _log_func(f"{Fore.YELLOW}  Skipping large image {os.path.basename(file_path)} (>{fsize/1024/1024:.1f}MB) for TinyPNG.{Style.RESET_ALL}")
-                         continue # Skip this file for TinyPNG
-                    # Oxipng has no practical size limit we need to enforce here
+                    # TinyPNG rejects files of 5MB or more: shrink them locally first, then use the normal pipeline
+                    # (oxipng handles PNGs itself, so only files that would go to TinyPNG need it)
+                    goes_to_tinypng = png_compressor == "tinypng" or ext not in PNG_EXTENSIONS
+                    # Leave the file alone when its type's compression is switched off
+                    if ext in PNG_EXTENSIONS: type_enabled = enable_png_compression
+                    elif ext in JPEG_EXTENSIONS: type_enabled = enable_jpeg_compression
+                    else: type_enabled = True
+                    if goes_to_tinypng and type_enabled and current_tinify_valid and fsize >= TINYPNG_MAX_BYTES:
+                        if shrink_image_for_tinypng(file_path):
+                            shrunk_size = os.path.getsize(file_path)
+                            # Count the local shrink as savings against the true original size
+                            total_saved_image_bytes += fsize - shrunk_size
+                            total_original_image_size += fsize - shrunk_size
+                            fsize = shrunk_size
+                        else:
+                            _log_func(f"{Fore.YELLOW}  {os.path.basename(file_path)} still exceeds the TinyPNG limit; TinyPNG may reject it.{Style.RESET_ALL}")
+                    # Already-optimized outputs of a previous run pass straight through
+                    if registry and registry.is_already_optimized(file_path, png_compressor, current_png_level,
+                                                                  current_jpeg_quality, file_size=fsize):
+                        total_original_image_size += fsize
+                        passed_through_count += 1
+                        continue
                     image_files.append(file_path)
                 except OSError as e:
                     _log_func(f"{Fore.RED}  Error getting size for {os.path.basename(file_path)}: {e}{Style.RESET_ALL}")
 
+    if passed_through_count:
+        _log_func(f"  {Fore.GREEN}Skipping {passed_through_count} already-optimized image(s).{Style.RESET_ALL}")
+
     # Compress images concurrently
     if image_files:
         log_compressor = "TinyPNG/Pillow" if png_compressor == "tinypng" else "Oxipng (PNGs) / TinyPNG/Pillow (Others)"
@@ -296,7 +628,9 @@ def process_images_in_folder(folder_path, png_compressor, current_png_level, cur
                                           jpeg_quality=current_jpeg_quality,
                                           tinify_api_key_valid=current_tinify_valid,
                                           enable_png_compression=enable_png_compression,
-                                          enable_jpeg_compression=enable_jpeg_compression)
+                                          enable_jpeg_compression=enable_jpeg_compression,
+                                          jpeg_subsampling=jpeg_subsampling,
+                                          jpeg_progressive=jpeg_progressive)
 
         # --- Run sequentially instead of concurrently to avoid potential issues ---
         # _log_func(f"  {Fore.WHITE}DEBUG: Running image compression sequentially.{Style.RESET_ALL}") # Removed DEBUG log
@@ -305,6 +639,8 @@ def process_images_in_folder(folder_path, png_compressor, current_png_level, cur
                 saved, original, key_still_valid = compress_func(image_file)
                 total_saved_image_bytes += saved
                 total_original_image_size += original
+                if registry and saved > 0:
+                    _record_optimized_image(registry, image_file, png_compressor, current_png_level, current_jpeg_quality)
                 # Update TinyPNG validity status if the key became invalid
                 if png_compressor != "oxipng" and not key_still_valid:
                     current_tinify_valid = False
@@ -320,5 +656,8 @@ def process_images_in_folder(folder_path, png_compressor, current_png_level, cur
     elif not image_files:
         pass # _log_func(f"  {Fore.WHITE}No suitable images found for compression.{Style.RESET_ALL}") # Less verbose
 
+    if registry:
+        registry.save()
+
     # Return totals and the potentially updated TinyPNG key status
     return total_saved_image_bytes, total_original_image_size, current_tinify_valid
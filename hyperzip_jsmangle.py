@@ -0,0 +1,473 @@
+import re
+import math
+
+# Identifier-mangling pass for JavaScript, run on jsmin output.
+# It models ES5 function scoping only: anything it does not understand (ES2015+ syntax, eval, with,
+# unbalanced brackets) raises JSMangleError and the caller keeps the plain jsmin result.
+
+class JSMangleError(ValueError):
+    """Raised when a script uses syntax the mangler does not model."""
+
+TOKEN_PATTERN = re.compile(r'''
+    (?P<ws>[ \t\r\n\f\v\u00a0\u2028\u2029\ufeff]+)
+  | (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<string>"(?:[^"\\\n]|\\.|\\\n)*"|'(?:[^'\\\n]|\\.|\\\n)*')
+  | (?P<number>0[xX][0-9a-fA-F]+|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<name>[A-Za-z_$\u0080-\uffff][\w$\u0080-\uffff]*)
+  | (?P<punct>>>>=|\.\.\.|===|!==|\*\*=|<<=|>>=|>>>|=>|==|!=|<=|>=|&&|\|\||\?\?|\+\+|--|\+=|-=|\*=|/=|%=|&=|\|=|\^=|<<|>>|\*\*|[{}()\[\];,<>+\-*/%&|^!~?:=.])
+''', re.VERBOSE | re.DOTALL)
+
+JS_KEYWORDS = {
+    'break', 'case', 'catch', 'continue', 'debugger', 'default', 'delete', 'do', 'else', 'finally', 'for',
+    'function', 'if', 'in', 'instanceof', 'new', 'return', 'switch', 'this', 'throw', 'try', 'typeof', 'var',
+    'void', 'while', 'with', 'null', 'true', 'false', 'enum', 'implements', 'interface', 'package', 'private',
+    'protected', 'public'
+}
+# Names that signal syntax or semantics outside the ES5 scope model
+UNSUPPORTED_NAMES = {'let', 'const', 'class', 'import', 'export', 'extends', 'super', 'yield', 'async', 'await',
+                     'static', 'of', 'eval', 'with'}
+UNSUPPORTED_PUNCTUATORS = {'=>', '...', '??', '**', '**='}
+# Never produced as mangled names
+RESERVED_NAMES = JS_KEYWORDS | UNSUPPORTED_NAMES | {'undefined', 'NaN', 'Infinity', 'arguments', 'get', 'set'}
+# After these a '/' starts a regular expression rather than a division
+REGEX_PRECEDING_KEYWORDS = {'return', 'typeof', 'instanceof', 'in', 'new', 'delete', 'void', 'throw', 'case', 'do', 'else'}
+EXPRESSION_END_KINDS = {'name', 'number', 'string', 'regex'}
+
+# Constant folding: tokens that bound a literal expression on the left/right without binding tighter than it
+FOLD_LEFT_BOUNDARIES = {'(', '[', ',', '=', ';', '{', '}', ':', '?', '+=', '-=', '*=', '/=', '%=', '==', '===',
+                        '!=', '!==', '<', '>', '<=', '>=', '&&', '||', '&', '|', '^', '<<', '>>', '>>>',
+                        'return', 'case'}
+FOLD_RIGHT_BOUNDARIES = {')', ']', ',', ';', '}', ':', '?', '==', '===', '!=', '!==', '<', '>', '<=', '>=',
+                         '&&', '||', '&', '|', '^', '<<', '>>', '>>>', None}
+FOLD_OPERATORS = {'+': 1, '-': 1, '*': 2, '/': 2, '%': 2} # Operator -> precedence rank
+
+NAME_FIRST_CHARS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_$'
+NAME_CHARS = NAME_FIRST_CHARS + '0123456789'
+
+class _Token:
+    __slots__ = ('kind', 'text', 'newline_before', 'role', 'scope', 'binding')
+
+    def __init__(self, kind, text, newline_before):
+        self.kind = kind
+        self.text = text
+        self.newline_before = newline_before
+        self.role = None # 'decl', 'ref' or None for names that are never renamed
+        self.scope = None # Scope the token appears in (refs) or declares into (decls)
+        self.binding = None
+
+class _Scope:
+    __slots__ = ('parent', 'children', 'declared', 'free', 'outer', 'new_names', 'uses', 'is_catch')
+
+    def __init__(self, parent, is_catch=False):
+        self.parent = parent
+        self.is_catch = is_catch # Catch clause block: binds only its parameter, var/function go to the function
+        self.children = []
+        self.declared = set()
+        self.free = set() # Undeclared names referenced in this scope or below
+        self.outer = set() # (scope, name) bindings of enclosing scopes referenced in this scope or below
+        self.new_names = {}
+        self.uses = {}
+        if parent is not None:
+            parent.children.append(self)
+
+# --- Tokenizer ---
+def _read_regex(code, start):
+    """Returns the end index of the regular expression literal starting at start."""
+    index = start + 1
+    in_class = False
+    while index < len(code):
+        char = code[index]
+        if char == '\\':
+            index += 2
+            continue
+        if char == '\n':
+            break
+        if in_class:
+            if char == ']':
+                in_class = False
+        elif char == '[':
+            in_class = True
+        elif char == '/':
+            index += 1
+            while index < len(code) and (code[index].isalnum() or code[index] in '_$'):
+                index += 1
+            return index
+        index += 1
+    raise JSMangleError("Unterminated regular expression")
+
+def tokenize(code):
+    """Splits code into _Tokens (whitespace and comments included, so joining the texts gives the code back)."""
+    tokens = []
+    previous = None # Last significant token
+    newline = False
+    index = 0
+    length = len(code)
+    while index < length:
+        if code[index] == '/' and not code.startswith(('//', '/*'), index):
+            is_regex = (previous is None
+                        or (previous.kind == 'punct' and previous.text not in (')', ']', '++', '--'))
+                        or (previous.kind == 'name' and previous.text in REGEX_PRECEDING_KEYWORDS))
+            if is_regex:
+                end = _read_regex(code, index)
+                token = _Token('regex', code[index:end], newline)
+                tokens.append(token)
+                previous, newline, index = token, False, end
+                continue
+        match = TOKEN_PATTERN.match(code, index)
+        if match is None:
+            raise JSMangleError(f"Unsupported character {code[index]!r}")
+        kind = match.lastgroup
+        text = match.group(0)
+        if kind == 'number' and match.end() < length and (code[match.end()].isalnum() or code[match.end()] in '_$'):
+            raise JSMangleError("Unsupported numeric literal")
+        token = _Token(kind, text, newline)
+        tokens.append(token)
+        if kind in ('ws', 'comment'):
+            newline = newline or '\n' in text or '\u2028' in text or '\u2029' in text
+        else:
+            previous, newline = token, False
+        index = match.end()
+    return tokens
+
+# --- Scope Analysis ---
+def _parse_parameters(significant, index, function_scope):
+    """Declares the parameters of the list opening at significant[index] ('(').
+       Returns the index of the body's '{'."""
+    if index >= len(significant) or significant[index].text != '(':
+        raise JSMangleError("Expected parameter list")
+    index += 1
+    expect_name = True
+    while index < len(significant) and significant[index].text != ')':
+        token = significant[index]
+        if expect_name and token.kind == 'name' and token.text not in JS_KEYWORDS | UNSUPPORTED_NAMES:
+            token.role, token.scope = 'decl', function_scope
+            function_scope.declared.add(token.text)
+            expect_name = False
+        elif not expect_name and token.text == ',':
+            expect_name = True
+        else:
+            raise JSMangleError("Unsupported parameter syntax")
+        index += 1
+    index += 1
+    if index >= len(significant) or significant[index].text != '{':
+        raise JSMangleError("Expected function body")
+    return index
+
+def _is_method_shorthand(significant, index):
+    """True if the parenthesized group opening at significant[index] is directly followed by '{'."""
+    depth = 0
+    for position in range(index, len(significant)):
+        text = significant[position].text
+        if text in ('(', '[', '{'):
+            depth += 1
+        elif text in (')', ']', '}'):
+            depth -= 1
+            if depth == 0:
+                return position + 1 < len(significant) and significant[position + 1].text == '{'
+    return False
+
+def _brace_kind(previous):
+    """Classifies a '{' by the token before it: 'block', 'object' literal, or 'unknown' after ':'
+       (which may follow a case label or an object key / ternary)."""
+    if previous is None or previous.text in (')', '{', '}', ';'):
+        return 'block'
+    if previous.kind == 'name' and previous.text in ('else', 'do', 'try', 'finally'):
+        return 'block'
+    if previous.text == ':':
+        return 'unknown'
+    return 'object'
+
+def _declaration_scope(scope, name):
+    """Returns the function (or program) scope a var or function declaration made in scope belongs to."""
+    while scope.is_catch:
+        if name in scope.declared:
+            raise JSMangleError("Declaration shadows a catch parameter")
+        scope = scope.parent
+    return scope
+
+def _analyse(significant):
+    """Assigns roles and scopes to name tokens. Returns the program scope."""
+    program = _Scope(None)
+    scope = program
+    brackets = [] # (opening char, scope closed by it or None, 'block'/'object'/'unknown' for braces)
+    var_states = [] # [bracket depth of a var statement, expecting a declared name]
+    pending_body = None
+    count = len(significant)
+    index = 0
+    while index < count:
+        token = significant[index]
+        previous = significant[index - 1] if index else None
+        following = significant[index + 1] if index + 1 < count else None
+        depth = len(brackets)
+        enclosing = brackets[-1][2] if brackets else None
+        text = token.text
+
+        if token.kind == 'punct':
+            if text in UNSUPPORTED_PUNCTUATORS:
+                raise JSMangleError(f"Unsupported operator {text}")
+            if text in '([{':
+                owned = None
+                brace_kind = None
+                if text == '{':
+                    if pending_body is not None:
+                        scope = owned = pending_body
+                        pending_body = None
+                        brace_kind = 'block'
+                    else:
+                        brace_kind = _brace_kind(previous)
+                brackets.append((text, owned, brace_kind))
+            elif text in ')]}':
+                if not brackets or brackets[-1][0] != {')': '(', ']': '[', '}': '{'}[text]:
+                    raise JSMangleError("Unbalanced brackets")
+                _, owned, _ = brackets.pop()
+                if owned is not None:
+                    scope = owned.parent
+                var_states = [state for state in var_states if state[0] <= len(brackets)]
+            elif text == ';':
+                var_states = [state for state in var_states if state[0] < depth]
+            elif text == ',' and var_states and var_states[-1][0] == depth:
+                var_states[-1][1] = True
+            index += 1
+            continue
+
+        if token.kind != 'name':
+            index += 1
+            continue
+
+        # Property names are never renamed, whatever they are called
+        if previous is not None and previous.text == '.':
+            index += 1
+            continue
+        in_key_position = enclosing in ('object', 'unknown') and previous is not None and previous.text in ('{', ',')
+        if in_key_position and following is not None and following.text == ':':
+            index += 1
+            continue
+        if (in_key_position and text in ('get', 'set') and following is not None and following.kind == 'name'
+                and index + 2 < count and significant[index + 2].text == '('):
+            accessor_scope = _Scope(scope)
+            index = _parse_parameters(significant, index + 2, accessor_scope)
+            pending_body = accessor_scope
+            continue
+
+        if text in UNSUPPORTED_NAMES:
+            raise JSMangleError(f"Unsupported name {text}")
+
+        # A line break ends a var statement when the grammar cannot continue the expression
+        if (var_states and var_states[-1][0] == depth and not var_states[-1][1] and token.newline_before
+                and previous is not None and (previous.kind in EXPRESSION_END_KINDS or previous.text in (')', ']', '}'))):
+            var_states = [state for state in var_states if state[0] < depth]
+
+        if text == 'function':
+            # A function in expression position binds its name only inside itself
+            is_declaration = not (previous is not None and (
+                (previous.kind == 'punct' and previous.text not in (')', ']', '}', ';', '{'))
+                or (previous.kind == 'name' and previous.text in REGEX_PRECEDING_KEYWORDS)))
+            function_scope = _Scope(scope)
+            name_index = index + 1
+            if name_index < count and significant[name_index].kind == 'name':
+                name_token = significant[name_index]
+                if name_token.text in JS_KEYWORDS | UNSUPPORTED_NAMES:
+                    raise JSMangleError("Reserved function name")
+                target = _declaration_scope(scope, name_token.text) if is_declaration else function_scope
+                name_token.role, name_token.scope = 'decl', target
+                target.declared.add(name_token.text)
+                name_index += 1
+            index = _parse_parameters(significant, name_index, function_scope)
+            pending_body = function_scope
+            continue
+        if text == 'var':
+            var_states = [state for state in var_states if state[0] < depth]
+            var_states.append([depth, True])
+            index += 1
+            continue
+        if text == 'catch':
+            if following is not None and following.text == '(':
+                if index + 3 >= count or significant[index + 2].kind != 'name' or significant[index + 3].text != ')':
+                    raise JSMangleError("Unsupported catch binding")
+                if index + 4 >= count or significant[index + 4].text != '{':
+                    raise JSMangleError("Expected catch block")
+                catch_scope = _Scope(scope, is_catch=True)
+                name_token = significant[index + 2]
+                name_token.role, name_token.scope = 'decl', catch_scope
+                catch_scope.declared.add(name_token.text)
+                pending_body = catch_scope
+                index += 4
+                continue
+            index += 1
+            continue
+        if text in JS_KEYWORDS:
+            if text == 'in' and var_states and var_states[-1][0] == depth:
+                var_states.pop()
+            index += 1
+            continue
+        if previous is not None and previous.text in ('break', 'continue'):
+            index += 1
+            continue # Label reference
+        if following is not None and following.text == ':' and (previous is None or previous.text in (';', '{', '}')):
+            index += 1
+            continue # Label definition
+
+        if var_states and var_states[-1][0] == depth and var_states[-1][1]:
+            target = _declaration_scope(scope, text)
+            token.role, token.scope = 'decl', target
+            target.declared.add(text)
+            var_states[-1][1] = False
+            index += 1
+            continue
+        if in_key_position and following is not None and following.text in (',', '}'):
+            raise JSMangleError("Possible shorthand property")
+        if in_key_position and following is not None and following.text == '(' and _is_method_shorthand(significant, index + 1):
+            raise JSMangleError("Possible method shorthand")
+
+        token.role, token.scope = 'ref', scope
+        index += 1
+
+    if brackets or pending_body is not None:
+        raise JSMangleError("Unbalanced brackets")
+    return program
+
+def _resolve(significant):
+    """Links every declaration and reference to its binding and records, per scope, the outside names
+       its subtree depends on."""
+    for token in significant:
+        if token.role == 'decl':
+            token.binding = token.scope
+        elif token.role == 'ref':
+            scope = token.scope
+            while scope is not None and token.text not in scope.declared:
+                scope = scope.parent
+            token.binding = scope
+            walker = token.scope
+            while walker is not scope:
+                if scope is None:
+                    walker.free.add(token.text)
+                else:
+                    walker.outer.add((scope, token.text))
+                walker = walker.parent
+        else:
+            continue
+        if token.binding is not None:
+            token.binding.uses[token.text] = token.binding.uses.get(token.text, 0) + 1
+
+def _short_names():
+    """Yields a, b, ... $, aa, ab, ... skipping reserved words."""
+    length = 1
+    while True:
+        for position in range(len(NAME_FIRST_CHARS) * len(NAME_CHARS) ** (length - 1)):
+            first, rest = divmod(position, len(NAME_CHARS) ** (length - 1))
+            name = NAME_FIRST_CHARS[first]
+            for _ in range(length - 1):
+                rest, char_index = divmod(rest, len(NAME_CHARS))
+                name += NAME_CHARS[char_index]
+            if name not in RESERVED_NAMES:
+                yield name
+        length += 1
+
+def _assign_names(scope):
+    """Gives the declarations of every function scope below scope the shortest free names, most used first."""
+    pending = list(scope.children)
+    for name in scope.declared:
+        scope.new_names[name] = name # Program scope: globals keep their names
+    while pending:
+        current = pending.pop()
+        forbidden = set(current.free)
+        forbidden.update(binding.new_names[name] for binding, name in current.outer)
+        enclosing = current
+        while enclosing.is_catch:
+            # var and function declarations inside the catch block bind in the enclosing function
+            enclosing = enclosing.parent
+            forbidden.update(enclosing.new_names.values())
+        candidates = _short_names()
+        for name in sorted(current.declared, key=lambda declared: (-current.uses.get(declared, 0), declared)):
+            candidate = next(candidates)
+            while candidate in forbidden:
+                candidate = next(candidates)
+            current.new_names[name] = candidate
+        pending.extend(current.children)
+
+# --- Constant Folding ---
+def _format_number(value):
+    """JavaScript source for a folded number, or None if it cannot be written exactly and compactly."""
+    if math.isnan(value) or math.isinf(value) or (value == 0 and math.copysign(1, value) < 0):
+        return None
+    if value == int(value) and abs(value) < 1e21:
+        return str(int(value))
+    text = repr(value)
+    if 'e' in text:
+        return None
+    if text.startswith('0.'):
+        return text[1:]
+    if text.startswith('-0.'):
+        return '-' + text[2:]
+    return text
+
+def _fold_pair(left, operator, right):
+    """Folds two literal tokens joined by operator. Returns the new source text or None."""
+    if left.kind == 'number' and right.kind == 'number':
+        values = []
+        for token in (left, right):
+            text = token.text
+            if len(text) > 1 and text[0] == '0' and text[1].isdigit():
+                return None # Legacy octal literal
+            values.append(float(int(text, 16)) if text[:2] in ('0x', '0X') else float(text))
+        a, b = values
+        if operator == '+': result = a + b
+        elif operator == '-': result = a - b
+        elif operator == '*': result = a * b
+        elif b == 0: return None
+        elif operator == '/': result = a / b
+        else: result = math.fmod(a, b)
+        return _format_number(result)
+    if left.kind == 'string' and right.kind == 'string' and operator == '+' and left.text[0] == right.text[0]:
+        if '\\' in left.text[-5:-1]:
+            return None # A trailing escape could merge with the next string's first characters
+        return left.text[:-1] + right.text[1:]
+    return None
+
+def fold_constants(tokens):
+    """Folds literal arithmetic and string concatenation whose operands are bounded by lower-precedence
+       tokens on both sides (e.g. "x=60*60*24;" -> "x=86400;"). Works in place on the token list."""
+    changed = True
+    while changed:
+        changed = False
+        significant = [index for index, token in enumerate(tokens) if token.kind not in ('ws', 'comment')]
+        position = 0
+        while position + 2 < len(significant):
+            left, operator, right = (tokens[significant[position + offset]] for offset in range(3))
+            if (left.kind in ('number', 'string') and operator.kind == 'punct' and operator.text in FOLD_OPERATORS
+                    and right.kind == left.kind):
+                before = tokens[significant[position - 1]].text if position else ';'
+                after = tokens[significant[position + 3]] if position + 3 < len(significant) else None
+                after_text = after.text if after is not None else None
+                rank = FOLD_OPERATORS[operator.text]
+                right_ok = (after_text in FOLD_RIGHT_BOUNDARIES
+                            or (after_text in FOLD_OPERATORS and FOLD_OPERATORS[after_text] <= rank))
+                # A product can also follow + or -, unary or binary, since it binds tighter either way
+                left_ok = before in FOLD_LEFT_BOUNDARIES or (rank == 2 and before in ('+', '-'))
+                if left_ok and right_ok and not (after is not None and after.newline_before):
+                    folded = _fold_pair(left, operator.text, right)
+                    span_text = ''.join(token.text for token in tokens[significant[position]:significant[position + 2] + 1])
+                    if folded is not None and len(folded) <= len(span_text):
+                        for token_index in range(significant[position] + 1, significant[position + 2] + 1):
+                            tokens[token_index].kind, tokens[token_index].text = 'ws', ''
+                        left.text = folded
+                        changed = True
+                        position += 3
+                        continue
+            position += 1
+
+# --- Entry Point ---
+def mangle_js(code):
+    """Shortens local variable, parameter and function names and folds literal constants.
+       Globals, properties and labels keep their names. Raises JSMangleError if the code is outside the
+       supported ES5 subset, in which case the input should be used unchanged."""
+    tokens = tokenize(code)
+    significant = [token for token in tokens if token.kind not in ('ws', 'comment')]
+    program = _analyse(significant)
+    _resolve(significant)
+    _assign_names(program)
+    for token in significant:
+        if token.role in ('decl', 'ref') and token.binding is not None and token.binding is not program:
+            token.text = token.binding.new_names[token.text]
+    fold_constants(tokens)
+    return ''.join(token.text for token in tokens)
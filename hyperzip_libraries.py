@@ -0,0 +1,243 @@
+import os
+import re
+import hashlib
+import threading
+import jsmin
+from hyperzip_core import _log_func, Fore, Style
+from hyperzip_utils import load_text_asset, find_text_references
+from hyperzip_cache import load_json_file, save_json_file
+
+LIBRARY_RULES_FILE = "hyperzip_libraries.json" # Per-project rule set, placed in the project folder
+LIBRARY_INDEX_FILE = "library_index.json" # Learned fingerprints, kept in the cache folder
+LIBRARY_INDEX_VERSION = 2 # 1 also held signature-only matches
+LIBRARY_MIN_BYTES = 8 * 1024 # Smaller scripts are banner code, not a bundled library
+LIBRARY_ACTIONS = ('skip', 'cdn', 'keep')
+
+# Library id -> (display name, markers that must all appear, version patterns tried in order).
+# Markers are property or identifier names that survive re-minification, and are not used by
+# code that merely calls the library.
+LIBRARY_SIGNATURES = {
+    'gsap': ('GSAP', ('_gsap', 'registerPlugin'),
+             (r'GSAP (\d+\.\d+\.\d+)', r'version\s*:\s*["\'](\d+\.\d+\.\d+)["\']')),
+    'tweenmax': ('GSAP 2 (TweenMax/TweenLite)', ('_gsDefine', 'TweenLite'),
+                 (r'VERSION\s*[=:]\s*["\'](\d+\.\d+\.\d+)["\']', r'(?:TweenMax|TweenLite)\D{0,20}(\d+\.\d+\.\d+)')),
+    'createjs': ('CreateJS', ('createjs', 'EventDispatcher'),
+                 (r'version\s*=\s*(?:/\*=version\*/)?\s*["\'](\d+\.\d+\.\d+)["\']',)),
+    'jquery': ('jQuery', ('jQuery', 'Sizzle'),
+               (r'jQuery (?:JavaScript Library )?v?(\d+\.\d+\.\d+)', r'version\s*=\s*["\'](\d+\.\d+\.\d+)["\']')),
+    'lottie': ('Lottie', ('bodymovin', 'loadAnimation'),
+               (r'version\s*[:=]\s*["\'](\d+\.\d+\.\d+)["\']',)),
+}
+# Exact SHA-256 of stock library builds -> entry, checked before the learned index.
+# Only builds whose files were hashed as distributed belong here; project-specific builds go
+# into "fingerprints" in the project rule file.
+BUILTIN_LIBRARY_FINGERPRINTS = {
+    'df3941e6cdaec28533ad72b7053ec05f7172be88ecada345c42736bc2ffba4d2': {'library': 'jquery', 'version': '3.6.1'}, # jquery-3.6.1.js
+    'a3cf00c109d907e543bc4f6dbc85eb31068f94515251347e9e57509b52ee3d74': {'library': 'jquery', 'version': '3.6.1'}, # jquery-3.6.1.min.js
+    'b579beb1ad6ecec6c59db5edf0626ab208b64f0fa6e012c60e87fa7943e36ed9': {'library': 'jquery', 'version': '3.6.1'}, # jquery-3.6.1.slim.js
+    'c3c0af845b3b88735552d9d23f460a120d34a7d221d77ae52fdcc6aaf2dd78f0': {'library': 'jquery', 'version': '3.6.1'}, # jquery-3.6.1.slim.min.js
+    '78a85aca2f0b110c29e0d2b137e09f0a1fb7a8e554b499f740d6744dc8962cfe': {'library': 'jquery', 'version': '3.7.1'}, # jquery-3.7.1.js
+    'fc9a93dd241f6b045cbff0481cf4e1901becd0e12fb45166a8f17f95823f0b1a': {'library': 'jquery', 'version': '3.7.1'}, # jquery-3.7.1.min.js
+    '520bef37cbc19203b496e3d2525dacf13225392611a061405f88e50889bd01d7': {'library': 'jquery', 'version': '3.7.1'}, # jquery-3.7.1.slim.js
+    '9261efb3407e3a9096e4654750d8eff6b3a663422f48845c7fbcc65034c340cf': {'library': 'jquery', 'version': '3.7.1'}, # jquery-3.7.1.slim.min.js
+}
+SCRIPT_SRC_PATTERN = re.compile(r'''(<script\b[^>]*?\bsrc\s*=\s*)(["'])([^"']+)\2''', re.IGNORECASE)
+HTML_EXTENSIONS = {'.html', '.htm'}
+_library_index_lock = threading.Lock() # Serializes read-merge-write of the index file across folder workers
+
+# --- Fingerprints ---
+def _exact_hash(raw_bytes):
+    return hashlib.sha256(raw_bytes).hexdigest()
+
+def _normalized_hash(text):
+    """Hash that ignores comments and whitespace, so re-minified copies of a build still match."""
+    normalized = re.sub(r'/\*.*?\*/', '', jsmin.jsmin(text), flags=re.DOTALL)
+    return hashlib.sha256(re.sub(r'\s+', '', normalized).encode('utf-8', 'surrogatepass')).hexdigest()
+
+def match_library_signature(text):
+    """Identifies a bundled library by its signature markers. Returns {'library', 'version'} or None."""
+    for library, (_, markers, version_patterns) in LIBRARY_SIGNATURES.items():
+        if all(marker in text for marker in markers):
+            version = None
+            for pattern in version_patterns:
+                match = re.search(pattern, text)
+                if match:
+                    version = match.group(1)
+                    break
+            return {'library': library, 'version': version}
+    return None
+
+class LibraryIndex:
+    """Fingerprint index of known library builds: exact SHA-256 of the file and a normalized hash.
+       Seeded from BUILTIN_LIBRARY_FINGERPRINTS and the project rule file's "fingerprints", and extended with the exact hash of every
+       re-minified copy matched by normalized hash, so later runs recognize it by a single hash.
+       Signature matches are never recorded: marker strings also appear in bundles that add
+       banner code to the library."""
+
+    def __init__(self, cache_dir, fingerprints=None):
+        self.path = os.path.join(cache_dir, LIBRARY_INDEX_FILE) if cache_dir else None
+        self.exact = {}
+        self.normalized = {}
+        self.dirty = False
+        if self.path:
+            data = load_json_file(self.path, default={})
+            if isinstance(data, dict) and data.get("version") == LIBRARY_INDEX_VERSION:
+                self.exact = data.get("exact", {})
+                self.normalized = data.get("normalized", {})
+        self.project_fingerprints = {key.lower(): value for key, value in (fingerprints or {}).items()}
+
+    def identify(self, raw_bytes, text):
+        """Returns (entry, matched_by) for a script, where entry is {'library', 'version'} and matched_by
+           is 'fingerprint' (exact or normalized hash) or 'signature' (marker strings only).
+           Returns (None, None) if it is not a known library."""
+        exact_hash = _exact_hash(raw_bytes)
+        entry = (self.project_fingerprints.get(exact_hash) or BUILTIN_LIBRARY_FINGERPRINTS.get(exact_hash)
+                 or self.exact.get(exact_hash))
+        if entry:
+            return entry, 'fingerprint'
+        if self.normalized or self.project_fingerprints:
+            normalized_hash = _normalized_hash(text)
+            entry = self.project_fingerprints.get(normalized_hash) or self.normalized.get(normalized_hash)
+            if entry:
+                self.exact[exact_hash] = entry
+                self.normalized[normalized_hash] = entry
+                self.dirty = True
+                return entry, 'fingerprint'
+        entry = match_library_signature(text)
+        return (entry, 'signature') if entry else (None, None)
+
+    def save(self):
+        """Merges the learned hashes into the index file, keeping entries other folders saved meanwhile."""
+        if not self.path or not self.dirty:
+            return
+        with _library_index_lock:
+            data = load_json_file(self.path, default={})
+            if isinstance(data, dict) and data.get("version") == LIBRARY_INDEX_VERSION:
+                self.exact = dict(data.get("exact", {}), **self.exact)
+                self.normalized = dict(data.get("normalized", {}), **self.normalized)
+            if save_json_file(self.path, {"version": LIBRARY_INDEX_VERSION, "exact": self.exact, "normalized": self.normalized}):
+                self.dirty = False
+
+# --- Rules ---
+def load_library_rules(project_folder):
+    """Loads the project's library rule file, e.g.
+         {"rules": {"gsap": {"action": "cdn", "url": "https://s0.2mdn.net/ads/studio/cached_libs/gsap_{version}_min.js"},
+                    "jquery": {"action": "skip"}},
+          "fingerprints": {"<sha256>": {"library": "gsap", "version": "3.11.5"}}}
+       Actions: "skip" keeps the file untouched, "cdn" points the HTML at the URL and drops the file,
+       "keep" processes it like any other script. Returns {'rules': {...}, 'fingerprints': {...}}."""
+    rules_path = os.path.join(project_folder, LIBRARY_RULES_FILE)
+    data = load_json_file(rules_path, default={}) if os.path.isfile(rules_path) else {}
+    if not isinstance(data, dict):
+        data = {}
+    rules = {}
+    for library, rule in (data.get("rules") or {}).items():
+        if not isinstance(rule, dict) or rule.get("action") not in LIBRARY_ACTIONS:
+            _log_func(f"{Fore.YELLOW}  Warn: Ignoring invalid library rule for '{library}' in {LIBRARY_RULES_FILE}.{Style.RESET_ALL}")
+            continue
+        if rule["action"] == "cdn" and not rule.get("url"):
+            _log_func(f"{Fore.YELLOW}  Warn: Library rule for '{library}' needs a 'url' for the cdn action.{Style.RESET_ALL}")
+            continue
+        rules[library.lower()] = rule
+    fingerprints = data.get("fingerprints") if isinstance(data.get("fingerprints"), dict) else {}
+    return {'rules': rules, 'fingerprints': fingerprints}
+
+def _point_scripts_to_cdn(folder_path, library_path, url):
+    """Rewrites the <script src> tags that load library_path to url.
+       Returns {html_path: new_bytes} if that leaves no other reference to the file, else None."""
+    library_path = os.path.normcase(os.path.abspath(library_path))
+    library_name = os.path.basename(library_path)
+    rewritten = {}
+
+    def replace_src(match, html_dir):
+        src = match.group(3).split('?', 1)[0].split('#', 1)[0]
+        if '://' in src or src.startswith('//'):
+            return match.group(0)
+        if os.path.normcase(os.path.abspath(os.path.join(html_dir, src))) != library_path:
+            return match.group(0)
+        return f"{match.group(1)}{match.group(2)}{url}{match.group(2)}"
+
+    for text_path in find_text_references(folder_path, library_name):
+        if os.path.normcase(os.path.abspath(text_path)) == library_path:
+            continue # e.g. its own sourceMappingURL comment
+        if os.path.splitext(text_path)[1].lower() not in HTML_EXTENSIONS:
+            return None # Loaded from a script or manifest, which we cannot rewrite safely
+        with open(text_path, 'rb') as f:
+            content = f.read().decode('latin-1')
+        html_dir = os.path.dirname(text_path)
+        new_content = SCRIPT_SRC_PATTERN.sub(lambda match: replace_src(match, html_dir), content)
+        remaining = new_content.replace(url, '')
+        if re.search(r'(?<![\w.\-])' + re.escape(library_name) + r'(?![\w\-])', remaining):
+            return None # Also referenced outside a script tag (preload link, inline loader...)
+        rewritten[text_path] = new_content.encode('latin-1')
+    return rewritten or None
+
+def apply_library_rules(folder_path, library_rules=None, cache_dir=None, default_action='skip'):
+    """Flags bundled copies of known libraries (GSAP, CreateJS, jQuery, Lottie...) in the folder and
+       applies the project's rule for each: point the HTML at the platform CDN and drop the file, or
+       leave the file untouched. default_action applies to fingerprint matches without a rule; scripts
+       recognized by signature alone are processed normally unless a rule says otherwise.
+       Returns the set of script paths later stages must not re-process."""
+    library_rules = library_rules or {'rules': {}, 'fingerprints': {}}
+    index = LibraryIndex(cache_dir, library_rules.get('fingerprints'))
+    untouched = set()
+
+    scripts = []
+    for root, _, files in os.walk(folder_path):
+        for file in files:
+            if file.lower().endswith('.js'):
+                scripts.append(os.path.join(root, file))
+
+    for script_path in scripts:
+        try:
+            if os.path.getsize(script_path) < LIBRARY_MIN_BYTES:
+                continue
+        except OSError:
+            continue
+        raw_bytes, text, _ = load_text_asset(script_path)
+        if text is None:
+            continue
+        entry, matched_by = index.identify(raw_bytes, text)
+        if entry is None:
+            continue
+
+        library = entry.get('library', 'unknown')
+        version = entry.get('version')
+        display_name = LIBRARY_SIGNATURES.get(library, (library,))[0]
+        label = f"{display_name} {version}" if version else display_name
+        script_name = os.path.basename(script_path)
+        rule = library_rules['rules'].get(library) or library_rules['rules'].get('*')
+        if rule is None:
+            # Marker strings do not make a file a stock build, so only fingerprint matches skip by default
+            rule = {'action': default_action if matched_by == 'fingerprint' else 'keep'}
+        action = rule['action']
+        if action == 'cdn' and matched_by == 'signature':
+            # The markers prove the library is inside, not that the file holds nothing else
+            _log_func(f"{Fore.YELLOW}  Warn: {script_name} looks like {label} by signature only; keeping it. Add its SHA-256 "
+                      f"({_exact_hash(raw_bytes)}) to \"fingerprints\" in {LIBRARY_RULES_FILE} to allow the CDN.{Style.RESET_ALL}")
+            action = 'skip'
+
+        if action == 'cdn':
+            url = rule['url'].format(library=library, version=version or '')
+            rewritten = _point_scripts_to_cdn(folder_path, script_path, url) if version or '{version}' not in rule['url'] else None
+            if rewritten:
+                try:
+                    for html_path, content in rewritten.items():
+                        with open(html_path, 'wb') as f:
+                            f.write(content)
+                    os.remove(script_path)
+                    _log_func(f"    {Fore.GREEN}{script_name}: {label} -> CDN {url} (saved {len(raw_bytes)/1024:.1f} KB){Style.RESET_ALL}")
+                    continue
+                except OSError as e:
+                    _log_func(f"{Fore.RED}  Error replacing {script_name} with CDN tag: {e}{Style.RESET_ALL}")
+            else:
+                _log_func(f"{Fore.YELLOW}  Warn: {script_name} ({label}) cannot be switched to the CDN safely, keeping it.{Style.RESET_ALL}")
+            untouched.add(script_path)
+        elif action == 'skip':
+            untouched.add(script_path)
+            _log_func(f"    {Fore.CYAN}{script_name}: {label} detected, kept as is{Style.RESET_ALL}")
+        else:
+            _log_func(f"    {Fore.CYAN}{script_name}: {label} detected, processed normally{Style.RESET_ALL}")
+
+    index.save()
+    return untouched
@@ -2,14 +2,18 @@ import os
 import sys
 import io
 import traceback
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
 from hyperzip_core import _log_func, Fore, Style, DEFAULT_SETTINGS, set_logger
-from hyperzip_utils import cleanup_temp_folders
+from hyperzip_utils import cleanup_temp_folders, shutdown_process_pool
 from hyperzip_archive import get_archive_profiles, process_and_archive_folder
+from hyperzip_scheduler import configure_archiver_scheduler
 
 # --- Main Function ---
 def run_packing(settings, logger_func=print):
     """Main logic: finds folders in PROJECT_FOLDER, processes them, shows summary.
        Accepts a dictionary of settings and a logger function."""
+    settings = dict(settings) # Values normalized below apply to this run only, not the caller's dict
     
     # Set the logger for this run
     set_logger(logger_func)
@@ -54,7 +58,43 @@ def run_packing(settings, logger_func=print):
     _log_func(f"{Fore.CYAN}Selected Profile: {selected_profile_name} (Using: {profile_tool}, Output: {profile_ext}){Style.RESET_ALL}")
     _log_func(f"Target archive size: <= {max_size_kb_limit} KB")
 
-    if not archiver_path or not os.path.exists(archiver_path):
+    # --- Multiple Profiles: every format of OUTPUT_PROFILES, or the smallest of ALLOWED_ARCHIVE_PROFILES ---
+    multi_profile_setting = next((key for key in ('OUTPUT_PROFILES', 'ALLOWED_ARCHIVE_PROFILES') if settings.get(key)), None)
+    if multi_profile_setting:
+        usable_profiles = []
+        for profile_name in settings[multi_profile_setting]:
+            profile_config = archive_profiles_config.get(profile_name)
+            if profile_config is None:
+                _log_func(f"{Fore.YELLOW}Warning: Unknown profile '{profile_name}' in {multi_profile_setting}, ignored.{Style.RESET_ALL}")
+            elif profile_config["tool_family"] != "native" and not (profile_config["executable"] and os.path.exists(profile_config["executable"])):
+                _log_func(f"{Fore.YELLOW}Warning: Archiver for '{profile_name}' not found at {profile_config['executable']}, profile ignored.{Style.RESET_ALL}")
+            else:
+                usable_profiles.append(profile_name)
+        # Every requested deliverable format must be available; for allowed profiles one is enough
+        if not usable_profiles or (multi_profile_setting == 'OUTPUT_PROFILES' and len(usable_profiles) < len(settings[multi_profile_setting])):
+            _log_func(f"{Fore.RED}Error: Not all profiles in {multi_profile_setting} can be used.{Style.RESET_ALL}")
+            os.chdir(original_cwd)
+            return {"success": False, "message": f"Unusable profile in {multi_profile_setting}."}
+        usable_profiles = list(dict.fromkeys(usable_profiles))
+        if multi_profile_setting == 'OUTPUT_PROFILES':
+            # Each output profile is written to <folder><extension>, so two profiles sharing one would overwrite each other
+            profiles_by_extension = {}
+            for profile_name in usable_profiles:
+                profiles_by_extension.setdefault(archive_profiles_config[profile_name]["extension"], []).append(profile_name)
+            clashes = {extension: names for extension, names in profiles_by_extension.items() if len(names) > 1}
+            if clashes:
+                for extension, names in clashes.items():
+                    _log_func(f"{Fore.RED}Error: OUTPUT_PROFILES {', '.join(names)} all write {extension} archives; keep one per extension.{Style.RESET_ALL}")
+                os.chdir(original_cwd)
+                return {"success": False, "message": "OUTPUT_PROFILES share an archive extension."}
+        settings[multi_profile_setting] = usable_profiles
+        if multi_profile_setting == 'OUTPUT_PROFILES':
+            _log_func(f"{Fore.CYAN}Output profiles: {', '.join(settings['OUTPUT_PROFILES'])} (every format is written and must fit){Style.RESET_ALL}")
+        else:
+            _log_func(f"{Fore.CYAN}Allowed profiles: {', '.join(usable_profiles)} (smallest archive per folder wins){Style.RESET_ALL}")
+    elif profile_tool == "native":
+         _log_func(f"{Fore.GREEN}Archiver '{profile_tool}': built-in ZIP writer, no executable needed.{Style.RESET_ALL}")
+    elif not archiver_path or not os.path.exists(archiver_path):
          _log_func(f"{Fore.RED}Error: Archiver '{profile_tool}' executable not found at: {archiver_path}{Style.RESET_ALL}")
          _log_func(f"{Fore.YELLOW}Please check the path in the GUI settings.{Style.RESET_ALL}")
          os.chdir(original_cwd)
@@ -117,12 +157,18 @@ def run_packing(settings, logger_func=print):
         enable_html = minify_settings.get('ENABLE_HTML_MINIFICATION', False)
         enable_css = minify_settings.get('ENABLE_CSS_MINIFICATION', False)
         enable_js = minify_settings.get('ENABLE_JS_MINIFICATION', False)
-        enable_minification = enable_html or enable_css or enable_js
+        enable_svg = minify_settings.get('ENABLE_SVG_MINIFICATION', False)
+        enable_json = minify_settings.get('ENABLE_JSON_MINIFICATION', False)
+        enable_xml = minify_settings.get('ENABLE_XML_MINIFICATION', False)
+        enable_minification = enable_html or enable_css or enable_js or enable_svg or enable_json or enable_xml
         _log_func(f"{Fore.YELLOW}Minification: {'Enabled' if enable_minification else 'Disabled'}{Style.RESET_ALL}")
         if enable_minification:
             _log_func(f"  HTML: {'Enabled' if enable_html else 'Disabled'}")
             _log_func(f"  CSS: {'Enabled' if enable_css else 'Disabled'}")
             _log_func(f"  JS: {'Enabled' if enable_js else 'Disabled'}")
+            _log_func(f"  SVG: {'Enabled' if enable_svg else 'Disabled'}")
+            _log_func(f"  JSON: {'Enabled' if enable_json else 'Disabled'}")
+            _log_func(f"  XML: {'Enabled' if enable_xml else 'Disabled'}")
     else:
         # Old structure with single setting
         enable_minification = settings.get('ENABLE_MINIFICATION', False)
@@ -150,17 +196,30 @@ def run_packing(settings, logger_func=print):
 
     # --- Process Each Folder ---
     base_dir = os.getcwd() # The project_folder is our base now
-    for folder_name in folders_to_process:
+    # Archiver subprocesses share one thread budget; with ARCHIVE_JOBS > 1 folders are processed concurrently
+    scheduler = configure_archiver_scheduler(settings.get('ARCHIVER_THREADS') or None, settings.get('ARCHIVE_JOBS', 1))
+    if scheduler.max_jobs > 1 and len(folders_to_process) > 1:
+        _log_func(f"{Fore.CYAN}Processing up to {scheduler.max_jobs} folders at once, {scheduler.threads_per_job} archiver thread(s) each.{Style.RESET_ALL}")
+        folder_executor = ThreadPoolExecutor(max_workers=scheduler.max_jobs)
+    else:
+        folder_executor = None
+
+    if settings.get('OUTPUT_PROFILES'):
+        output_label = ', '.join(f"{{folder}}{archive_profiles_config[name]['extension']}" for name in settings['OUTPUT_PROFILES'])
+    elif settings.get('ALLOWED_ARCHIVE_PROFILES'):
+        output_label = "best of allowed profiles"
+    else:
+        output_label = f"{{folder}}{profile_ext}"
+
+    def archive_folder(folder_name):
         current_folder_path = os.path.join(base_dir, folder_name) # Absolute path to the folder being processed
-        archive_output_filename = f"{folder_name}{profile_ext}"
-        _log_func(f"{Fore.CYAN}Processing: {folder_name} -> {archive_output_filename}{Style.RESET_ALL}")
+        _log_func(f"{Fore.CYAN}Processing: {folder_name} -> {output_label.format(folder=folder_name)}{Style.RESET_ALL}")
+        return process_and_archive_folder(current_folder_path, base_dir, settings, archive_profiles_config)
 
-        # Call the refactored processing function
-        # _log_func(f"  {Fore.WHITE}DEBUG: Calling process_and_archive_folder for '{folder_name}'...{Style.RESET_ALL}") # Removed DEBUG log
-        final_size_kb, original_size_kb, final_png_level, final_jpeg = process_and_archive_folder(
-            current_folder_path, base_dir, settings, archive_profiles_config
-        )
-        # _log_func(f"  {Fore.WHITE}DEBUG: process_and_archive_folder returned: size={final_size_kb}, original={original_size_kb}, png={final_png_level}, jpeg={final_jpeg}{Style.RESET_ALL}") # Removed DEBUG log
+    # Results are analysed in folder order as they become available
+    folder_outcomes = folder_executor.map(archive_folder, folders_to_process) if folder_executor else map(archive_folder, folders_to_process)
+    for folder_name, (final_size_kb, original_size_kb, final_png_level, final_jpeg, written_archives) in zip(folders_to_process, folder_outcomes):
+        archive_output_filename = ', '.join(written_archives) or f"{folder_name}{profile_ext}"
 
         # --- Analyze Result for this Folder ---
         folder_result = {
@@ -170,8 +229,11 @@ def run_packing(settings, logger_func=print):
             "original_size_kb": original_size_kb,
             "png_level": int(final_png_level),
             "jpeg_quality": int(final_jpeg),
-            "status": "Error" # Default status
+            "status": "Error", # Default status
+            "archives": written_archives # Archive file name -> size KB (one entry per OUTPUT_PROFILES format)
         }
+        if len(written_archives) > 1:
+            _log_func(f"  {Fore.CYAN}Formats: {', '.join(f'{name} {size_kb:.2f} KB' + (' (over limit)' if size_kb > max_size_kb_limit else '') for name, size_kb in written_archives.items())}{Style.RESET_ALL}")
 
         if final_size_kb == -1:
             _log_func(f"{Fore.RED}Failed: Critical error processing {folder_name}. Skipping.{Style.RESET_ALL}")
@@ -180,7 +242,9 @@ def run_packing(settings, logger_func=print):
         elif final_size_kb > max_size_kb_limit:
             _log_func(f"{Fore.RED}Result: COULD NOT reduce {folder_name} to <= {max_size_kb_limit} KB.{Style.RESET_ALL}")
             _log_func(f"{Fore.RED}        Final size was {final_size_kb:.2f} KB (at PNG={int(final_png_level)}, JPEG={int(final_jpeg)}).{Style.RESET_ALL}")
-            oversized_info = f"{folder_name} ({final_size_kb:.2f} KB @ PNG={int(final_png_level)}/JPEG={int(final_jpeg)})"
+            oversized_names = [name for name, size_kb in written_archives.items() if size_kb > max_size_kb_limit]
+            oversized_label = ', '.join(oversized_names) if len(written_archives) > 1 else folder_name
+            oversized_info = f"{oversized_label} ({final_size_kb:.2f} KB @ PNG={int(final_png_level)}/JPEG={int(final_jpeg)})"
             oversized_files_final.append(oversized_info)
             fail_count += 1
             total_size_kb += final_size_kb # Add final size even if oversized
@@ -195,16 +259,24 @@ def run_packing(settings, logger_func=print):
         results_summary.append(folder_result)
         _log_func("-" * 30)
 
+    if folder_executor:
+        folder_executor.shutdown(wait=True)
+
     # --- Final Cleanup Check (in project_folder) ---
     _log_func(f"{Fore.WHITE}Final cleanup check in {project_folder}...{Style.RESET_ALL}")
     items_cleaned = cleanup_temp_folders(base_dir)
+    shutdown_process_pool() # Stop minification workers until the next run
 
     # --- Final Summary ---
     summary_lines = []
     summary_lines.append("\n" + f"{Fore.YELLOW}=============== Summary ==============={Style.RESET_ALL}")
-    summary_lines.append(f"Profile used: {selected_profile_name}")
+    summary_lines.append(f"Profile used: {', '.join(settings[multi_profile_setting]) if multi_profile_setting else selected_profile_name}")
     summary_lines.append(f"{Fore.GREEN}Successful archives (<= {max_size_kb_limit} KB): {success_count}{Style.RESET_ALL}")
     summary_lines.append(f"{Fore.RED}Failed/Oversized archives: {fail_count}{Style.RESET_ALL}")
+    archiver_job_count, archiver_wall, archiver_cpu = scheduler.totals()
+    if archiver_job_count:
+        cpu_text = f", {archiver_cpu:.2f}s CPU" if archiver_cpu is not None else ""
+        summary_lines.append(f"{Fore.WHITE}Archiver runs: {archiver_job_count} ({archiver_wall:.2f}s wall{cpu_text}){Style.RESET_ALL}")
 
     if success_count > 0 or fail_count > 0:
         # Calculate average size of successful archives only
@@ -247,6 +319,7 @@ def run_packing(settings, logger_func=print):
 
 # --- Script Entry Point (for standalone execution) ---
 if __name__ == "__main__":
+    multiprocessing.freeze_support() # Process pool workers in frozen builds
     # When run directly, use default settings and standard print
     print("Running hyperzip_main.py directly with default settings...")
     # Use default settings defined at the top
@@ -1,5 +1,14 @@
 import os
+import re
+import time
+import json
+import hashlib
+import importlib.metadata
+import multiprocessing
+from concurrent.futures.process import BrokenProcessPool
 from hyperzip_core import _log_func, Fore, Style
+from hyperzip_utils import get_process_pool, reset_process_pool, load_text_asset
+from hyperzip_jsmangle import mangle_js
 
 # Import minification libraries
 try:
@@ -10,78 +19,574 @@ except ImportError as e:
     _log_func(f"{Fore.RED}Error: Missing minification library: {e.name}. Install with pip.{Style.RESET_ALL}")
     raise
 
+# Minifier options (also part of the cache key, so changing them invalidates cached output)
+HTML_MINIFY_OPTIONS = {'remove_empty_space': True, 'remove_comments': True}
+CSS_MINIFY_OPTIONS = {'preserve_exclamation_comments': False}
+
+# --- Inline Code in HTML ---
+INLINE_SCRIPT_PATTERN = re.compile(r'(<script\b[^>]*>)(.*?)(</script\s*>)', re.IGNORECASE | re.DOTALL)
+INLINE_STYLE_PATTERN = re.compile(r'(<style\b[^>]*>)(.*?)(</style\s*>)', re.IGNORECASE | re.DOTALL)
+HTML_TAG_PATTERN = re.compile(r'<[A-Za-z][^<>]*>')
+STYLE_ATTRIBUTE_PATTERN = re.compile(r'''(\sstyle\s*=\s*)(["'])(.*?)\2''', re.IGNORECASE | re.DOTALL)
+SCRIPT_TYPE_PATTERN = re.compile(r'''\stype\s*=\s*["']?([^"'\s>]+)''', re.IGNORECASE)
+# <script type> values that hold JavaScript; anything else (JSON, templates) is left alone
+JS_SCRIPT_TYPES = {'text/javascript', 'application/javascript', 'application/x-javascript', 'text/ecmascript', 'module'}
+# Markers of legacy comment hiding or templating that a plain JS/CSS minifier could break
+INLINE_UNSAFE_MARKERS = ('<!--', '-->', '<![CDATA[', '{{', '{%')
+INLINE_PARALLEL_MIN_BYTES = 32 * 1024 # Inline blocks at least this large are minified on the process pool
+INLINE_CACHE_MAX_ENTRIES = 512
+_inline_cache = {} # sha1 of (kind, code) -> minified code, shared by all HTML files handled by this process
+
+def _minify_inline_code(kind, code, js_mangle=False):
+    """Minifies one inline script ('js'), stylesheet ('css') or style attribute ('style') body."""
+    if kind == 'js':
+        return Minifier.minify_js(code, js_mangle).strip()
+    if kind == 'css':
+        return csscompressor.compress(code, **CSS_MINIFY_OPTIONS)
+    # Declarations only: wrap them in a dummy rule and unwrap the result
+    minified = csscompressor.compress(f"x{{{code}}}", **CSS_MINIFY_OPTIONS)
+    if minified.startswith('x{') and minified.endswith('}'):
+        return minified[2:-1]
+    return code
+
+def _inline_cache_key(kind, code, js_mangle=False):
+    return hashlib.sha1(f"{kind}\0{js_mangle}\0{code}".encode('utf-8', 'surrogatepass')).hexdigest()
+
+def _minify_inline_blocks(blocks, js_mangle=False):
+    """Minifies a list of (kind, code) pairs, returning the results in the same order.
+       Results are memoized per process and blocks that fail to minify come back unchanged.
+       Large blocks go to the shared process pool, unless this already runs inside a pool worker."""
+    results = {}
+    pending = {}
+    for kind, code in blocks:
+        cache_key = _inline_cache_key(kind, code, js_mangle)
+        if cache_key in _inline_cache:
+            results[cache_key] = _inline_cache[cache_key]
+        else:
+            pending[cache_key] = (kind, code)
+
+    large = [key for key, (_, code) in pending.items() if len(code) >= INLINE_PARALLEL_MIN_BYTES]
+    if len(large) > 1 and multiprocessing.parent_process() is None:
+        try:
+            pool = get_process_pool()
+            futures = {key: pool.submit(_minify_inline_code, *pending[key], js_mangle) for key in large}
+            for key, future in futures.items():
+                try:
+                    results[key] = future.result()
+                except BrokenProcessPool:
+                    raise
+                except Exception:
+                    results[key] = pending[key][1]
+        except BrokenProcessPool as e:
+            _log_func(f"{Fore.YELLOW}  Warn: Inline minification workers failed ({e}). Continuing sequentially.{Style.RESET_ALL}")
+            reset_process_pool()
+
+    for key, (kind, code) in pending.items():
+        if key not in results:
+            try:
+                results[key] = _minify_inline_code(kind, code, js_mangle)
+            except Exception:
+                results[key] = code
+        if len(_inline_cache) >= INLINE_CACHE_MAX_ENTRIES:
+            _inline_cache.clear()
+        _inline_cache[key] = results[key]
+
+    return [results[_inline_cache_key(kind, code, js_mangle)] for kind, code in blocks]
+
+def _is_inline_js(open_tag):
+    """True if a <script> tag holds JavaScript (no type, or a JavaScript MIME type)."""
+    type_match = SCRIPT_TYPE_PATTERN.search(open_tag)
+    return type_match is None or type_match.group(1).lower() in JS_SCRIPT_TYPES
+
+def minify_inline_code(content, js_mangle=False, inline_js=True, inline_css=True):
+    """Minifies the inline <script> and <style> blocks and style="" attributes of an HTML document
+       and splices the results back. htmlmin keeps these verbatim, so this runs before it.
+       inline_js and inline_css follow the JS/CSS minification switches; a disabled type is left as is."""
+    blocks = []
+    spans = [] # (start, end) of each collected block in content
+    code_spans = [] # Bodies of all script/style elements, where tag-like text is not markup
+
+    for pattern, kind in ((INLINE_SCRIPT_PATTERN, 'js'), (INLINE_STYLE_PATTERN, 'css')):
+        for match in pattern.finditer(content):
+            code_spans.append((match.start(2), match.end(2)))
+            code = match.group(2)
+            if not code.strip() or any(marker in code for marker in INLINE_UNSAFE_MARKERS):
+                continue
+            if not (inline_js if kind == 'js' else inline_css):
+                continue
+            if kind == 'js' and not _is_inline_js(match.group(1)):
+                continue
+            blocks.append((kind, code))
+            spans.append((match.start(2), match.end(2)))
+
+    for tag_match in (HTML_TAG_PATTERN.finditer(content) if inline_css else ()):
+        if any(start <= tag_match.start() < end for start, end in code_spans):
+            continue
+        for attr_match in STYLE_ATTRIBUTE_PATTERN.finditer(tag_match.group(0)):
+            code = attr_match.group(3)
+            if not code.strip() or any(marker in code for marker in INLINE_UNSAFE_MARKERS):
+                continue
+            offset = tag_match.start() + attr_match.start(3)
+            blocks.append(('style', code))
+            spans.append((offset, offset + len(code)))
+
+    if not blocks:
+        return content
+    minified_blocks = _minify_inline_blocks(blocks, js_mangle)
+
+    pieces = []
+    last_end = 0
+    for (start, end), minified in sorted(zip(spans, minified_blocks)):
+        if start < last_end:
+            continue # Overlapping match (e.g. a <style> tag inside a script string), keep the outer one
+        pieces.append(content[last_end:start])
+        pieces.append(minified)
+        last_end = end
+    pieces.append(content[last_end:])
+    return ''.join(pieces)
+
+# --- SVG / XML / JSON Minification ---
+MARKUP_TOKEN_PATTERN = re.compile(
+    r'<!--.*?-->|<!\[CDATA\[.*?\]\]>|<\?.*?\?>|<!DOCTYPE(?:[^>\[]|\[.*?\])*>|</?[A-Za-z_][^>]*>|[^<]+|<',
+    re.IGNORECASE | re.DOTALL
+)
+MARKUP_TAG_PATTERN = re.compile(r'<(/?)([A-Za-z_][\w:.\-]*)(.*?)(/?)>$', re.DOTALL)
+MARKUP_ATTRIBUTE_PATTERN = re.compile(r'''([A-Za-z_][\w:.\-]*)\s*=\s*("[^"]*"|'[^']*')''')
+XML_ENCODING_PATTERN = re.compile(r'''encoding\s*=\s*["']([^"']+)["']''', re.IGNORECASE)
+SVG_NUMBER_PATTERN = re.compile(r'-?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?')
+SVG_MINIFY_OPTIONS = {'precision': 3, 'transform_precision': 5}
+# Attributes whose numbers can be rounded to SVG_MINIFY_OPTIONS['precision'] decimals
+SVG_GEOMETRY_ATTRIBUTES = {'d', 'points', 'viewBox', 'x', 'y', 'x1', 'y1', 'x2', 'y2', 'cx', 'cy', 'r', 'rx', 'ry',
+                           'width', 'height', 'stroke-width'}
+SVG_TRANSFORM_ATTRIBUTES = {'transform', 'gradientTransform', 'patternTransform'}
+# Namespaces written by editors (Inkscape, Sketch, Illustrator, Affinity) and RDF metadata
+SVG_EDITOR_NAMESPACE_MARKERS = ('inkscape.org', 'sodipodi', 'bohemiancoding.com/sketch', 'serif.com',
+                                'ns.adobe.com', 'purl.org/dc', 'creativecommons.org', '22-rdf-syntax-ns')
+SVG_DROPPED_ELEMENTS = {'metadata'}
+# Elements whose whitespace is content
+MARKUP_TEXT_ELEMENTS = {'text', 'tspan', 'textPath', 'title', 'desc', 'style', 'script'}
+
+def _shorten_number(match, precision):
+    """Rounds one number to precision decimals and drops redundant zeros, if that makes it shorter."""
+    text = match.group(0)
+    if '.' not in text or 'e' in text or 'E' in text:
+        return text
+    shortened = f"{round(float(text), precision):.{precision}f}".rstrip('0').rstrip('.')
+    if shortened in ('', '-0'):
+        shortened = '0'
+    if shortened.startswith('0.'):
+        shortened = shortened[1:]
+    elif shortened.startswith('-0.'):
+        shortened = '-' + shortened[2:]
+    if '.' not in shortened and match.string[match.end():match.end() + 1] == '.':
+        return text # "10.0.5" must not become "10.5"
+    return shortened if len(shortened) < len(text) else text
+
+def _minify_svg_attribute(name, value):
+    """Shortens the numbers of geometry and transform attributes."""
+    if name in SVG_GEOMETRY_ATTRIBUTES:
+        precision = SVG_MINIFY_OPTIONS['precision']
+    elif name in SVG_TRANSFORM_ATTRIBUTES:
+        precision = SVG_MINIFY_OPTIONS['transform_precision']
+    elif name == 'style':
+        try:
+            return _minify_inline_code('style', value)
+        except Exception:
+            return value
+    else:
+        return value
+    value = SVG_NUMBER_PATTERN.sub(lambda match: _shorten_number(match, precision), value)
+    if name in ('d', 'points'):
+        value = re.sub(r'\s*,\s*', ',', value.strip())
+        value = re.sub(r'\s+', ' ', value)
+        value = re.sub(r' (?=-)', '', value)
+        if name == 'd':
+            value = re.sub(r'\s*([A-Za-z])\s*', r'\1', value)
+    return value
+
+def _editor_prefixes(content):
+    """Returns the namespace prefixes an SVG declares for editor namespaces."""
+    prefixes = set()
+    for match in re.finditer(r'''xmlns:([\w.\-]+)\s*=\s*["']([^"']*)["']''', content):
+        if any(marker in match.group(2) for marker in SVG_EDITOR_NAMESPACE_MARKERS):
+            prefixes.add(match.group(1))
+    return prefixes
+
+def _rebuild_tag(tag, is_svg, editor_prefixes):
+    """Returns (name, attributes, closing, self_closing) for a tag, with editor attributes removed
+       and SVG numbers shortened, or None if the tag cannot be parsed safely."""
+    match = MARKUP_TAG_PATTERN.match(tag)
+    if not match:
+        return None
+    closing, name, body, self_closing = match.groups()
+    attributes = MARKUP_ATTRIBUTE_PATTERN.findall(body)
+    if MARKUP_ATTRIBUTE_PATTERN.sub('', body).strip():
+        return None # Unquoted or malformed attributes, leave the tag as it is
+    kept = []
+    for attr_name, quoted_value in attributes:
+        if is_svg:
+            prefix = attr_name.split(':', 1)[0] if ':' in attr_name else None
+            if prefix in editor_prefixes or (prefix == 'xmlns' and attr_name[6:] in editor_prefixes):
+                continue
+            quote = quoted_value[0]
+            quoted_value = quote + _minify_svg_attribute(attr_name, quoted_value[1:-1]) + quote
+        kept.append(f"{attr_name}={quoted_value}")
+    return name, kept, bool(closing), bool(self_closing)
+
+def minify_markup(content, is_svg):
+    """Minifies SVG or generic XML: drops comments and whitespace-only text between elements.
+       For SVG it also removes editor metadata, the optional XML prolog, shortens geometry numbers
+       and unwraps attribute-less <g> groups. Text elements and xml:space="preserve" subtrees keep their whitespace."""
+    editor_prefixes = _editor_prefixes(content) if is_svg else set()
+    pieces = []
+    stack = [] # (name, tag_written, preserves_whitespace) of open elements
+    skip_depth = 0 # >0 while inside an element being dropped
+
+    for token in MARKUP_TOKEN_PATTERN.findall(content):
+        if token.startswith('<!--'):
+            continue
+        if token.startswith('<![CDATA[') or token == '<':
+            if not skip_depth:
+                pieces.append(token)
+            continue
+        if token.startswith('<?') or token[:9].upper() == '<!DOCTYPE':
+            if is_svg and token.startswith('<?xml '):
+                encoding = XML_ENCODING_PATTERN.search(token)
+                if encoding is None or encoding.group(1).lower() in ('utf-8', 'utf8'):
+                    continue # UTF-8 is the default, the declaration is optional
+            elif is_svg and token[:9].upper() == '<!DOCTYPE' and '[' not in token:
+                continue
+            if not skip_depth:
+                pieces.append(token)
+            continue
+        if not token.startswith('<'):
+            if skip_depth:
+                continue
+            if is_svg and stack and stack[-1][0] == 'style':
+                try:
+                    token = csscompressor.compress(token, **CSS_MINIFY_OPTIONS)
+                except Exception:
+                    pass
+            elif not token.strip() and not any(preserves for _, _, preserves in stack):
+                continue
+            pieces.append(token)
+            continue
+
+        rebuilt = _rebuild_tag(token, is_svg, editor_prefixes)
+        if rebuilt is None:
+            if not skip_depth:
+                pieces.append(token)
+            continue
+        name, attributes, closing, self_closing = rebuilt
+        prefix = name.split(':', 1)[0] if ':' in name else None
+        dropped = is_svg and (name in SVG_DROPPED_ELEMENTS or prefix in editor_prefixes)
+
+        if closing:
+            if not stack:
+                pieces.append(token)
+                continue
+            open_name, tag_written, _ = stack.pop()
+            if skip_depth:
+                skip_depth -= 1
+                continue
+            if tag_written:
+                pieces.append(f"</{name}>")
+            continue
+
+        if skip_depth or dropped:
+            if not self_closing:
+                stack.append((name, False, False))
+                skip_depth += 1
+            continue
+        if is_svg and name == 'g' and not attributes:
+            if not self_closing:
+                stack.append((name, False, False))
+            continue # Group without attributes: keep only its children
+        attribute_text = ''.join(' ' + attribute for attribute in attributes)
+        pieces.append(f"<{name}{attribute_text}{'/' if self_closing else ''}>")
+        if not self_closing:
+            preserves = name in MARKUP_TEXT_ELEMENTS or any('xml:space="preserve"' in a or "xml:space='preserve'" in a for a in attributes)
+            stack.append((name, True, preserves))
+
+    return ''.join(pieces)
+
+def _round_json_floats(value, precision):
+    """Rounds every float in a parsed JSON document; floats that become whole turn into ints."""
+    if isinstance(value, float):
+        rounded = round(value, precision)
+        return int(rounded) if rounded.is_integer() else rounded
+    if isinstance(value, list):
+        return [_round_json_floats(item, precision) for item in value]
+    if isinstance(value, dict):
+        return {key: _round_json_floats(item, precision) for key, item in value.items()}
+    return value
+
 # --- Minifier Class ---
 class Minifier:
     """Class for minification methods"""
     @staticmethod
-    def minify_html(content):
-        return htmlmin.minify(content, remove_empty_space=True, remove_comments=True)
+    def minify_html(content, js_mangle=False, inline_js=True, inline_css=True):
+        return htmlmin.minify(minify_inline_code(content, js_mangle, inline_js, inline_css), **HTML_MINIFY_OPTIONS)
     
     @staticmethod
-    def minify_js(content):
-        return jsmin.jsmin(content)
+    def minify_js(content, mangle=False):
+        minified = jsmin.jsmin(content)
+        if mangle:
+            try:
+                minified = mangle_js(minified)
+            except Exception:
+                pass # Syntax outside the mangler's ES5 model (JSMangleError) or a mangler bug: keep the jsmin output
+        return minified
     
     @staticmethod
     def minify_css(content):
-        return csscompressor.compress(content, preserve_exclamation_comments=False)
+        return csscompressor.compress(content, **CSS_MINIFY_OPTIONS)
+
+    @staticmethod
+    def minify_svg(content):
+        return minify_markup(content, is_svg=True)
+
+    @staticmethod
+    def minify_xml(content):
+        return minify_markup(content, is_svg=False)
+
+    @staticmethod
+    def minify_json(content, float_precision=None):
+        data = json.loads(content)
+        if float_precision is not None:
+            data = _round_json_floats(data, int(float_precision))
+        return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+
+# --- Minification Cache Keys ---
+def _library_version(module):
+    """Returns the installed version of a minifier library, for cache keys."""
+    try:
+        return importlib.metadata.version(module.__name__)
+    except Exception:
+        return getattr(module, '__version__', 'unknown')
+
+def get_minifier_identity(ext, options=None):
+    """Returns (name, version, options) of the minifier used for ext."""
+    options = get_minify_options(options)
+    js_options = {'mangle': JS_MANGLER_REVISION if options['js_mangle'] else None}
+    if ext == '.html':
+        inline = {'jsmin': _library_version(jsmin), 'csscompressor': _library_version(csscompressor),
+                  'css': CSS_MINIFY_OPTIONS if options['inline_css'] else None,
+                  'js': js_options if options['inline_js'] else None}
+        return 'htmlmin', _library_version(htmlmin), dict(HTML_MINIFY_OPTIONS, inline=inline)
+    if ext == '.js':
+        return 'jsmin', _library_version(jsmin), js_options
+    if ext == '.css':
+        return 'csscompressor', _library_version(csscompressor), CSS_MINIFY_OPTIONS
+    if ext == '.svg':
+        return 'hyperzip-svg', MARKUP_MINIFIER_REVISION, dict(SVG_MINIFY_OPTIONS, css=_library_version(csscompressor))
+    if ext == '.xml':
+        return 'hyperzip-xml', MARKUP_MINIFIER_REVISION, {}
+    if ext == '.json':
+        return 'json', MARKUP_MINIFIER_REVISION, {'float_precision': options['json_float_precision']}
+    return None
+
+def get_minify_cache_key(raw_bytes, ext, options=None):
+    """Cache key for minified output: content hash plus minifier name, version and options."""
+    name, version, options = get_minifier_identity(ext, options)
+    identity = json.dumps([ext, name, version, options], sort_keys=True)
+    return hashlib.sha256(hashlib.sha256(raw_bytes).digest() + identity.encode('utf-8')).hexdigest()
+
+# Minifiable extensions and the GUI switch that controls each one
+MINIFY_TYPE_SETTINGS = {
+    '.html': 'ENABLE_HTML_MINIFICATION',
+    '.css': 'ENABLE_CSS_MINIFICATION',
+    '.js': 'ENABLE_JS_MINIFICATION',
+    '.svg': 'ENABLE_SVG_MINIFICATION',
+    '.json': 'ENABLE_JSON_MINIFICATION',
+    '.xml': 'ENABLE_XML_MINIFICATION'
+}
+MARKUP_MINIFIER_REVISION = 1 # Bump when the SVG/XML/JSON minifiers change output, to invalidate cached files
+JS_MANGLER_REVISION = 2 # Same for the identifier mangler
+# Per-run minifier options (from the settings) and their defaults
+MINIFY_OPTION_DEFAULTS = {
+    'json_float_precision': None, # JSON_FLOAT_PRECISION
+    'js_mangle': False, # ENABLE_JS_MANGLING
+    'inline_js': True, # Inline <script> in HTML, follows ENABLE_JS_MINIFICATION
+    'inline_css': True # Inline <style> and style="" in HTML, follows ENABLE_CSS_MINIFICATION
+}
+
+def get_minify_options(options=None):
+    """Returns a complete minifier options dict, filling in defaults."""
+    return dict(MINIFY_OPTION_DEFAULTS, **(options or {}))
+PARALLEL_MINIFY_MIN_BYTES = 64 * 1024 # Below this a process pool costs more than it saves
+MINIFY_CACHE_FOLDER = "minify"
+MINIFY_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+def get_enabled_minify_extensions(enable_minification):
+    """Returns the set of extensions to minify from ENABLE_MINIFICATION,
+       which is either a single bool or the GUI's dict of per-type switches."""
+    if isinstance(enable_minification, dict):
+        return {ext for ext, key in MINIFY_TYPE_SETTINGS.items() if enable_minification.get(key, False)}
+    return set(MINIFY_TYPE_SETTINGS) if enable_minification else set()
 
 # --- File Minification Function ---
-def minify_file(file_path):
-    """Minifies HTML, JS, CSS file."""
+def minify_file(file_path, log=True, raw_bytes=None, options=None):
+    """Minifies HTML, JS, CSS, SVG, JSON or XML file.
+       The file is read once (see load_text_asset) and written back only if the result is smaller.
+       Returns a stats dict (file, ext, original_size, minified_size, seconds, messages, failed).
+       With log=False, messages are only collected so a worker process can hand them back to the caller.
+       Pass raw_bytes if the caller already read the file; options are described in MINIFY_OPTION_DEFAULTS."""
+    started = time.perf_counter()
     _, ext = os.path.splitext(file_path)
     ext = ext.lower()
-    if ext not in ['.html', '.js', '.css']:
-        return
-    
-    original_size = 0
+    stats = {'file': file_path, 'ext': ext, 'original_size': 0, 'minified_size': 0, 'seconds': 0.0, 'messages': [], 'failed': False}
+    if ext not in MINIFY_TYPE_SETTINGS:
+        return stats
+
+    def log_message(message):
+        stats['messages'].append(message)
+        if log:
+            _log_func(message)
+
     file_basename = os.path.basename(file_path)
+    options = get_minify_options(options)
     
     try:
-        original_size = os.path.getsize(file_path)
+        raw_bytes, content, detected_encoding = load_text_asset(file_path, raw_bytes)
+        original_size = len(raw_bytes)
+        stats['original_size'] = stats['minified_size'] = original_size
         if original_size == 0:
-            return # Skip empty files
-        
-        # Try common encodings
-        encoding_to_try = ['utf-8', 'cp1251']
-        content = None
-        detected_encoding = None
-        
-        for enc in encoding_to_try:
-            try:
-                with open(file_path, 'r', encoding=enc) as f:
-                    content = f.read()
-                detected_encoding = enc
-                break # Stop on successful read
-            except UnicodeDecodeError:
-                continue # Try next encoding
-            except Exception as read_e:
-                _log_func(f"{Fore.YELLOW}Warn: Read {file_path} with {enc} failed: {read_e}{Style.RESET_ALL}")
-                continue
+            return stats # Skip empty files
                 
         if content is None or detected_encoding is None:
-            _log_func(f"{Fore.RED}Error: Could not decode {file_path}. Skipping minif.{Style.RESET_ALL}")
-            return
+            log_message(f"{Fore.RED}Error: Could not decode {file_path}. Skipping minif.{Style.RESET_ALL}")
+            stats['failed'] = True
+            return stats
 
         minified_content = content # Default to original if minification fails
         
         try:
             if ext == '.html':
-                minified_content = Minifier.minify_html(content)
+                minified_content = Minifier.minify_html(content, options['js_mangle'], options['inline_js'], options['inline_css'])
             elif ext == '.js':
-                minified_content = Minifier.minify_js(content)
+                minified_content = Minifier.minify_js(content, options['js_mangle'])
             elif ext == '.css':
                 minified_content = Minifier.minify_css(content)
+            elif ext == '.svg':
+                minified_content = Minifier.minify_svg(content)
+            elif ext == '.xml':
+                minified_content = Minifier.minify_xml(content)
+            elif ext == '.json':
+                minified_content = Minifier.minify_json(content, options['json_float_precision'])
         except Exception as minify_e:
-            _log_func(f"{Fore.RED}Error minifying {file_basename} ({ext}): {minify_e}{Style.RESET_ALL}")
+            log_message(f"{Fore.RED}Error minifying {file_basename} ({ext}): {minify_e}{Style.RESET_ALL}")
             minified_content = content # Revert to original on error
+            stats['failed'] = True
 
-        # Only write if minified content is smaller
+        # Only write if minified content is smaller (encoded once, written as bytes)
         minified_bytes = minified_content.encode(detected_encoding)
         if len(minified_bytes) < original_size:
-            with open(file_path, 'w', encoding=detected_encoding) as f:
-                f.write(minified_content)
+            with open(file_path, 'wb') as f:
+                f.write(minified_bytes)
+            stats['minified_size'] = len(minified_bytes)
                 
     except FileNotFoundError:
-        _log_func(f"{Fore.RED}Error minifying: Not found: {file_path}{Style.RESET_ALL}")
+        log_message(f"{Fore.RED}Error minifying: Not found: {file_path}{Style.RESET_ALL}")
+        stats['failed'] = True
     except Exception as e:
-        _log_func(f"{Fore.RED}Error processing {file_path} for minif: {type(e).__name__} - {str(e)}{Style.RESET_ALL}")
+        log_message(f"{Fore.RED}Error processing {file_path} for minif: {type(e).__name__} - {str(e)}{Style.RESET_ALL}")
+        stats['failed'] = True
+    finally:
+        stats['seconds'] = time.perf_counter() - started
+    return stats
+
+def _minify_file_in_worker(file_path, options=None):
+    """Process pool entry point: minifies without logging, messages travel back in the stats."""
+    return minify_file(file_path, log=False, options=options)
+
+# --- Parallel Minification Engine ---
+def _apply_cached_minification(file_path, ext, cache, options=None):
+    """Serves a file from the minification cache. Returns (stats, cache_key, raw_bytes);
+       stats is None on a miss, cache_key is None if the file could not be read."""
+    started = time.perf_counter()
+    try:
+        with open(file_path, 'rb') as f:
+            raw_bytes = f.read()
+    except OSError:
+        return None, None, None
+    cache_key = get_minify_cache_key(raw_bytes, ext, options)
+    cached = cache.get(cache_key)
+    if cached is None:
+        return None, cache_key, raw_bytes
+    if cached != raw_bytes:
+        with open(file_path, 'wb') as f:
+            f.write(cached)
+    stats = {'file': file_path, 'ext': ext, 'original_size': len(raw_bytes), 'minified_size': len(cached),
+             'seconds': time.perf_counter() - started, 'messages': [], 'failed': False, 'cached': True}
+    return stats, cache_key, raw_bytes
+
+def minify_files(file_paths, parallel=True, cache_dir=None, cache_max_bytes=MINIFY_CACHE_MAX_BYTES, options=None):
+    """Minifies the given files, fanning them out over the shared process pool when there is
+       enough work (htmlmin/jsmin/csscompressor are pure Python, so threads would serialize on the GIL).
+       Largest files are submitted first so a big JS bundle does not end up last in the queue.
+       parallel=False forces sequential processing.
+       With cache_dir, output is served from and stored in a persistent LRU cache, so unchanged
+       files cost a hash and a copy after the first run.
+       options (see MINIFY_OPTION_DEFAULTS) are passed on to minify_file and are part of the cache key.
+       Returns the per-file stats dicts from minify_file."""
+    from hyperzip_cache import get_byte_cache
+
+    cache = get_byte_cache(cache_dir, cache_max_bytes) if cache_dir else None
+    results = []
+    cache_keys = {}
+    loaded_bytes = {} # Bytes already read for the cache lookup, reused by sequential minification
+    sized_paths = []
+    for file_path in file_paths:
+        ext = os.path.splitext(file_path)[1].lower()
+        if cache is not None and ext in MINIFY_TYPE_SETTINGS:
+            cached_stats, cache_key, raw_bytes = _apply_cached_minification(file_path, ext, cache, options)
+            if cached_stats is not None:
+                results.append(cached_stats)
+                continue
+            if cache_key is not None:
+                cache_keys[file_path] = cache_key
+                loaded_bytes[file_path] = raw_bytes
+                sized_paths.append((len(raw_bytes), file_path))
+                continue
+        try:
+            sized_paths.append((os.path.getsize(file_path), file_path))
+        except OSError:
+            sized_paths.append((0, file_path))
+    sized_paths.sort(reverse=True)
+    total_bytes = sum(size for size, _ in sized_paths)
+
+    minified = _run_minification(sized_paths, total_bytes, parallel, loaded_bytes, options)
+    if cache is not None:
+        for stats in minified:
+            cache_key = cache_keys.get(stats['file'])
+            if cache_key is None or stats['failed']:
+                continue # Never cache a failed minification
+            try:
+                with open(stats['file'], 'rb') as f:
+                    cache.put(cache_key, f.read())
+            except OSError:
+                pass
+        cache.save()
+    return results + minified
+
+def _run_minification(sized_paths, total_bytes, parallel, loaded_bytes, options=None):
+    """Minifies (size, path) pairs, over the process pool if worthwhile. Returns their stats.
+       loaded_bytes maps paths to content already in memory (used when running sequentially)."""
+    if not sized_paths:
+        return []
+
+    use_pool = len(sized_paths) > 1 and total_bytes >= PARALLEL_MINIFY_MIN_BYTES and parallel
+    if use_pool:
+        try:
+            pool = get_process_pool()
+            futures = [pool.submit(_minify_file_in_worker, file_path, options) for _, file_path in sized_paths]
+            results = [future.result() for future in futures]
+            for stats in results:
+                for message in stats['messages']:
+                    _log_func(message)
+            return results
+        except BrokenProcessPool as e:
+            _log_func(f"{Fore.YELLOW}  Warn: Minification workers failed ({e}). Continuing sequentially.{Style.RESET_ALL}")
+            reset_process_pool()
+    return [minify_file(file_path, raw_bytes=loaded_bytes.get(file_path), options=options) for _, file_path in sized_paths]
@@ -0,0 +1,264 @@
+import os
+import re
+import zlib
+from hyperzip_core import _log_func, Fore, Style
+from hyperzip_utils import load_text_asset
+from hyperzip_jsmangle import tokenize, JSMangleError
+
+HTML_EXTENSIONS = {'.html', '.htm'}
+CSS_EXTENSIONS = {'.css'}
+JS_EXTENSIONS = {'.js'}
+
+STYLE_BLOCK_PATTERN = re.compile(r'(<style\b[^>]*>)(.*?)(</style\s*>)', re.IGNORECASE | re.DOTALL)
+SCRIPT_OR_STYLE_PATTERN = re.compile(r'<(script|style)\b[^>]*>.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+HTML_TAG_PATTERN = re.compile(r'<[A-Za-z][^<>]*>')
+HTML_TAG_NAME_PATTERN = re.compile(r'<[A-Za-z][^\s/>]*')
+# One attribute: name, then optionally '=' and a double-quoted, single-quoted or unquoted value
+HTML_ATTRIBUTE_PATTERN = re.compile(r'''(\s+[^\s=<>"'/]+)(?:(\s*=\s*)("[^"]*"|'[^']*'|[^\s"'=<>`]+))?''')
+HTML_TAG_END_PATTERN = re.compile(r'\s*/?>')
+# A declaration value: starts after '{' or ';', ends at ';' or '}' (so selectors such as a:hover are never matched)
+CSS_DECLARATION_PATTERN = re.compile(r'([{;]\s*)([\w\-]+)(\s*:)([^;{}]*)(?=[;}])')
+CSS_RULE_BODY_PATTERN = re.compile(r'\{([^{}]*)\}')
+# url() (with an unquoted or quoted argument) and strings, whose content is never transformed or split
+CSS_OPAQUE_VALUE_PATTERN = re.compile(r'''url\(\s*(?:"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*'|[^)"']*)\s*\)|"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*(?:')''')
+CSS_HEX_COLOR_PATTERN = re.compile(r'#([0-9a-fA-F]{8}|[0-9a-fA-F]{6}|[0-9a-fA-F]{3,4})(?![\w\-])')
+CSS_RGB_PATTERN = re.compile(r'\brgb\(\s*(\d{1,3})\s*,\s*(\d{1,3})\s*,\s*(\d{1,3})\s*\)', re.IGNORECASE)
+CSS_DECIMAL_PATTERN = re.compile(r'(?<![\w.#])\d*\.\d+(?![\d.])')
+# Shorthands that reset properties outside their own name family (font resets line-height, inset sets top...)
+CSS_FAMILY_ALIASES = {'line': 'font', 'top': 'inset', 'right': 'inset', 'bottom': 'inset', 'left': 'inset',
+                      'align': 'place', 'justify': 'place', 'row': 'gap', 'column': 'gap', 'columns': 'gap'}
+# Legacy names of properties whose current name is in another family; checked by full name
+CSS_PROPERTY_FAMILY_ALIASES = {'word-wrap': 'overflow', 'grid-gap': 'gap', 'grid-row-gap': 'gap', 'grid-column-gap': 'gap'}
+
+# --- CSS Transforms ---
+def _map_css_values(css, transform_value):
+    """Applies transform_value to the parts of declaration values outside url() and strings."""
+    def transform_declaration(match):
+        value = match.group(4)
+        pieces = []
+        last = 0
+        for opaque in CSS_OPAQUE_VALUE_PATTERN.finditer(value):
+            pieces.append(transform_value(value[last:opaque.start()]))
+            pieces.append(opaque.group(0))
+            last = opaque.end()
+        pieces.append(transform_value(value[last:]))
+        return f"{match.group(1)}{match.group(2)}{match.group(3)}{''.join(pieces)}"
+    return CSS_DECLARATION_PATTERN.sub(transform_declaration, css)
+
+def _canonical_hex(match):
+    digits = match.group(1).lower()
+    if len(digits) in (6, 8) and all(digits[i] == digits[i + 1] for i in range(0, len(digits), 2)):
+        digits = digits[::2]
+    return '#' + digits
+
+def _rgb_to_hex(match):
+    channels = [int(channel) for channel in match.groups()]
+    if any(channel > 255 for channel in channels):
+        return match.group(0)
+    return _canonical_hex(re.match(r'#(\w+)', '#' + ''.join(f"{channel:02x}" for channel in channels)))
+
+def normalize_css_colors(css):
+    """Lowercases hex colours, shortens #aabbcc to #abc and writes rgb(r,g,b) as hex."""
+    return _map_css_values(css, lambda value: CSS_HEX_COLOR_PATTERN.sub(_canonical_hex, CSS_RGB_PATTERN.sub(_rgb_to_hex, value)))
+
+def _canonical_number(match):
+    integer, fraction = match.group(0).split('.')
+    integer = integer.lstrip('0')
+    fraction = fraction.rstrip('0')
+    return (integer + ('.' + fraction if fraction else '')) or '0'
+
+def normalize_css_numbers(css):
+    """Drops leading zeros (0.5 -> .5) and trailing decimal zeros (1.50 -> 1.5, 2.0 -> 2)."""
+    return _map_css_values(css, lambda value: CSS_DECIMAL_PATTERN.sub(_canonical_number, value))
+
+def _property_family(declaration):
+    name = declaration.split(':', 1)[0].strip().lower()
+    if name.startswith('-') and not name.startswith('--'):
+        name = name.split('-', 2)[-1] # -webkit-transform -> transform
+    if name in CSS_PROPERTY_FAMILY_ALIASES:
+        return CSS_PROPERTY_FAMILY_ALIASES[name]
+    family = name.split('-')[0]
+    return CSS_FAMILY_ALIASES.get(family, family)
+
+def _split_css_declarations(body):
+    """Splits a rule body at the ';' outside url() and strings.
+       Returns None if a quote is left unmatched, since the split points are then unknown."""
+    declarations = []
+    start = position = 0
+    for opaque in list(CSS_OPAQUE_VALUE_PATTERN.finditer(body)) + [None]:
+        segment_end = opaque.start() if opaque else len(body)
+        for index in range(position, segment_end):
+            if body[index] in '"\'':
+                return None
+            if body[index] == ';':
+                declarations.append(body[start:index])
+                start = index + 1
+        position = opaque.end() if opaque else len(body)
+    declarations.append(body[start:])
+    return declarations
+
+def normalize_css_property_order(css):
+    """Sorts the declarations of each rule by property name. Rules where two declarations share a
+       property family (margin/margin-top, -webkit-transform/transform, font/line-height) keep their
+       order, since the cascade within the rule depends on it."""
+    def sort_body(match):
+        body = match.group(1)
+        if '/*' in body:
+            return match.group(0) # A ';' inside a comment would split wrongly
+        declarations = _split_css_declarations(body)
+        if declarations is None:
+            return match.group(0)
+        declarations = [declaration for declaration in declarations if declaration.strip()]
+        if len(declarations) < 2 or any(':' not in declaration for declaration in declarations):
+            return match.group(0)
+        families = [_property_family(declaration) for declaration in declarations]
+        if len(set(families)) != len(families) or 'all' in families:
+            return match.group(0)
+        ordered = sorted(declarations, key=lambda declaration: declaration.split(':', 1)[0].strip().lower())
+        trailing = ';' if body.rstrip().endswith(';') else ''
+        return '{' + ';'.join(ordered) + trailing + '}'
+    return CSS_RULE_BODY_PATTERN.sub(sort_body, css)
+
+# --- HTML/JS Transforms ---
+def _html_outside_code(content, transform):
+    """Applies transform to the markup between <script>/<style> blocks."""
+    pieces = []
+    last = 0
+    for block in SCRIPT_OR_STYLE_PATTERN.finditer(content):
+        pieces.append(transform(content[last:block.start()]))
+        pieces.append(block.group(0))
+        last = block.end()
+    pieces.append(transform(content[last:]))
+    return ''.join(pieces)
+
+def _requote_tag(match):
+    """Scans the attributes of one tag in order, so quote characters inside another attribute's value
+       are never mistaken for an attribute. Tags that do not parse cleanly are returned unchanged."""
+    tag = match.group(0)
+    position = HTML_TAG_NAME_PATTERN.match(tag).end()
+    pieces = [tag[:position]]
+    while True:
+        attribute = HTML_ATTRIBUTE_PATTERN.match(tag, position)
+        if attribute is None:
+            break
+        name, separator, value = attribute.groups()
+        if value is not None and value[0] == "'" and '"' not in value:
+            value = f'"{value[1:-1]}"'
+        pieces.append(name + (separator + value if value is not None else ''))
+        position = attribute.end()
+    if not HTML_TAG_END_PATTERN.fullmatch(tag, position):
+        return tag
+    pieces.append(tag[position:])
+    return ''.join(pieces)
+
+def normalize_html_attribute_quotes(content):
+    """Writes single-quoted attribute values that contain no double quote with double quotes."""
+    return _html_outside_code(content, lambda markup: HTML_TAG_PATTERN.sub(_requote_tag, markup))
+
+def _requote_js_string(literal, quote):
+    """Returns literal rewritten with quote as delimiter, or None if that needs extra escapes."""
+    body = literal[1:-1]
+    pieces = []
+    index = 0
+    while index < len(body):
+        char = body[index]
+        if char == '\\':
+            escaped = body[index + 1:index + 2]
+            pieces.append(escaped if escaped == literal[0] else char + escaped) # \' is no longer needed
+            index += 2
+            continue
+        if char == quote:
+            return None
+        pieces.append(char)
+        index += 1
+    return quote + ''.join(pieces) + quote
+
+def normalize_js_string_quotes(code):
+    """Rewrites string literals to the quote the script uses most, where no extra escape is needed.
+       Scripts the tokenizer cannot read (template literals, for instance) are left unchanged."""
+    try:
+        tokens = tokenize(code)
+    except JSMangleError:
+        return code
+    strings = [token for token in tokens if token.kind == 'string']
+    double_count = sum(1 for token in strings if token.text[0] == '"')
+    quote = '"' if double_count * 2 >= len(strings) else "'"
+    for token in strings:
+        if token.text[0] != quote:
+            requoted = _requote_js_string(token.text, quote)
+            if requoted is not None:
+                token.text = requoted
+    return ''.join(token.text for token in tokens)
+
+def _css_in_html(transform):
+    return lambda content: STYLE_BLOCK_PATTERN.sub(lambda block: block.group(1) + transform(block.group(2)) + block.group(3), content)
+
+# Transform name -> {extension: function}, tried in this order
+NORMALIZATION_TRANSFORMS = [
+    ('css colours', {**{ext: normalize_css_colors for ext in CSS_EXTENSIONS},
+                     **{ext: _css_in_html(normalize_css_colors) for ext in HTML_EXTENSIONS}}),
+    ('css numbers', {**{ext: normalize_css_numbers for ext in CSS_EXTENSIONS},
+                     **{ext: _css_in_html(normalize_css_numbers) for ext in HTML_EXTENSIONS}}),
+    ('css property order', {**{ext: normalize_css_property_order for ext in CSS_EXTENSIONS},
+                            **{ext: _css_in_html(normalize_css_property_order) for ext in HTML_EXTENSIONS}}),
+    ('html attribute quotes', {ext: normalize_html_attribute_quotes for ext in HTML_EXTENSIONS}),
+    ('js string quotes', {ext: normalize_js_string_quotes for ext in JS_EXTENSIONS}),
+]
+
+# --- Normalization Stage ---
+def _deflated_size(data):
+    """Approximates the archived size of data with raw DEFLATE at maximum level."""
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+    return len(compressor.compress(data) + compressor.flush())
+
+def normalize_text_for_compression(file_paths):
+    """Canonicalizes minified HTML/CSS/JS so the archiver finds more repeated substrings:
+       colour and number formats, CSS property order, and quoting in HTML attributes and JS strings.
+       Each transform is applied to the whole folder and kept only if it shrinks the sum of the
+       files' DEFLATE sizes. Returns (bytes saved in compressed size, names of the kept transforms)."""
+    documents = {}
+    for file_path in file_paths:
+        ext = os.path.splitext(file_path)[1].lower()
+        if ext not in HTML_EXTENSIONS | CSS_EXTENSIONS | JS_EXTENSIONS:
+            continue
+        raw_bytes, text, encoding = load_text_asset(file_path)
+        if text is None:
+            continue
+        documents[file_path] = {'ext': ext, 'text': text, 'encoding': encoding,
+                                'data': raw_bytes, 'size': _deflated_size(raw_bytes), 'changed': False}
+    if not documents:
+        return 0, []
+
+    kept = []
+    total_gain = 0
+    for name, functions in NORMALIZATION_TRANSFORMS:
+        candidates = {}
+        for file_path, document in documents.items():
+            function = functions.get(document['ext'])
+            if function is None:
+                continue
+            text = function(document['text'])
+            if text == document['text']:
+                continue
+            try:
+                data = text.encode(document['encoding'])
+            except UnicodeEncodeError:
+                continue
+            candidates[file_path] = (text, data, _deflated_size(data))
+        gain = sum(documents[file_path]['size'] - size for file_path, (_, _, size) in candidates.items())
+        if gain <= 0:
+            continue
+        for file_path, (text, data, size) in candidates.items():
+            documents[file_path].update(text=text, data=data, size=size, changed=True)
+        kept.append(name)
+        total_gain += gain
+
+    for file_path, document in documents.items():
+        if not document['changed']:
+            continue
+        try:
+            with open(file_path, 'wb') as f:
+                f.write(document['data'])
+        except OSError as e:
+            _log_func(f"{Fore.RED}  Error writing normalized {os.path.basename(file_path)}: {e}{Style.RESET_ALL}")
+    return total_gain, kept
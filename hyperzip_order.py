@@ -0,0 +1,73 @@
+import os
+import re
+import zlib
+import tempfile
+from hyperzip_zip import collect_archive_files
+
+# Entry ordering for solid archives (7z, RAR -s): similar content adjacent means longer matches in the solid stream.
+TEXT_EXTENSION_ORDER = ['.html', '.htm', '.css', '.js', '.json', '.svg', '.xml', '.txt', '.csv', '.md']
+SKETCH_SIZE = 32
+SKETCH_TOKEN_PATTERN = re.compile(rb'[A-Za-z_$][\w$\-]{2,}') # Identifiers, tag and property names
+SKETCH_MAX_BYTES = 1024 * 1024 # Larger files are sketched from their first megabyte
+
+def content_sketch(data):
+    """MinHash sketch of the file's distinct tokens; two sketches agree in roughly the share of
+       positions equal to the Jaccard similarity of the token sets. Returns None if there are no tokens."""
+    tokens = set(SKETCH_TOKEN_PATTERN.findall(data[:SKETCH_MAX_BYTES]))
+    if not tokens:
+        return None
+    hashes = [zlib.crc32(token) for token in tokens]
+    return tuple(min((value * (2 * seed + 1) + seed) & 0xFFFFFFFF for value in hashes) for seed in range(SKETCH_SIZE))
+
+def sketch_similarity(sketch_a, sketch_b):
+    if sketch_a is None or sketch_b is None:
+        return 0.0
+    return sum(1 for a, b in zip(sketch_a, sketch_b) if a == b) / SKETCH_SIZE
+
+def _chain_by_similarity(items):
+    """Orders [(relative path, size, sketch)] greedily: start with the largest, then always append the
+       remaining item most similar to the last one (ties go to the larger, then to the name)."""
+    remaining = sorted(items, key=lambda item: (-item[1], item[0]))
+    ordered = [remaining.pop(0)]
+    while remaining:
+        last_sketch = ordered[-1][2]
+        best_index = max(range(len(remaining)),
+                         key=lambda index: (sketch_similarity(last_sketch, remaining[index][2]), -index))
+        ordered.append(remaining.pop(best_index))
+    return ordered
+
+def order_archive_entries(folder_path, exclusion_patterns=()):
+    """Returns the folder's files (paths relative to folder_path, '/' separated) in the order a solid
+       archiver should compress them: text before binary, grouped by extension, and within each text
+       extension chained by content similarity. Binary groups keep name order, since compressed
+       image/font data does not match across files."""
+    text_groups = {}
+    binary_groups = {}
+    for relative_path, file_path in collect_archive_files(folder_path, exclusion_patterns):
+        ext = os.path.splitext(relative_path)[1].lower()
+        if ext in TEXT_EXTENSION_ORDER:
+            try:
+                with open(file_path, 'rb') as f:
+                    data = f.read(SKETCH_MAX_BYTES)
+                size = os.path.getsize(file_path)
+            except OSError:
+                data, size = b'', 0
+            text_groups.setdefault(ext, []).append((relative_path, size, content_sketch(data)))
+        else:
+            binary_groups.setdefault(ext, []).append(relative_path)
+
+    ordered = []
+    for ext in sorted(text_groups, key=TEXT_EXTENSION_ORDER.index):
+        ordered.extend(relative_path for relative_path, _, _ in _chain_by_similarity(text_groups[ext]))
+    for ext in sorted(binary_groups):
+        ordered.extend(sorted(binary_groups[ext]))
+    return ordered
+
+def write_list_file(relative_paths):
+    """Writes the paths (OS separators, UTF-8, one per line) to a temporary list file for the archiver.
+       The caller removes it. Returns its path."""
+    handle, list_path = tempfile.mkstemp(prefix="hyperzip_", suffix=".lst")
+    with os.fdopen(handle, 'w', encoding='utf-8', newline='\n') as f:
+        for relative_path in relative_paths:
+            f.write(relative_path.replace('/', os.sep) + '\n')
+    return list_path
@@ -0,0 +1,119 @@
+import os
+import sys
+import time
+import tempfile
+import threading
+import subprocess
+
+# Flag each archiver takes for its thread count; a flag already present in the profile params wins
+THREAD_FLAG_PREFIXES = {"7zip": "-mmt", "winrar": "-mt", "zpaq": "-threads"}
+
+def thread_args(tool_family, threads, params_list):
+    """Returns the arguments that set the archiver's thread count, or [] if the tool has no such
+       flag or params_list already sets one."""
+    prefix = THREAD_FLAG_PREFIXES.get(tool_family)
+    if prefix is None or any(param.lower().startswith(prefix) for param in params_list):
+        return []
+    if tool_family == "7zip":
+        return [f"-mmt={threads}"]
+    if tool_family == "winrar":
+        return [f"-mt{min(threads, 64)}"] # WinRAR accepts 1..64
+    return ["-threads", str(threads)]
+
+def _windows_cpu_seconds(process):
+    """User + kernel time of a finished (not yet closed) process, via GetProcessTimes."""
+    import ctypes
+    from ctypes import wintypes
+    creation, exit_time, kernel, user = (wintypes.FILETIME() for _ in range(4))
+    if not ctypes.windll.kernel32.GetProcessTimes(wintypes.HANDLE(int(process._handle)), ctypes.byref(creation),
+                                                  ctypes.byref(exit_time), ctypes.byref(kernel), ctypes.byref(user)):
+        return None
+    to_seconds = lambda filetime: ((filetime.dwHighDateTime << 32) | filetime.dwLowDateTime) / 1e7 # 100 ns units
+    return to_seconds(kernel) + to_seconds(user)
+
+def run_measured(cmd, cwd=None, encoding='cp866'):
+    """Runs cmd like subprocess.run(capture_output=True, text=True) and also measures the child's CPU time.
+       Output goes through temporary files so the child can be reaped with its resource usage.
+       Returns (CompletedProcess, CPU seconds or None)."""
+    with tempfile.TemporaryFile() as stdout_file, tempfile.TemporaryFile() as stderr_file:
+        process = subprocess.Popen(cmd, stdout=stdout_file, stderr=stderr_file, cwd=cwd,
+                                   creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+        cpu_seconds = None
+        if hasattr(os, 'wait4'):
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            cpu_seconds = usage.ru_utime + usage.ru_stime
+        else:
+            process.wait()
+            if sys.platform == 'win32':
+                try:
+                    cpu_seconds = _windows_cpu_seconds(process)
+                except (OSError, AttributeError, ValueError):
+                    cpu_seconds = None
+        outputs = []
+        for output_file in (stdout_file, stderr_file):
+            output_file.seek(0)
+            outputs.append(output_file.read().decode(encoding, errors='ignore'))
+    return subprocess.CompletedProcess(cmd, process.returncode, outputs[0], outputs[1]), cpu_seconds
+
+class ArchiverScheduler:
+    """Runs archiver subprocesses from several folder workers at once without oversubscribing the CPU.
+       Every job gets an explicit thread count (total_threads split across max_jobs) and waits until
+       that many threads of the budget are free. Per-job wall and CPU times are kept in self.jobs."""
+
+    def __init__(self, total_threads=None, max_jobs=1):
+        self.total_threads = max(1, int(total_threads or os.cpu_count() or 1))
+        self.max_jobs = max(1, min(int(max_jobs), self.total_threads))
+        self.threads_per_job = max(1, self.total_threads // self.max_jobs)
+        self.jobs = []
+        self._free_threads = self.total_threads
+        self._condition = threading.Condition()
+
+    def run(self, cmd, tool_family, cwd=None, label=None):
+        """Runs the archiver command with a thread flag for tool_family added: after the command word for
+           7-Zip and WinRAR (7z a -mmt=N ...), at the end for ZPAQ, whose options follow the file list.
+           Returns (CompletedProcess, job stats dict)."""
+        threads = self.threads_per_job
+        extra_args = thread_args(tool_family, threads, cmd[2:])
+        cmd = list(cmd) + extra_args if tool_family == "zpaq" else list(cmd[:2]) + extra_args + list(cmd[2:])
+        with self._condition:
+            self._condition.wait_for(lambda: self._free_threads >= threads)
+            self._free_threads -= threads
+        try:
+            started = time.perf_counter()
+            result, cpu_seconds = run_measured(cmd, cwd=cwd)
+            wall_seconds = time.perf_counter() - started
+        finally:
+            with self._condition:
+                self._free_threads += threads
+                self._condition.notify_all()
+        job = {"label": label or os.path.basename(str(cmd[0])), "tool": tool_family, "threads": threads,
+               "wall": wall_seconds, "cpu": cpu_seconds, "returncode": result.returncode}
+        with self._condition:
+            self.jobs.append(job)
+        return result, job
+
+    def totals(self):
+        """Returns (job count, summed wall seconds, summed CPU seconds; None if unmeasured)."""
+        with self._condition:
+            jobs = list(self.jobs)
+        cpu_values = [job["cpu"] for job in jobs if job["cpu"] is not None]
+        return len(jobs), sum(job["wall"] for job in jobs), (sum(cpu_values) if cpu_values else None)
+
+_archiver_scheduler = None
+_archiver_scheduler_lock = threading.Lock()
+
+def configure_archiver_scheduler(total_threads=None, max_jobs=1):
+    """Starts a fresh scheduler (and job statistics) for a run and returns it."""
+    global _archiver_scheduler
+    with _archiver_scheduler_lock:
+        _archiver_scheduler = ArchiverScheduler(total_threads, max_jobs)
+        return _archiver_scheduler
+
+def get_archiver_scheduler():
+    """Returns the run's scheduler, creating a single-job one using all cores if none was configured."""
+    global _archiver_scheduler
+    with _archiver_scheduler_lock:
+        if _archiver_scheduler is None:
+            _archiver_scheduler = ArchiverScheduler()
+        return _archiver_scheduler
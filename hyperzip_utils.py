@@ -1,7 +1,15 @@
 import os
 import shutil
+import hashlib
+import re
+import codecs
+import functools
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from hyperzip_core import _log_func, Fore, Style
 
+CACHE_FOLDER_NAME = "_hyperzip_cache" # Leading underscore keeps it out of folder discovery
+
 # --- Calculate Folder Size ---
 def get_folder_size(folder_path):
     """Calculate the total size of a folder in bytes."""
@@ -16,6 +24,144 @@ def get_folder_size(folder_path):
                 pass
     return total_size
 
+# --- File Hash ---
+def get_file_hash(file_path, chunk_size=1024 * 1024):
+    """Returns the SHA-256 hex digest of a file, read in chunks."""
+    hasher = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+# --- Text Asset Loading ---
+TEXT_FALLBACK_ENCODINGS = ('utf-8', 'cp1251')
+_BOMS = ((codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16'))
+_HTML_META_CHARSET = re.compile(rb'''<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9_\-:.]+)''', re.IGNORECASE)
+_CSS_CHARSET = re.compile(rb'''^@charset\s+["']([A-Za-z0-9_\-:.]+)["']\s*;''', re.IGNORECASE)
+
+def _declared_encoding(raw_bytes, ext):
+    """Returns the encoding declared by a BOM, an HTML <meta charset> or a CSS @charset, or None."""
+    for bom, encoding in _BOMS:
+        if raw_bytes.startswith(bom):
+            return encoding
+    match = None
+    if ext in ('.html', '.htm'):
+        match = _HTML_META_CHARSET.search(raw_bytes[:4096]) # Browsers also only prescan the head
+    elif ext == '.css':
+        match = _CSS_CHARSET.match(raw_bytes)
+    if match:
+        try:
+            return codecs.lookup(match.group(1).decode('ascii')).name
+        except (LookupError, UnicodeDecodeError):
+            return None
+    return None
+
+def load_text_asset(file_path, raw_bytes=None):
+    """Reads a text asset once and decodes it.
+       The encoding comes from the BOM, an HTML <meta charset> or a CSS @charset if present,
+       otherwise from trial decoding (utf-8, then cp1251).
+       Returns (raw_bytes, text, encoding); text and encoding are None if nothing decodes.
+       Pass raw_bytes if the file was already read."""
+    if raw_bytes is None:
+        with open(file_path, 'rb') as f:
+            raw_bytes = f.read()
+    ext = os.path.splitext(file_path)[1].lower()
+    candidates = []
+    declared = _declared_encoding(raw_bytes, ext)
+    if declared:
+        candidates.append(declared)
+    candidates.extend(enc for enc in TEXT_FALLBACK_ENCODINGS if enc not in candidates)
+    for encoding in candidates:
+        try:
+            return raw_bytes, raw_bytes.decode(encoding), encoding
+        except (UnicodeDecodeError, LookupError):
+            continue # A wrong declaration falls back to trial decoding
+    return raw_bytes, None, None
+
+# --- Reference Rewriting ---
+TEXT_REFERENCE_EXTENSIONS = {'.html', '.htm', '.css', '.js', '.json', '.svg', '.xml'}
+
+def _reference_pattern(file_name):
+    """Regex matching file_name as a whole path component (not part of a longer name)."""
+    return re.compile(r'(?<![\w.\-])' + re.escape(file_name) + r'(?![\w\-])')
+
+def find_text_references(folder_path, file_name):
+    """Returns the text files under folder_path that mention file_name literally."""
+    pattern = _reference_pattern(file_name)
+    referencing_files = []
+    for root, _, files in os.walk(folder_path):
+        for file in files:
+            if os.path.splitext(file)[1].lower() not in TEXT_REFERENCE_EXTENSIONS:
+                continue
+            text_path = os.path.join(root, file)
+            try:
+                with open(text_path, 'rb') as f:
+                    content = f.read().decode('latin-1') # Byte-preserving, file names are ASCII in practice
+            except OSError:
+                continue
+            if pattern.search(content):
+                referencing_files.append(text_path)
+    return referencing_files
+
+def rewrite_text_references(text_files, old_name, new_name):
+    """Replaces references to old_name with new_name in the given text files.
+       Returns the number of replacements made."""
+    pattern = _reference_pattern(old_name)
+    replacements = 0
+    for text_path in text_files:
+        try:
+            with open(text_path, 'rb') as f:
+                content = f.read().decode('latin-1')
+            new_content, count = pattern.subn(lambda _match: new_name, content)
+            if count:
+                with open(text_path, 'wb') as f:
+                    f.write(new_content.encode('latin-1'))
+                replacements += count
+        except OSError as e:
+            _log_func(f"{Fore.YELLOW}  Warn: Could not rewrite references in {os.path.basename(text_path)}: {e}{Style.RESET_ALL}")
+    return replacements
+
+# --- Shared Process Pool ---
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+def get_process_pool():
+    """Returns the shared process pool for CPU-bound pure-Python stages, creating it on first use.
+       The pool is reused across attempts and folders so worker start-up is paid once per run."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+        return _process_pool
+
+def reset_process_pool():
+    """Drops the shared process pool (e.g. after a worker crashed); the next call creates a new one."""
+    global _process_pool
+    with _process_pool_lock:
+        pool, _process_pool = _process_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_process_pool():
+    """Shuts the shared process pool down at the end of a run."""
+    global _process_pool
+    with _process_pool_lock:
+        pool, _process_pool = _process_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+# --- Cache Folder Function ---
+def get_cache_dir(base_dir):
+    """Returns the persistent cache folder inside base_dir, creating it if needed.
+       Returns None if the folder cannot be created."""
+    cache_dir = os.path.join(base_dir, CACHE_FOLDER_NAME)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError as e:
+        _log_func(f"{Fore.YELLOW}  Warn: Cannot create cache folder {cache_dir}: {e}{Style.RESET_ALL}")
+        return None
+    return cache_dir
+
 # --- Temp Folder Function ---
 def create_temp_folder(original_folder, base_dir):
     """Creates a temporary copy of the folder for processing inside base_dir."""
@@ -57,7 +203,7 @@ def process_files_in_folder(folder_path, png_compressor, current_png_level, curr
     """Minifies text files and compresses images in the specified folder using the selected PNG compressor.
        Returns total saved bytes, total original size, and updated tinify_api_key_valid status."""
     
-    from hyperzip_minify import minify_file
+    from hyperzip_minify import minify_files, get_enabled_minify_extensions, MINIFY_CACHE_FOLDER
     from hyperzip_image import process_images_in_folder
     
     total_saved_image_bytes = 0
@@ -70,17 +216,52 @@ def process_files_in_folder(folder_path, png_compressor, current_png_level, curr
         for file in files:
             file_list.append(os.path.join(root, file))
 
-    # 1. Minify Text Files
-    enable_minification = process_settings.get('ENABLE_MINIFICATION', False)
-    if enable_minification:
+    # 1. Purge unused CSS rules, apply the known-library rules, subset fonts, then minify text files (each type honours its own switch)
+    if process_settings.get('ENABLE_CSS_PURGE', False):
+        from hyperzip_csspurge import purge_unused_css_in_folder
+        purge_unused_css_in_folder(folder_path, process_settings.get('CSS_PURGE_SAFELIST', []))
+
+    library_files = set()
+    if process_settings.get('ENABLE_LIBRARY_DETECTION', True):
+        from hyperzip_libraries import apply_library_rules
+        library_files = apply_library_rules(folder_path, process_settings.get('LIBRARY_RULES'), process_settings.get('CACHE_DIR'),
+                                            process_settings.get('LIBRARY_DEFAULT_ACTION', 'skip'))
+        file_list = [p for p in file_list if os.path.exists(p)] # CDN-replaced libraries are gone
+
+    if process_settings.get('ENABLE_FONT_SUBSETTING', False):
+        from hyperzip_fonts import subset_fonts_in_folder
+        subset_fonts_in_folder(folder_path, process_settings.get('CACHE_DIR'), process_settings.get('FONT_SUBSET_EXTRA_CHARS', ''),
+                               process_settings.get('FONT_SUBSET_TO_WOFF2', True))
+
+    enabled_minify_extensions = get_enabled_minify_extensions(process_settings.get('ENABLE_MINIFICATION', False))
+    if enabled_minify_extensions:
         # _log_func(f"  {Fore.YELLOW}Minifying text files...{Style.RESET_ALL}") # Less verbose
-        minify_tasks = [p for p in file_list if os.path.splitext(p)[1].lower() in ['.html', '.js', '.css']]
+        minify_tasks = [p for p in file_list if os.path.splitext(p)[1].lower() in enabled_minify_extensions and p not in library_files]
         if minify_tasks:
-            processed_count = 0
-            for file_path in minify_tasks:
-                minify_file(file_path)
-                processed_count += 1
-            # _log_func(f"  {Fore.GREEN}Minification attempted for {processed_count} file(s).{Style.RESET_ALL}") # Less verbose
+            minify_cache_dir = None
+            if process_settings.get('ENABLE_MINIFY_CACHE', True) and process_settings.get('CACHE_DIR'):
+                minify_cache_dir = os.path.join(process_settings['CACHE_DIR'], MINIFY_CACHE_FOLDER)
+            minify_stats = minify_files(minify_tasks, parallel=process_settings.get('PARALLEL_MINIFICATION', True),
+                                        cache_dir=minify_cache_dir,
+                                        cache_max_bytes=int(process_settings.get('MINIFY_CACHE_MAX_MB', 64) * 1024 * 1024),
+                                        options={'json_float_precision': process_settings.get('JSON_FLOAT_PRECISION'),
+                                                 'js_mangle': process_settings.get('ENABLE_JS_MANGLING', False),
+                                                 'inline_js': '.js' in enabled_minify_extensions,
+                                                 'inline_css': '.css' in enabled_minify_extensions})
+            minify_saved = sum(stat['original_size'] - stat['minified_size'] for stat in minify_stats)
+            minify_seconds = sum(stat['seconds'] for stat in minify_stats)
+            slowest = max(minify_stats, key=lambda stat: stat['seconds'])
+            cached_count = sum(1 for stat in minify_stats if stat.get('cached'))
+            cached_note = f", {cached_count} from cache" if cached_count else ""
+            _log_func(f"  {Fore.GREEN}Minified {len(minify_stats)} file(s){cached_note}: saved {minify_saved/1024:.1f} KB "
+                      f"({minify_seconds:.2f}s CPU, slowest {os.path.basename(slowest['file'])} {slowest['seconds']:.2f}s).{Style.RESET_ALL}")
+
+            if process_settings.get('ENABLE_TEXT_NORMALIZATION', False):
+                from hyperzip_normalize import normalize_text_for_compression
+                normalized_gain, kept_transforms = normalize_text_for_compression(minify_tasks)
+                if kept_transforms:
+                    _log_func(f"  {Fore.GREEN}Normalized text for compression ({', '.join(kept_transforms)}): "
+                              f"~{normalized_gain/1024:.1f} KB smaller compressed.{Style.RESET_ALL}")
 
     # 2. Compress Images
     # Note: We attempt compression even if tinify key is invalid, as oxipng might be selected.
@@ -100,9 +281,36 @@ def process_files_in_folder(folder_path, png_compressor, current_png_level, curr
         
         total_saved_image_bytes, total_original_image_size, current_tinify_valid = process_images_in_folder(
             folder_path, png_compressor, current_png_level, current_jpeg_quality, tinify_api_key_valid,
-            enable_png_compression=enable_png, enable_jpeg_compression=enable_jpeg
+            enable_png_compression=enable_png, enable_jpeg_compression=enable_jpeg,
+            cache_dir=process_settings.get('CACHE_DIR'),
+            use_asset_registry=process_settings.get('ENABLE_ASSET_REGISTRY', True),
+            jpeg_subsampling=process_settings.get('JPEG_SUBSAMPLING', '4:2:0'),
+            jpeg_progressive=process_settings.get('JPEG_PROGRESSIVE', 'auto'),
+            convert_png_to_jpeg=process_settings.get('CONVERT_PHOTO_PNG_TO_JPEG', False),
+            png_to_jpeg_review=process_settings.get('PNG_TO_JPEG_REVIEW')
         )
 
+        # 3. Recompress images embedded as data URIs in HTML/CSS/JS with the same settings
+        if process_settings.get('ENABLE_DATA_URI_COMPRESSION', True):
+            from hyperzip_image import compress_image
+            from hyperzip_datauri import process_data_uris_in_folder
+            compress_func = functools.partial(compress_image,
+                                              png_compressor=png_compressor,
+                                              png_level=current_png_level,
+                                              jpeg_quality=current_jpeg_quality,
+                                              tinify_api_key_valid=current_tinify_valid,
+                                              enable_png_compression=enable_png,
+                                              enable_jpeg_compression=enable_jpeg,
+                                              jpeg_subsampling=process_settings.get('JPEG_SUBSAMPLING', '4:2:0'),
+                                              jpeg_progressive=process_settings.get('JPEG_PROGRESSIVE', 'auto'))
+            uri_saved, uri_original, uri_tinify_valid = process_data_uris_in_folder(
+                folder_path, compress_func, externalize=process_settings.get('EXTERNALIZE_DATA_URIS', False)
+            )
+            total_saved_image_bytes += uri_saved
+            total_original_image_size += uri_original
+            if png_compressor != "oxipng" and not uri_tinify_valid:
+                current_tinify_valid = False
+
     return total_saved_image_bytes, total_original_image_size, current_tinify_valid
 
 # --- Cleanup Temp Folders ---
@@ -0,0 +1,375 @@
+import os
+import io
+import re
+import time
+import zlib
+import struct
+import fnmatch
+import hashlib
+import zipfile
+import multiprocessing
+from concurrent.futures.process import BrokenProcessPool
+from hyperzip_core import _log_func, Fore, Style
+from hyperzip_utils import get_process_pool, reset_process_pool
+
+# In-process ZIP writer used by the native_zip profile: no archiver executable, no subprocess.
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+NATIVE_ZIP_DEFAULT_LEVEL = 9
+NATIVE_ZIP_LEVEL_PATTERN = re.compile(r'^-mx(?::([\w.,]+))?=(\d)$') # -mx=9, -mx:png,jpg=6
+
+LOCAL_HEADER_STRUCT = struct.Struct('<IHHHHHIIIHH')
+CENTRAL_HEADER_STRUCT = struct.Struct('<IHHHHHHIIIHHHHHII')
+END_OF_CENTRAL_DIR_STRUCT = struct.Struct('<IHHHHIIH')
+LOCAL_HEADER_SIGNATURE = 0x04034b50
+CENTRAL_HEADER_SIGNATURE = 0x02014b50
+END_OF_CENTRAL_DIR_SIGNATURE = 0x06054b50
+UTF8_NAME_FLAG = 0x0800
+UNICODE_PATH_EXTRA_ID = 0x7075 # Info-ZIP Unicode Path: the UTF-8 name beside a legacy (OEM code page) name
+ZIP_MAX_ENTRIES = 0xFFFF
+ZIP_MAX_SIZE = 0xFFFFFFFF
+
+class ZipEntry:
+    """One archive member: its name, original bytes, and the payload actually stored."""
+    __slots__ = ('name', 'data', 'crc', 'method', 'payload', 'dos_time', 'dos_date', 'raw_name')
+
+    def __init__(self, name, data, method, payload, mtime=None):
+        self.name = name
+        self.raw_name = None # (name bytes, flags) copied from an existing archive, which may not be UTF-8
+        self.data = data
+        self.crc = zlib.crc32(data) & 0xFFFFFFFF
+        self.method = method
+        self.payload = payload
+        self.dos_time, self.dos_date = _dos_datetime(mtime)
+
+def _dos_datetime(mtime):
+    moment = time.localtime(mtime if mtime is not None else time.time())
+    year = min(max(moment.tm_year, 1980), 2107)
+    dos_time = (moment.tm_hour << 11) | (moment.tm_min << 5) | (moment.tm_sec // 2)
+    dos_date = ((year - 1980) << 9) | (moment.tm_mon << 5) | moment.tm_mday
+    return dos_time, dos_date
+
+def deflate_raw(data, level=NATIVE_ZIP_DEFAULT_LEVEL):
+    """Returns data as a raw DEFLATE stream (the form stored in ZIP entries)."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15, 9)
+    return compressor.compress(data) + compressor.flush()
+
+def make_zip_entry(name, data, level=NATIVE_ZIP_DEFAULT_LEVEL, mtime=None):
+    """Compresses data at level (0 stores it). Entries DEFLATE would grow are stored."""
+    if level > 0 and data:
+        payload = deflate_raw(data, level)
+        if len(payload) < len(data):
+            return ZipEntry(name, data, ZIP_DEFLATED, payload, mtime)
+    return ZipEntry(name, data, ZIP_STORED, data, mtime)
+
+def build_zip_bytes(entries):
+    """Serializes entries into a ZIP archive held in memory. Raises ValueError past the non-ZIP64 limits."""
+    if len(entries) > ZIP_MAX_ENTRIES:
+        raise ValueError(f"Too many entries for ZIP without ZIP64: {len(entries)}")
+    output = io.BytesIO()
+    central_directory = []
+    for entry in entries:
+        offset = output.tell()
+        if offset > ZIP_MAX_SIZE or len(entry.data) > ZIP_MAX_SIZE:
+            raise ValueError("Archive too large for ZIP without ZIP64")
+        if entry.raw_name is not None:
+            name_bytes, flags = entry.raw_name
+        else:
+            try:
+                name_bytes = entry.name.encode('ascii')
+                flags = 0
+            except UnicodeEncodeError:
+                name_bytes = entry.name.encode('utf-8')
+                flags = UTF8_NAME_FLAG
+        version_needed = 20 if entry.method == ZIP_DEFLATED else 10
+        output.write(LOCAL_HEADER_STRUCT.pack(LOCAL_HEADER_SIGNATURE, version_needed, flags, entry.method,
+                                              entry.dos_time, entry.dos_date, entry.crc, len(entry.payload),
+                                              len(entry.data), len(name_bytes), 0))
+        output.write(name_bytes)
+        output.write(entry.payload)
+        central_directory.append(CENTRAL_HEADER_STRUCT.pack(CENTRAL_HEADER_SIGNATURE, 20, version_needed, flags, entry.method,
+                                                            entry.dos_time, entry.dos_date, entry.crc, len(entry.payload),
+                                                            len(entry.data), len(name_bytes), 0, 0, 0, 0, 0, offset) + name_bytes)
+    central_offset = output.tell()
+    for record in central_directory:
+        output.write(record)
+    central_size = output.tell() - central_offset
+    if output.tell() > ZIP_MAX_SIZE:
+        raise ValueError("Archive too large for ZIP without ZIP64")
+    output.write(END_OF_CENTRAL_DIR_STRUCT.pack(END_OF_CENTRAL_DIR_SIGNATURE, 0, 0, len(entries), len(entries),
+                                                central_size, central_offset, 0))
+    return output.getvalue()
+
+def parse_native_zip_params(params):
+    """Parses profile params: '-mx=N' sets the DEFLATE level (0 = store), '-mx:png,jpg=N' overrides it
+       for those extensions. Returns (default_level, {'.ext': level})."""
+    default_level = NATIVE_ZIP_DEFAULT_LEVEL
+    extension_levels = {}
+    for param in (params or '').split():
+        match = NATIVE_ZIP_LEVEL_PATTERN.match(param)
+        if not match:
+            raise ValueError(f"Unsupported native_zip parameter: {param}")
+        level = int(match.group(2))
+        if match.group(1):
+            for ext in match.group(1).split(','):
+                extension_levels['.' + ext.lower().lstrip('.')] = level
+        else:
+            default_level = level
+    return default_level, extension_levels
+
+def is_excluded(relative_path, exclusion_patterns):
+    """Matches ARCHIVE_EXCLUSIONS wildcards against the entry name and its path inside the archive."""
+    name = relative_path.rsplit('/', 1)[-1].lower()
+    relative_path = relative_path.lower()
+    return any(fnmatch.fnmatchcase(name, pattern.lower()) or fnmatch.fnmatchcase(relative_path, pattern.lower())
+               for pattern in exclusion_patterns)
+
+def collect_archive_files(folder_path, exclusion_patterns=()):
+    """Returns [(archive name, file path)] for the files under folder_path, sorted by archive name."""
+    archive_files = []
+    for root, _, files in os.walk(folder_path):
+        for file in files:
+            file_path = os.path.join(root, file)
+            relative_path = os.path.relpath(file_path, folder_path).replace(os.sep, '/')
+            if not is_excluded(relative_path, exclusion_patterns):
+                archive_files.append((relative_path, file_path))
+    archive_files.sort()
+    return archive_files
+
+def write_archive_file(archive_path, data):
+    """Writes the archive through a temporary file, so a failed write never leaves a truncated archive."""
+    temp_path = f"{archive_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, archive_path)
+    except OSError:
+        try: os.remove(temp_path)
+        except OSError: pass
+        raise
+
+def _native_zip_entries(folder_path, params, exclusion_patterns):
+    default_level, extension_levels = parse_native_zip_params(params)
+    entries = []
+    for relative_path, file_path in collect_archive_files(folder_path, exclusion_patterns):
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        level = extension_levels.get(os.path.splitext(relative_path)[1].lower(), default_level)
+        entries.append(make_zip_entry(relative_path, data, level, os.path.getmtime(file_path)))
+    return entries
+
+def native_zip_bytes(folder_path, params='', exclusion_patterns=()):
+    """Archives the contents of folder_path (paths relative to it, like the 7-Zip profiles) in memory
+       without spawning an archiver. Returns the archive bytes. Raises OSError or ValueError on failure."""
+    return build_zip_bytes(_native_zip_entries(folder_path, params, exclusion_patterns))
+
+def create_native_zip(folder_path, archive_path, params='', exclusion_patterns=()):
+    """Writes native_zip_bytes() of folder_path to archive_path. Returns (entry count, archive size in bytes).
+       Raises OSError or ValueError on failure."""
+    entries = _native_zip_entries(folder_path, params, exclusion_patterns)
+    archive_bytes = build_zip_bytes(entries)
+    write_archive_file(archive_path, archive_bytes)
+    return len(entries), len(archive_bytes)
+
+# --- Exhaustive DEFLATE Pass ---
+EXHAUSTIVE_DEFLATE_CACHE_FOLDER = "deflate"
+EXHAUSTIVE_DEFLATE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+EXHAUSTIVE_DEFLATE_PARALLEL_MIN_BYTES = 16 * 1024 # Smaller entries are recompressed in this process
+EXHAUSTIVE_DEFLATE_REVISION = 1
+ZLIB_STRATEGIES = (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED, zlib.Z_RLE, zlib.Z_FIXED)
+
+def _load_zopfli():
+    """Returns the zopfli module, or None if it is not installed."""
+    try:
+        import zopfli
+    except ImportError:
+        return None
+    return zopfli
+
+def exhaustive_deflate(data, iterations=15):
+    """Returns the smallest raw DEFLATE stream for data found by Zopfli's iterative optimal parsing
+       (if installed) and a sweep over zlib's strategies and memory levels."""
+    best = None
+    for strategy in ZLIB_STRATEGIES:
+        for mem_level in (8, 9):
+            compressor = zlib.compressobj(9, zlib.DEFLATED, -15, mem_level, strategy)
+            stream = compressor.compress(data) + compressor.flush()
+            if best is None or len(stream) < len(best):
+                best = stream
+    zopfli = _load_zopfli()
+    if zopfli is not None:
+        compressor = zopfli.ZopfliCompressor(zopfli.ZOPFLI_FORMAT_DEFLATE, iterations=iterations)
+        stream = compressor.compress(data) + compressor.flush()
+        if len(stream) < len(best):
+            best = stream
+    return best
+
+def _exhaustive_deflate_cache_key(data, iterations, backend):
+    digest = hashlib.sha256(data)
+    digest.update(f"\0{EXHAUSTIVE_DEFLATE_REVISION}\0{iterations}\0{backend}".encode('ascii'))
+    return digest.hexdigest()
+
+def _unicode_path_name(extra, name_bytes):
+    """Returns the UTF-8 name from an Info-ZIP Unicode Path extra field that still matches name_bytes, or None."""
+    index = 0
+    while index + 4 <= len(extra):
+        field_id, field_size = struct.unpack('<HH', extra[index:index + 4])
+        field = extra[index + 4:index + 4 + field_size]
+        if field_id == UNICODE_PATH_EXTRA_ID and field_size >= 5 and field[0] == 1:
+            if struct.unpack('<I', field[1:5])[0] != zlib.crc32(name_bytes) & 0xFFFFFFFF:
+                return None # Stale: the legacy name was changed after the field was written
+            try:
+                return field[5:].decode('utf-8')
+            except UnicodeDecodeError:
+                return None
+        index += 4 + field_size
+    return None
+
+def read_zip_entries(archive_bytes):
+    """Reads a ZIP archive into ZipEntry objects that keep each entry's original payload.
+       Names are kept as stored, except that a legacy name with an Info-ZIP Unicode Path extra field is
+       re-encoded as UTF-8 (flag 0x800), since build_zip_bytes writes no extra fields.
+       Raises ValueError for archives this writer cannot reproduce (encryption, methods other than store/deflate)."""
+    entries = []
+    with zipfile.ZipFile(io.BytesIO(archive_bytes)) as archive:
+        for info in archive.infolist():
+            if info.flag_bits & 0x1:
+                raise ValueError(f"Encrypted entry: {info.filename}")
+            if info.compress_type not in (ZIP_STORED, ZIP_DEFLATED):
+                raise ValueError(f"Unsupported compression method {info.compress_type} for {info.filename}")
+            name_length, extra_length = struct.unpack('<HH', archive_bytes[info.header_offset + 26:info.header_offset + 30])
+            payload_start = info.header_offset + LOCAL_HEADER_STRUCT.size + name_length + extra_length
+            payload = archive_bytes[payload_start:payload_start + info.compress_size]
+            entry = ZipEntry(info.filename, archive.read(info), info.compress_type, payload)
+            name_start = info.header_offset + LOCAL_HEADER_STRUCT.size
+            entry.raw_name = (archive_bytes[name_start:name_start + name_length], info.flag_bits & UTF8_NAME_FLAG)
+            if not info.flag_bits & UTF8_NAME_FLAG:
+                unicode_name = _unicode_path_name(info.extra, entry.raw_name[0])
+                if unicode_name is not None:
+                    entry.name = unicode_name
+                    entry.raw_name = (unicode_name.encode('utf-8'), UTF8_NAME_FLAG)
+            year, month, day, hour, minute, second = info.date_time
+            entry.dos_time = (hour << 11) | (minute << 5) | (second // 2)
+            entry.dos_date = ((year - 1980) << 9) | (month << 5) | day
+            entries.append(entry)
+    return entries
+
+def optimize_zip_archive(archive_path, iterations=15, cache_dir=None, cache_max_bytes=EXHAUSTIVE_DEFLATE_CACHE_MAX_BYTES):
+    """optimize_zip_bytes() for an archive on disk, rewritten only if it shrinks. Returns (old size, new size) in bytes."""
+    with open(archive_path, 'rb') as f:
+        archive_bytes = f.read()
+    optimized_bytes = optimize_zip_bytes(archive_bytes, iterations, cache_dir, cache_max_bytes)
+    if len(optimized_bytes) < len(archive_bytes):
+        write_archive_file(archive_path, optimized_bytes)
+    return len(archive_bytes), len(optimized_bytes)
+
+def optimize_zip_bytes(archive_bytes, iterations=15, cache_dir=None, cache_max_bytes=EXHAUSTIVE_DEFLATE_CACHE_MAX_BYTES):
+    """Final pass for ZIP output: recompresses every entry with exhaustive_deflate and keeps whichever
+       stream is smaller, the existing one or the new one. Large entries are spread over the shared
+       process pool. Streams are cached by (content hash, iterations, backend) under cache_dir.
+       Returns the smaller of the rebuilt archive and archive_bytes."""
+    entries = read_zip_entries(archive_bytes)
+    backend = "zopfli" if _load_zopfli() is not None else "zlib"
+    cache = None
+    if cache_dir:
+        from hyperzip_cache import get_byte_cache
+        cache = get_byte_cache(os.path.join(cache_dir, EXHAUSTIVE_DEFLATE_CACHE_FOLDER), cache_max_bytes)
+
+    streams = {}
+    pending = []
+    for index, entry in enumerate(entries):
+        if not entry.data:
+            continue
+        cached = cache.get(_exhaustive_deflate_cache_key(entry.data, iterations, backend)) if cache else None
+        if cached is not None:
+            streams[index] = cached
+        else:
+            pending.append(index)
+
+    large = [index for index in pending if len(entries[index].data) >= EXHAUSTIVE_DEFLATE_PARALLEL_MIN_BYTES]
+    if len(large) > 1 and multiprocessing.parent_process() is None:
+        try:
+            pool = get_process_pool()
+            futures = {index: pool.submit(exhaustive_deflate, entries[index].data, iterations) for index in large}
+            for index, future in futures.items():
+                streams[index] = future.result()
+        except BrokenProcessPool as e:
+            _log_func(f"{Fore.YELLOW}  Warn: Exhaustive DEFLATE workers failed ({e}). Continuing sequentially.{Style.RESET_ALL}")
+            reset_process_pool()
+    for index in pending:
+        if index not in streams:
+            streams[index] = exhaustive_deflate(entries[index].data, iterations)
+        if cache:
+            cache.put(_exhaustive_deflate_cache_key(entries[index].data, iterations, backend), streams[index])
+    if cache:
+        cache.save()
+
+    for index, stream in streams.items():
+        entry = entries[index]
+        if len(stream) < len(entry.payload) and len(stream) < len(entry.data):
+            entry.method = ZIP_DEFLATED
+            entry.payload = stream
+    optimized_bytes = build_zip_bytes(entries)
+    return optimized_bytes if len(optimized_bytes) < len(archive_bytes) else archive_bytes
+
+# --- Store-vs-Deflate Selection ---
+def select_entry_methods(archive_path, min_deflate_gain_pct=0.0):
+    """select_entry_methods_bytes() for an archive on disk, rewritten only if a method changes.
+       Returns (entries switched to store, entries switched to deflate)."""
+    with open(archive_path, 'rb') as f:
+        archive_bytes = f.read()
+    selected_bytes, to_store, to_deflate = select_entry_methods_bytes(archive_bytes, min_deflate_gain_pct)
+    if to_store or to_deflate:
+        write_archive_file(archive_path, selected_bytes)
+    return to_store, to_deflate
+
+def select_entry_methods_bytes(archive_bytes, min_deflate_gain_pct=0.0):
+    """Decides per entry whether to store or deflate: entries whose DEFLATE stream (the existing one,
+       or a trial compression for stored entries) does not save more than min_deflate_gain_pct of their
+       size are stored, the others deflated. Already-compressed JPEG/PNG/WOFF2 usually end up stored,
+       which also spares the decompression on the ad server.
+       Returns (archive bytes, entries switched to store, entries switched to deflate)."""
+    entries = read_zip_entries(archive_bytes)
+    to_store = 0
+    to_deflate = 0
+    for entry in entries:
+        deflated = entry.payload if entry.method == ZIP_DEFLATED else (deflate_raw(entry.data) if entry.data else b'')
+        deflate_wins = entry.data and len(deflated) < len(entry.data) * (1 - min_deflate_gain_pct / 100.0)
+        if deflate_wins and entry.method == ZIP_STORED:
+            entry.method, entry.payload = ZIP_DEFLATED, deflated
+            to_deflate += 1
+        elif not deflate_wins and entry.method == ZIP_DEFLATED:
+            entry.method, entry.payload = ZIP_STORED, entry.data
+            to_store += 1
+    if to_store or to_deflate:
+        return build_zip_bytes(entries), to_store, to_deflate
+    return archive_bytes, 0, 0
+
+# --- Minimal Layout ---
+MINIMAL_ZIP_DOS_TIME = 0 # 00:00:00
+MINIMAL_ZIP_DOS_DATE = (1 << 5) | 1 # 1980-01-01, the earliest DOS date
+
+def minimize_zip_layout(archive_path):
+    """minimize_zip_layout_bytes() for an archive on disk. Returns (old size, new size) in bytes."""
+    with open(archive_path, 'rb') as f:
+        archive_bytes = f.read()
+    minimal_bytes = minimize_zip_layout_bytes(archive_bytes)
+    if minimal_bytes != archive_bytes:
+        write_archive_file(archive_path, minimal_bytes)
+    return len(archive_bytes), len(minimal_bytes)
+
+def minimize_zip_layout_bytes(archive_bytes):
+    """Rebuilds a ZIP archive in the leanest valid layout: directory entries dropped, no extra fields
+       (extended timestamps, NTFS times, Unix owners), no data descriptors or comments, and every entry
+       dated 1980-01-01 00:00 so identical inputs give identical bytes. Entry payloads are kept as they are."""
+    entries = [entry for entry in read_zip_entries(archive_bytes) if not (entry.name.endswith('/') and not entry.data)]
+    for entry in entries:
+        entry.dos_time, entry.dos_date = MINIMAL_ZIP_DOS_TIME, MINIMAL_ZIP_DOS_DATE
+    return build_zip_bytes(entries)
+
+def describe_zip_entries(archive_path):
+    """Returns [{'name', 'size', 'compressed_size', 'method'}] for the entries of a ZIP archive."""
+    with zipfile.ZipFile(archive_path) as archive:
+        return [{'name': info.filename, 'size': info.file_size, 'compressed_size': info.compress_size,
+                 'method': 'deflate' if info.compress_type == ZIP_DEFLATED else 'store' if info.compress_type == ZIP_STORED else str(info.compress_type)}
+                for info in archive.infolist()]
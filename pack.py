@@ -10,10 +10,12 @@ This is the main entry point that imports functionality from the modular files.
 
 import sys
 import os
+import multiprocessing
 from hyperzip_core import DEFAULT_SETTINGS
 from hyperzip_main import run_packing
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support() # Process pool workers in frozen builds
     # When run directly, use default settings and standard print
     print("Running pack.py with default settings...")
     
@@ -0,0 +1,89 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from hyperzip_fonts import subset_font_bytes, subset_fonts_in_folder, _load_subsetter
+
+try:
+    from fontTools.fontBuilder import FontBuilder
+    from fontTools.pens.ttGlyphPen import TTGlyphPen
+    from fontTools.ttLib import TTFont
+except ImportError:
+    FontBuilder = None
+
+def _square_glyph(size):
+    pen = TTGlyphPen(None)
+    pen.moveTo((50, 0)); pen.lineTo((50, size)); pen.lineTo((size, size)); pen.lineTo((size, 0))
+    pen.closePath()
+    return pen.glyph()
+
+def build_test_font(characters="ABCDEFGHIJ"):
+    """Builds a small TrueType font with one square glyph per character."""
+    glyph_order = [".notdef"] + [f"glyph{ord(char)}" for char in characters]
+    builder = FontBuilder(1000, isTTF=True)
+    builder.setupGlyphOrder(glyph_order)
+    builder.setupCharacterMap({ord(char): f"glyph{ord(char)}" for char in characters})
+    builder.setupGlyf({name: _square_glyph(100 + 40 * index) for index, name in enumerate(glyph_order)})
+    builder.setupHorizontalMetrics({name: (600, 50) for name in glyph_order})
+    builder.setupHorizontalHeader(ascent=800, descent=-200)
+    builder.setupNameTable({"familyName": "HyperZip Test", "styleName": "Regular"})
+    builder.setupOS2()
+    builder.setupPost()
+    output = io.BytesIO()
+    builder.save(output)
+    return output.getvalue()
+
+def font_characters(raw_bytes):
+    with TTFont(io.BytesIO(raw_bytes)) as font:
+        return {chr(code) for code in font.getBestCmap()}
+
+@unittest.skipIf(FontBuilder is None or _load_subsetter() is None, "fontTools is not installed")
+class FontSubsetTests(unittest.TestCase):
+    """Fonts keep exactly the characters the folder can render."""
+
+    def test_subset_font_bytes_keeps_requested_characters(self):
+        raw_bytes = build_test_font()
+        outputs = subset_font_bytes(raw_bytes, set("CAB"), [None, 'woff'])
+        self.assertEqual(font_characters(outputs[None]), set("ABC"))
+        self.assertEqual(outputs['woff'][:4], b'wOFF')
+        self.assertEqual(font_characters(outputs['woff']), set("ABC"))
+        self.assertLess(len(outputs[None]), len(raw_bytes))
+
+    def test_subset_fonts_in_folder(self):
+        folder = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(folder, "font.ttf"), "wb") as f:
+                f.write(build_test_font())
+            with open(os.path.join(folder, "index.html"), "w", encoding="utf-8") as f:
+                f.write('<html><head><style>@font-face{font-family:t;src:url(font.ttf) format("truetype")}</style></head>'
+                        '<body><p>BAD</p><script>var label = "J";</script></body></html>')
+            saved = subset_fonts_in_folder(folder, convert_to_woff2=False)
+            self.assertGreater(saved, 0)
+            with open(os.path.join(folder, "font.ttf"), "rb") as f:
+                self.assertEqual(font_characters(f.read()), set("ABDJ"))
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    def test_conversion_to_woff2_rewrites_references(self):
+        try:
+            import brotli # noqa: F401
+        except ImportError:
+            self.skipTest("brotli is not installed")
+        folder = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(folder, "font.ttf"), "wb") as f:
+                f.write(build_test_font())
+            with open(os.path.join(folder, "style.css"), "w", encoding="utf-8") as f:
+                f.write('@font-face{font-family:t;src:url(font.ttf) format("truetype")}.a:after{content:"AB"}')
+            subset_fonts_in_folder(folder)
+            self.assertEqual(sorted(os.listdir(folder)), ["font.woff2", "style.css"])
+            with open(os.path.join(folder, "style.css"), encoding="utf-8") as f:
+                self.assertIn('url(font.woff2) format("woff2")', f.read())
+            with open(os.path.join(folder, "font.woff2"), "rb") as f:
+                self.assertEqual(font_characters(f.read()), set("AB"))
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import shutil
+import subprocess
+import unittest
+from hyperzip_jsmangle import mangle_js, JSMangleError
+
+NODE = shutil.which("node")
+
+def run_js(code):
+    """Evaluates code with node and returns what it printed."""
+    result = subprocess.run([NODE, "-e", code], capture_output=True, text=True, timeout=30)
+    if result.returncode != 0:
+        raise AssertionError(result.stderr)
+    return result.stdout
+
+class CatchScopeTests(unittest.TestCase):
+    """Catch parameters are bound to the catch block only."""
+
+    # (script, expected output of console.log)
+    CASES = [
+        # Outer variable with the catch parameter's name, used after the try/catch
+        ("function outer(){var e=1;function inner(){try{x()}catch(e){}return e}return inner()}console.log(outer())", "1"),
+        ("function outer(){var e=1;try{x()}catch(e){e=2}return e}console.log(outer())", "1"),
+        # Catch parameter shadowing a parameter of the enclosing function
+        ("function f(e){try{throw 5}catch(e){return e+e}}console.log(f(1))", "10"),
+        ("function f(e){try{throw 5}catch(e){}return e}console.log(f(3))", "3"),
+        # var inside the catch block belongs to the function
+        ("function f(){try{throw 1}catch(e){var v=e+1}return v}console.log(f())", "2"),
+        # Closure over the catch parameter next to an outer variable of another name
+        ("function f(){var a=7;try{throw 2}catch(e){var g=function(){return e*a}}return g()}console.log(f())", "14"),
+        # Nested catch clauses with the same parameter name
+        ("function f(){try{throw 1}catch(e){try{throw 2}catch(e){}return e}}console.log(f())", "1"),
+    ]
+
+    def test_catch_scope_cases(self):
+        for code, expected in self.CASES:
+            with self.subTest(code=code):
+                mangled = mangle_js(code)
+                if NODE:
+                    self.assertEqual(run_js(mangled).strip(), expected, mangled)
+                    self.assertEqual(run_js(code).strip(), expected)
+
+    def test_outer_variable_keeps_its_binding(self):
+        mangled = mangle_js("function outer(){var e=1;function inner(){try{x()}catch(e){}return e}return inner()}")
+        self.assertNotIn("return a}return a()", mangled)
+
+    def test_var_redeclaring_catch_parameter_is_rejected(self):
+        with self.assertRaises(JSMangleError):
+            mangle_js("function f(){try{x()}catch(e){var e=2}return e}")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+import io
+import os
+import random
+import shutil
+import struct
+import tempfile
+import unittest
+import zipfile
+import zlib
+from hyperzip_zip import (build_zip_bytes, read_zip_entries, native_zip_bytes, optimize_zip_bytes,
+                          select_entry_methods_bytes, minimize_zip_layout_bytes,
+                          LOCAL_HEADER_STRUCT, CENTRAL_HEADER_STRUCT, END_OF_CENTRAL_DIR_STRUCT,
+                          LOCAL_HEADER_SIGNATURE, CENTRAL_HEADER_SIGNATURE, END_OF_CENTRAL_DIR_SIGNATURE,
+                          UTF8_NAME_FLAG, UNICODE_PATH_EXTRA_ID, ZIP_STORED, ZIP_DEFLATED)
+
+COMPRESSIBLE = b"<div class=\"banner\">HyperZip</div>\n" * 200
+INCOMPRESSIBLE = random.Random(41).randbytes(4096)
+LEGACY_NAME = "файл.txt" # Not representable in cp437, so only the Unicode Path field carries it
+
+# name -> (name bytes, flags, extra field, method, data)
+SOURCE_ENTRIES = {
+    "stored.html": (b"stored.html", 0, b"", ZIP_STORED, COMPRESSIBLE),
+    "deflated.bin": (b"deflated.bin", 0, b"", ZIP_DEFLATED, INCOMPRESSIBLE),
+    "img/ünïcödé.txt": ("img/ünïcödé.txt".encode("utf-8"), UTF8_NAME_FLAG, b"", ZIP_DEFLATED, COMPRESSIBLE[:500]),
+    LEGACY_NAME: (LEGACY_NAME.encode("cp866"), 0, None, ZIP_DEFLATED, b"legacy name " * 50),
+}
+
+def _unicode_path_extra(name_bytes, name):
+    field = b"\x01" + struct.pack("<I", zlib.crc32(name_bytes) & 0xFFFFFFFF) + name.encode("utf-8")
+    return struct.pack("<HH", UNICODE_PATH_EXTRA_ID, len(field)) + field
+
+def build_source_archive():
+    """Writes SOURCE_ENTRIES the way other archivers do: level-1 DEFLATE streams and a legacy
+       OEM-encoded name with an Info-ZIP Unicode Path extra field."""
+    output = io.BytesIO()
+    central_directory = []
+    for name, (name_bytes, flags, extra, method, data) in SOURCE_ENTRIES.items():
+        if extra is None:
+            extra = _unicode_path_extra(name_bytes, name)
+        payload = data
+        if method == ZIP_DEFLATED:
+            compressor = zlib.compressobj(1, zlib.DEFLATED, -15)
+            payload = compressor.compress(data) + compressor.flush()
+        crc = zlib.crc32(data) & 0xFFFFFFFF
+        offset = output.tell()
+        output.write(LOCAL_HEADER_STRUCT.pack(LOCAL_HEADER_SIGNATURE, 20, flags, method, 0, 0x5021, crc,
+                                              len(payload), len(data), len(name_bytes), len(extra)))
+        output.write(name_bytes + extra + payload)
+        central_directory.append(CENTRAL_HEADER_STRUCT.pack(CENTRAL_HEADER_SIGNATURE, 20, 20, flags, method, 0, 0x5021, crc,
+                                                            len(payload), len(data), len(name_bytes), len(extra),
+                                                            0, 0, 0, 0, offset) + name_bytes + extra)
+    central_offset = output.tell()
+    for record in central_directory:
+        output.write(record)
+    output.write(END_OF_CENTRAL_DIR_STRUCT.pack(END_OF_CENTRAL_DIR_SIGNATURE, 0, 0, len(central_directory),
+                                                len(central_directory), output.tell() - central_offset, central_offset, 0))
+    return output.getvalue()
+
+def extract_all(archive_bytes):
+    """Returns {name: data} after checking every entry's CRC."""
+    with zipfile.ZipFile(io.BytesIO(archive_bytes)) as archive:
+        bad_entry = archive.testzip()
+        if bad_entry is not None:
+            raise AssertionError(f"Corrupt entry: {bad_entry}")
+        return {info.filename: archive.read(info) for info in archive.infolist()}
+
+def entry_methods(archive_bytes):
+    with zipfile.ZipFile(io.BytesIO(archive_bytes)) as archive:
+        return {info.filename: info.compress_type for info in archive.infolist()}
+
+EXPECTED_CONTENT = {name: entry[4] for name, entry in SOURCE_ENTRIES.items()}
+
+class ZipRewriteTests(unittest.TestCase):
+    """Every rewrite of an archive keeps the names and bytes of its entries."""
+
+    def setUp(self):
+        self.source = build_source_archive()
+
+    def test_source_archive_is_valid(self):
+        # zipfile does not read the Unicode Path field, so the legacy name shows in cp437
+        content = extract_all(self.source)
+        self.assertEqual(len(content), len(SOURCE_ENTRIES))
+        self.assertNotIn(LEGACY_NAME, content)
+
+    def test_read_and_build_round_trip(self):
+        entries = read_zip_entries(self.source)
+        self.assertEqual([entry.name for entry in entries], list(SOURCE_ENTRIES))
+        self.assertEqual(extract_all(build_zip_bytes(entries)), EXPECTED_CONTENT)
+
+    def test_optimize_zip_bytes(self):
+        optimized = optimize_zip_bytes(self.source, iterations=1)
+        self.assertLess(len(optimized), len(self.source))
+        self.assertEqual(extract_all(optimized), EXPECTED_CONTENT)
+
+    def test_select_entry_methods_bytes(self):
+        selected, to_store, to_deflate = select_entry_methods_bytes(self.source)
+        self.assertEqual((to_store, to_deflate), (1, 1))
+        self.assertEqual(extract_all(selected), EXPECTED_CONTENT)
+        methods = entry_methods(selected)
+        self.assertEqual(methods["stored.html"], ZIP_DEFLATED)
+        self.assertEqual(methods["deflated.bin"], ZIP_STORED)
+
+    def test_minimize_zip_layout_bytes(self):
+        minimal = minimize_zip_layout_bytes(self.source)
+        self.assertEqual(extract_all(minimal), EXPECTED_CONTENT)
+        self.assertEqual(minimal, minimize_zip_layout_bytes(minimal))
+        with zipfile.ZipFile(io.BytesIO(minimal)) as archive:
+            for info in archive.infolist():
+                self.assertEqual((info.date_time, info.extra), ((1980, 1, 1, 0, 0, 0), b""))
+
+    def test_chained_rewrites(self):
+        archive_bytes = minimize_zip_layout_bytes(select_entry_methods_bytes(optimize_zip_bytes(self.source, iterations=1))[0])
+        self.assertEqual(extract_all(archive_bytes), EXPECTED_CONTENT)
+
+class NativeZipTests(unittest.TestCase):
+    """The built-in writer archives a folder like the 7-Zip profiles do."""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.files = {"index.html": COMPRESSIBLE, "img/photo.jpg": INCOMPRESSIBLE, "img/ünïcödé.txt": COMPRESSIBLE[:500],
+                      "empty.txt": b""}
+        for name, data in self.files.items():
+            path = os.path.join(self.folder, *name.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def test_native_zip_bytes(self):
+        archive_bytes = native_zip_bytes(self.folder, "-mx=9")
+        self.assertEqual(extract_all(archive_bytes), self.files)
+        methods = entry_methods(archive_bytes)
+        self.assertEqual(methods["index.html"], ZIP_DEFLATED)
+        self.assertEqual(methods["img/photo.jpg"], ZIP_STORED) # DEFLATE would grow it
+
+    def test_native_zip_bytes_per_extension_level(self):
+        archive_bytes = native_zip_bytes(self.folder, "-mx=9 -mx:html=0")
+        self.assertEqual(extract_all(archive_bytes), self.files)
+        self.assertEqual(entry_methods(archive_bytes)["index.html"], ZIP_STORED)
+
+    def test_native_zip_bytes_exclusions(self):
+        archive_bytes = native_zip_bytes(self.folder, "", exclusion_patterns=("*.jpg",))
+        self.assertNotIn("img/photo.jpg", extract_all(archive_bytes))
+
+    def test_native_archive_survives_rewrites(self):
+        archive_bytes = native_zip_bytes(self.folder, "-mx=1")
+        for rewrite in (lambda data: optimize_zip_bytes(data, iterations=1),
+                        lambda data: select_entry_methods_bytes(data)[0],
+                        minimize_zip_layout_bytes,
+                        lambda data: build_zip_bytes(read_zip_entries(data))):
+            archive_bytes = rewrite(archive_bytes)
+            self.assertEqual(extract_all(archive_bytes), self.files)
+
+if __name__ == "__main__":
+    unittest.main()